@@ -1,15 +1,8 @@
 # project_summary.py
 import streamlit as st
 import pandas as pd
-import mysql.connector
-
-def get_connection():
-    return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='*******', #Enter password
-        database='imdb'
-    )
+from utils.db import get_connection
+from utils.lookup_cache import cached_lookup, REFERENCE, PROJECTS
 
 # --- Fetch project summary data with optional filters ---
 def get_project_summary(project_type=None, project_name=None):
@@ -31,6 +24,7 @@ def get_project_summary(project_type=None, project_name=None):
     return results
 
 # --- Fetch project types from DB ---
+@cached_lookup(REFERENCE)
 def fetch_project_types():
     query = "SELECT type FROM project_types"
     conn = get_connection()
@@ -41,6 +35,7 @@ def fetch_project_types():
     return types
 
 # --- Fetch all project names for suggestions ---
+@cached_lookup(PROJECTS)
 def fetch_project_names():
     query = "SELECT DISTINCT project_name FROM project_config"
     conn = get_connection()
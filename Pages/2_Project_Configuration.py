@@ -1,8 +1,9 @@
 import streamlit as st
-import mysql.connector
 from datetime import datetime
 import os
 import sys
+from utils.db import get_connection
+from utils.lookup_cache import cached_lookup, invalidate, REFERENCE, PROJECTS
 
 def nav_to(page):
     st.session_state.page = page
@@ -25,15 +26,8 @@ if st.session_state.page == "3_Site_Load":
     
     st.stop()
 
-def get_connection():
-    return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='*******', #Enter password
-        database='imdb'
-    )
-
 # Fetch dropdown values
+@cached_lookup(REFERENCE)
 def fetch_options(query):
     conn = get_connection()
     cursor = conn.cursor()
@@ -42,6 +36,7 @@ def fetch_options(query):
     conn.close()
     return options
 
+@cached_lookup(REFERENCE)
 def fetch_state_name_code_map():
     conn = get_connection()
     cursor = conn.cursor()
@@ -78,6 +73,7 @@ def insert_project(data):
     cursor.execute(query, tuple(processed_data))
     conn.commit()
     conn.close()
+    invalidate(PROJECTS)
 
 def update_project(data):
     conn = get_connection()
@@ -113,6 +109,7 @@ def update_project(data):
     cursor.execute(query, tuple(processed_data))
     conn.commit()
     conn.close()
+    invalidate(PROJECTS)
 
 
 st.header("Project Configuration")
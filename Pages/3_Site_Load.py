@@ -1,54 +1,76 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
 import io
+from concurrent.futures import ThreadPoolExecutor, wait
 
-def find_column_flexible(df, target_names):
+from utils.profile_ingestion import (
+    stream_profile_file, format_invalid_rows, validate_profile_header, staging_table,
+    ensure_staging_tables, stage_hourly_gaps, publish_staged_profile, upsert_staged_profile,
+    discard_staged_profiles, fetch_stored_profile, fetch_profile_grid,
+    PROFILE_TABLES, ParsedFrameCache
+)
+from utils.profile_store import (
+    ensure_profile_array_table, write_profile_array, drop_profile_array, finish_profile_arrays
+)
+from utils.db import get_connection, release_connection, DatabaseError
+from utils.lookup_cache import cached_lookup, invalidate, PROJECTS, PROFILES
+from utils.id_sequences import allocate_id, peek_next_id, PROFILE_ID_SEQUENCE, PROFILE_ID_SEED_QUERY
+from utils.profile_alignment import describe_alignment
+from utils.profile_quality import (
+    profile_quality_report, quality_report_table, ensure_quality_table, save_quality_report
+)
+
+def get_parsed_frame_cache():
+    """Session-wide cache so each uploaded file is parsed once across reruns"""
+    if "parsed_frame_cache" not in st.session_state:
+        st.session_state.parsed_frame_cache = ParsedFrameCache()
+    return st.session_state.parsed_frame_cache
+
+def get_quality_report(kind, entry):
     """
-    Find column that matches any of the target names (case insensitive)
-    Args:
-        df: pandas DataFrame
-        target_names: list of possible column names to match
-    Returns:
-        actual column name if found, None otherwise
+    Quality report of an upload, computed once per file content and entered capacity
     """
-    df_columns_lower = [col.lower().strip() for col in df.columns]
-    target_names_lower = [name.lower().strip() for name in target_names]
-    
-    for target in target_names_lower:
-        for i, col_lower in enumerate(df_columns_lower):
-            if target in col_lower or col_lower in target:
-                return df.columns[i]
-    return None
+    try:
+        capacity = float(entry.get("capacity") or 0) or None
+    except ValueError:
+        capacity = None
+    cache = get_parsed_frame_cache()
+    key = (cache.content_key(entry["file"], entry["filename"]), kind, capacity)
+    reports = st.session_state.setdefault("quality_reports", {})
+    if key not in reports:
+        reports[key] = profile_quality_report(
+            entry["file"], entry["filename"], kind, capacity,
+            frame=cache.get(entry["file"], entry["filename"])
+        )
+    return reports[key]
+
+def render_quality_report(kind, entry):
+    """Shows the quality checks of an upload, expanded when any check found problems"""
+    report = get_quality_report(kind, entry)
+    if report is None:
+        return
+    issues = sum(value or 0 for key, value in report.items() if key not in ("rows", "step", "flatline_rows"))
+    label = f"Data quality: {issues:,} issues found" if issues else "Data quality: no issues found"
+    with st.expander(label, expanded=bool(issues)):
+        st.dataframe(quality_report_table({entry["filename"]: report}), use_container_width=True)
+        if report["above_capacity"] is None and kind != "demand":
+            st.caption("Enter the capacity to check values against nameplate capacity.")
 
 def validate_file_columns(file, filename, required_cols_sets):
     """
     Validate that uploaded file contains required columns
+    Only the header and a small sample of rows are read, so large files validate instantly
     Args:
         file: uploaded file object
         filename: name of the file
-        required_cols_sets: list of tuples, each containing possible column names for a required field
+        required_cols_sets: [timestamp column aliases, value column aliases]
     Returns:
-        tuple: (is_valid, error_message, dataframe)
+        tuple: (is_valid, error_message, sample dataframe)
     """
     try:
-        file.seek(0)
-        if filename.lower().endswith('.csv'):
-            df = pd.read_csv(file)
-        else:
-            df = pd.read_excel(file)
-        
-        missing_columns = []
-        for col_set in required_cols_sets:
-            if not find_column_flexible(df, col_set):
-                missing_columns.append(f"'{'/'.join(col_set)}'")
-        
-        if missing_columns:
-            error_msg = f"Missing required columns: {', '.join(missing_columns)}. Available columns: {', '.join(df.columns.tolist())}"
-            return False, error_msg, None
-        
-        file.seek(0)
-        return True, "", df
+        datetime_aliases, value_aliases = required_cols_sets
+        is_valid, error_msg, sample = validate_profile_header(file, filename, datetime_aliases, value_aliases)
+        return is_valid, error_msg, sample if is_valid else None
     except Exception as e:
         return False, f"Error reading file: {str(e)}", None
 
@@ -79,14 +101,9 @@ st.markdown("""
 if "page" not in st.session_state:
     st.session_state.page = "project_load"
 
-def get_connection():
-    return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='*******', #Enter password
-        database='imdb'
-    )
+INGEST_WORKERS = 4
 
+@cached_lookup(PROJECTS)
 def get_project_ids():
     conn = get_connection()
     cursor = conn.cursor()
@@ -95,6 +112,17 @@ def get_project_ids():
     conn.close()
     return ids
 
+@cached_lookup(PROFILES)
+def get_profile_ids(project_id):
+    """Profile IDs saved for a project, newest first"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT id FROM demand_profile WHERE project_id = %s ORDER BY id DESC", (project_id,))
+    ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return ids
+
+@cached_lookup(PROJECTS)
 def get_project_description(project_id):
     conn = get_connection()
     cursor = conn.cursor()
@@ -239,237 +267,215 @@ def validate_demand_entries(entries):
     return errors
 
 def get_next_profile_id():
-    """Generate next profile ID by finding max ID across all profile tables"""
+    """Allocate a new profile ID from the id_sequences counter (safe under concurrent saves)"""
+    conn = get_connection()
+    try:
+        return allocate_id(conn, PROFILE_ID_SEQUENCE, PROFILE_ID_SEED_QUERY)
+    finally:
+        conn.close()
+
+def peek_next_profile_id():
+    """Profile ID the next new save is expected to get, for display only"""
+    conn = get_connection()
+    try:
+        return peek_next_id(conn, PROFILE_ID_SEQUENCE, PROFILE_ID_SEED_QUERY)
+    finally:
+        conn.close()
+
+def profile_has_data(kind, entry):
+    if kind == "demand":
+        return bool(entry.get("filename", ""))
+    return any([entry.get("manufacturer", ""), entry.get("model", ""), entry.get("capacity", ""), entry.get("filename", "")])
+
+def insert_profile_metadata(cursor, kind, project_id, profile_id, entry):
+    if kind == "demand":
+        cursor.execute("""
+            INSERT INTO demand_profile (id, project_id, file_name)
+            VALUES (%s, %s, %s)
+        """, (profile_id, project_id, entry.get("filename", "") or None))
+        return
+    cursor.execute(f"""
+        INSERT INTO {kind}_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (
+        profile_id,
+        project_id,
+        entry.get("manufacturer", "") or None,
+        entry.get("model", "") or None,
+        float(entry["capacity"]) if entry.get("capacity") else None,
+        entry.get("filename", "") or None
+    ))
+
+def stage_profile_upload(kind, project_id, profile_id, file, filename, frame, stored, progress, key):
+    """
+    Streams one upload into its staging table on the worker's own pooled connection
+    The file is averaged per clock hour as it is read (utils.profile_ingestion)
+    With stored (rows already saved for the profile), only new or changed hours are staged
+    Runs in a worker thread, so progress goes to the shared dict instead of Streamlit
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    
-    max_ids = []
-    tables = ['wind_profile', 'solar_profile', 'battery_profile', 'demand_profile']
-    
-    for table in tables:
-        cursor.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}")
-        max_id = cursor.fetchone()[0]
-        max_ids.append(max_id)
-    
-    conn.close()
-    return max(max_ids) + 1
+    try:
+        def report(fraction, rows_read):
+            progress[key] = (fraction, rows_read)
+        ingestion = stream_profile_file(
+            cursor, kind, project_id, profile_id, file, filename,
+            progress_callback=report, frame=frame, table=staging_table(kind), stored=stored
+        )
+        conn.commit()
+        return ingestion
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        release_connection()
 
-def save_all_profiles(project_id, wind_entries, solar_entries, battery_entries, demand_entries):
+def save_all_profiles(project_id, wind_entries, solar_entries, battery_entries, demand_entries,
+                      columnar_store=False, append=False):
+    """
+    Saves profile metadata and data rows for all uploads
+    Each upload is streamed concurrently on its own pooled connection into the staging
+    copy of its data table (chunked, averaged per clock hour with gap flags, bulk inserted
+    by utils.profile_ingestion). The hours missing between them are then staged as filled
+    rows, so each kind is stored as a gap-free hourly grid the optimizer reads as is
+    (utils.profile_alignment). Only when every file has staged is the profile published:
+    metadata, staged rows and columnar arrays go live in one transaction. On any failure
+    the staged rows and array files written are discarded, so no partial profile is left
+    behind. The quality
+    report of each upload (utils.profile_quality) is stored with the profile.
+    With append, the uploads are merged into the existing profile st.session_state.profile_id:
+    each file is diffed against the stored rows and only new or changed rows are staged
+    and upserted, so a monthly refresh writes just that month. Metadata is left as saved.
+    With columnar_store, each published grid is also written as one float32 .npy array
+    (utils.profile_store) that the optimizer loads instead of the rows; without it, an
+    array stored earlier for an uploaded kind is removed so the new rows are read
+    Returns:
+        tuple: (errors, success_messages, warnings about skipped invalid rows)
+    """
     errors = []
     success_messages = []
+    warnings = []
     
     if not project_id:
-        return ["No project ID selected"], []
+        return ["No project ID selected"], [], []
+    
+    profile_id = st.session_state.profile_id
+    entries_by_kind = {
+        "wind": wind_entries,
+        "solar": solar_entries,
+        "battery": battery_entries,
+        "demand": demand_entries
+    }
+    uploads = [
+        (kind, entry) for kind, entries in entries_by_kind.items()
+        for entry in entries if profile_has_data(kind, entry) and entry.get("file")
+    ]
+    # Session state is not available in the workers, so cached frames and reports are looked up here
+    frames = [get_parsed_frame_cache().get_cached(entry["file"], entry["filename"]) for _, entry in uploads]
+    quality_reports = [get_quality_report(kind, entry) for kind, entry in uploads]
     
     conn = get_connection()
     cursor = conn.cursor()
+    published = False
+    array_files = []
+    progress_bar = st.progress(0.0, text="Saving profiles...")
     
     try:
-        profile_id = st.session_state.profile_id
+        ensure_staging_tables(cursor)
+        ensure_quality_table(cursor)
+        ensure_profile_array_table(cursor)
         
-        wind_has_data = False
-        for idx, entry in enumerate(wind_entries):
-            if any([entry.get("manufacturer", ""), entry.get("model", ""), entry.get("capacity", ""), entry.get("filename", "")]):
-                wind_has_data = True
-                cursor.execute("""
-                    INSERT INTO wind_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    profile_id,
-                    project_id,
-                    entry.get("manufacturer", "") or None,
-                    entry.get("model", "") or None,
-                    float(entry["capacity"]) if entry.get("capacity") else None,
-                    entry.get("filename", "") or None
-                ))
-                
-                if entry.get("file"):
-                    entry["file"].seek(0)
-                    if entry["filename"].lower().endswith('.csv'):
-                        df = pd.read_csv(entry["file"])
-                    else:
-                        df = pd.read_excel(entry["file"])
-                    
-                    datetime_col = find_column_flexible(df, ['datetime', 'date', 'time', 'timestamp', 'hour'])
-                    generation_col = find_column_flexible(df, ['generation', 'gen', 'power', 'output'])
-                    
-                    if datetime_col and generation_col:
-                        for _, row in df.iterrows():
-                            try:
-                                timestamp = pd.to_datetime(row[datetime_col])
-                                generation = float(row[generation_col])
-                                cursor.execute("""
-                                    INSERT INTO wind_profile_data (project_id, profile_id, timestamp, generation)
-                                    VALUES (%s, %s, %s, %s)
-                                """, (project_id, profile_id, timestamp, generation))
-                            except (ValueError, TypeError, pd.errors.ParserError) as e:
-                                print(f"Skipping invalid row in wind data: {e}")
-                                continue
+        stored_profiles = {}
+        if append:
+            for kind in dict.fromkeys(kind for kind, _ in uploads):
+                stored_profiles[kind] = fetch_stored_profile(cursor, kind, project_id, profile_id)
         
-        if not wind_has_data:
-            cursor.execute("""
-                INSERT INTO wind_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (profile_id, project_id, None, None, None, None))
-            
-            cursor.execute("""
-                INSERT INTO wind_profile_data (project_id, profile_id, timestamp, generation)
-                VALUES (%s, %s, %s, %s)
-            """, (project_id, profile_id, None, None))
+        progress = {}
+        ingestions = []
+        if uploads:
+            with ThreadPoolExecutor(max_workers=min(len(uploads), INGEST_WORKERS)) as executor:
+                futures = [
+                    executor.submit(stage_profile_upload, kind, project_id, profile_id, entry["file"],
+                                    entry["filename"], frame, stored_profiles.get(kind), progress, index)
+                    for index, ((kind, entry), frame) in enumerate(zip(uploads, frames))
+                ]
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=0.2)
+                    fraction = sum(progress.get(index, (0.0, 0))[0] for index in range(len(futures))) / len(futures)
+                    rows_read = sum(rows for _, rows in list(progress.values()))
+                    progress_bar.progress(fraction, text=f"Staging {len(futures)} files: {rows_read:,} rows read")
+            ingestions = [future.result() for future in futures]
         
-        solar_has_data = False
-        for idx, entry in enumerate(solar_entries):
-            if any([entry.get("manufacturer", ""), entry.get("model", ""), entry.get("capacity", ""), entry.get("filename", "")]):
-                solar_has_data = True
-                cursor.execute("""
-                    INSERT INTO solar_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    profile_id,
-                    project_id,
-                    entry.get("manufacturer", "") or None,
-                    entry.get("model", "") or None,
-                    float(entry["capacity"]) if entry.get("capacity") else None,
-                    entry.get("filename", "") or None
-                ))
-                
-                if entry.get("file"):
-                    entry["file"].seek(0)
-                    if entry["filename"].lower().endswith('.csv'):
-                        df = pd.read_csv(entry["file"])
-                    else:
-                        df = pd.read_excel(entry["file"])
-                    
-                    datetime_col = find_column_flexible(df, ['datetime', 'date', 'time', 'timestamp', 'hour'])
-                    generation_col = find_column_flexible(df, ['generation', 'gen', 'power', 'output'])
-                    
-                    if datetime_col and generation_col:
-                        for _, row in df.iterrows():
-                            try:
-                                timestamp = pd.to_datetime(row[datetime_col])
-                                generation = float(row[generation_col])
-                                cursor.execute("""
-                                    INSERT INTO solar_profile_data (project_id, profile_id, timestamp, generation)
-                                    VALUES (%s, %s, %s, %s)
-                                """, (project_id, profile_id, timestamp, generation))
-                            except (ValueError, TypeError, pd.errors.ParserError) as e:
-                                print(f"Skipping invalid row in solar data: {e}")
-                                continue
+        progress_bar.progress(1.0, text="Publishing profiles...")
+        native_resolutions = {}
+        for (kind, entry), ingestion in zip(uploads, ingestions):
+            warnings.append(format_invalid_rows(
+                kind, entry["filename"], ingestion["invalid_rows"], total=ingestion["invalid_count"]
+            ))
+            native = ingestion["native_resolution"]
+            if native is not None:
+                native_resolutions[kind] = min(native_resolutions.get(kind, native), native)
         
-        if not solar_has_data:
-            cursor.execute("""
-                INSERT INTO solar_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (profile_id, project_id, None, None, None, None))
-            
-            cursor.execute("""
-                INSERT INTO solar_profile_data (project_id, profile_id, timestamp, generation)
-                VALUES (%s, %s, %s, %s)
-            """, (project_id, profile_id, None, None))
+        # Several files of one kind share the profile and are completed together
+        uploaded_kinds = list(dict.fromkeys(kind for kind, _ in uploads))
+        for kind in uploaded_kinds:
+            summary = stage_hourly_gaps(cursor, kind, project_id, profile_id, native_resolutions.get(kind), append)
+            if summary["hours"]:
+                warnings.append(describe_alignment(kind, summary))
         
-        battery_has_data = False
-        for idx, entry in enumerate(battery_entries):
-            if any([entry.get("manufacturer", ""), entry.get("model", ""), entry.get("capacity", ""), entry.get("filename", "")]):
-                battery_has_data = True
-                cursor.execute("""
-                    INSERT INTO battery_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    profile_id,
-                    project_id,
-                    entry.get("manufacturer", "") or None,
-                    entry.get("model", "") or None,
-                    float(entry["capacity"]) if entry.get("capacity") else None,
-                    entry.get("filename", "") or None
-                ))
-                
-                if entry.get("file"):
-                    entry["file"].seek(0)
-                    if entry["filename"].lower().endswith('.csv'):
-                        df = pd.read_csv(entry["file"])
-                    else:
-                        df = pd.read_excel(entry["file"])
-                    
-                    datetime_col = find_column_flexible(df, ['datetime', 'date', 'time', 'timestamp', 'hour'])
-                    generation_col = find_column_flexible(df, ['generation', 'gen', 'power', 'output', 'capacity'])
-                    
-                    if datetime_col and generation_col:
-                        for _, row in df.iterrows():
-                            try:
-                                timestamp = pd.to_datetime(row[datetime_col])
-                                generation = float(row[generation_col])
-                                cursor.execute("""
-                                    INSERT INTO battery_profile_data (project_id, profile_id, timestamp, generation)
-                                    VALUES (%s, %s, %s, %s)
-                                """, (project_id, profile_id, timestamp, generation))
-                            except (ValueError, TypeError, pd.errors.ParserError) as e:
-                                print(f"Skipping invalid row in battery data: {e}")
-                                continue
+        for kind in stored_profiles:
+            added, replaced = upsert_staged_profile(cursor, kind, project_id, profile_id)
+            success_messages.append(f"{kind.title()}: {added:,} rows added, {replaced:,} rows updated")
         
-        if not battery_has_data:
-            cursor.execute("""
-                INSERT INTO battery_profile (id, project_id, manufacturer, model, capacity_mwh, file_name)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (profile_id, project_id, None, None, None, None))
-            
-            cursor.execute("""
-                INSERT INTO battery_profile_data (project_id, profile_id, timestamp, generation)
-                VALUES (%s, %s, %s, %s)
-            """, (project_id, profile_id, None, None))
+        for kind, entries in ([] if append else entries_by_kind.items()):
+            kind_entries = [entry for entry in entries if profile_has_data(kind, entry)]
+            for entry in kind_entries:
+                insert_profile_metadata(cursor, kind, project_id, profile_id, entry)
+            if kind_entries:
+                publish_staged_profile(cursor, kind, project_id, profile_id)
+            else:
+                table, value_column, _, _ = PROFILE_TABLES[kind]
+                insert_profile_metadata(cursor, kind, project_id, profile_id, {})
+                cursor.execute(f"""
+                    INSERT INTO {table} (project_id, profile_id, timestamp, {value_column})
+                    VALUES (%s, %s, %s, %s)
+                """, (project_id, profile_id, None, None))
         
-        demand_has_data = False
-        for idx, entry in enumerate(demand_entries):
-            if entry.get("filename", ""):
-                demand_has_data = True
-                cursor.execute("""
-                    INSERT INTO demand_profile (id, project_id, file_name)
-                    VALUES (%s, %s, %s)
-                """, (profile_id, project_id, entry.get("filename", "") or None))
-                
-                if entry.get("file"):
-                    entry["file"].seek(0)
-                    if entry["filename"].lower().endswith('.csv'):
-                        df = pd.read_csv(entry["file"])
-                    else:
-                        df = pd.read_excel(entry["file"])
-                    
-                    datetime_col = find_column_flexible(df, ['hour', 'datetime', 'date', 'time', 'timestamp'])
-                    demand_col = find_column_flexible(df, ['demand', 'load', 'consumption', 'usage'])
-                    
-                    if datetime_col and demand_col:
-                        for _, row in df.iterrows():
-                            try:
-                                timestamp = pd.to_datetime(row[datetime_col])
-                                demand = float(row[demand_col])
-                                cursor.execute("""
-                                    INSERT INTO demand_profile_data (project_id, profile_id, timestamp, demand)
-                                    VALUES (%s, %s, %s, %s)
-                                """, (project_id, profile_id, timestamp, demand))
-                            except (ValueError, TypeError, pd.errors.ParserError) as e:
-                                print(f"Skipping invalid row in demand data: {e}")
-                                continue
+        for (kind, entry), report in zip(uploads, quality_reports):
+            if report is not None:
+                save_quality_report(cursor, project_id, profile_id, kind, entry["filename"], report)
         
-        if not demand_has_data:
-            cursor.execute("""
-                INSERT INTO demand_profile (id, project_id, file_name)
-                VALUES (%s, %s, %s)
-            """, (profile_id, project_id, None))
-            
-            cursor.execute("""
-                INSERT INTO demand_profile_data (project_id, profile_id, timestamp, demand)
-                VALUES (%s, %s, %s, %s)
-            """, (project_id, profile_id, None, None))
+        for kind in uploaded_kinds:
+            written = None
+            if columnar_store:
+                grid = fetch_profile_grid(cursor, kind, project_id, profile_id)
+                if not grid.empty:
+                    written = write_profile_array(cursor, kind, project_id, profile_id, grid)
+            # An array kept from an earlier save would be loaded instead of the rows just saved
+            array_files.append(written or drop_profile_array(cursor, kind, project_id, profile_id))
         
         conn.commit()
+        published = True
+        invalidate(PROFILES)
         success_messages.append("All profiles saved successfully!")
     except Exception as e:
         conn.rollback()
         errors.append(f"Database error: {str(e)}")
     finally:
+        finish_profile_arrays(array_files, committed=published)
+        if not published:
+            try:
+                discard_staged_profiles(cursor, project_id, profile_id)
+                conn.commit()
+            except DatabaseError:
+                pass
         cursor.close()
         conn.close()
+        progress_bar.empty()
     
-    return errors, success_messages
+    return errors, success_messages, [warning for warning in warnings if warning]
 
 for key in ["wind_model_sets", "solar_model_sets", "battery_model_sets", "demand_model_sets"]:
     if key not in st.session_state:
@@ -549,7 +555,7 @@ with col2:
     st.text_input("Project Description", value=description, disabled=True)
 with col3:
     if "profile_id" not in st.session_state:
-        st.session_state.profile_id = get_next_profile_id()
+        st.session_state.profile_id = peek_next_profile_id()
     st.text_input("Current Profile ID", value=str(st.session_state.profile_id), disabled=True)
 
 tabs = st.tabs(["Wind Load Profile", "Solar Load Profile", "Battery", "Demand"])
@@ -639,13 +645,9 @@ with tabs[0]:
         
         if entry["file"]:
             try:
-                entry["file"].seek(0)
-                if entry["filename"].lower().endswith('.csv'):
-                    df = pd.read_csv(entry["file"])
-                else:
-                    df = pd.read_excel(entry["file"])
-                st.dataframe(df.head(10), use_container_width=True, hide_index=True)
-                entry["file"].seek(0)
+                df = get_parsed_frame_cache().preview(entry["file"], entry["filename"])
+                st.dataframe(df, use_container_width=True, hide_index=True)
+                render_quality_report("wind", entry)
             except Exception as e:
                 st.error(f"Error previewing file: {e}")
 
@@ -743,13 +745,9 @@ with tabs[1]:
 
         if entry["file"]:
             try:
-                entry["file"].seek(0)
-                if entry["filename"].lower().endswith('.csv'):
-                    df = pd.read_csv(entry["file"])
-                else:
-                    df = pd.read_excel(entry["file"])
-                st.dataframe(df.head(10), use_container_width=True, hide_index=True)
-                entry["file"].seek(0)
+                df = get_parsed_frame_cache().preview(entry["file"], entry["filename"])
+                st.dataframe(df, use_container_width=True, hide_index=True)
+                render_quality_report("solar", entry)
             except Exception as e:
                 st.error(f"Error previewing file: {e}")
 
@@ -846,13 +844,9 @@ with tabs[2]:
                 
         if entry["file"]:
             try:
-                entry["file"].seek(0)
-                if entry["filename"].lower().endswith('.csv'):
-                    df = pd.read_csv(entry["file"])
-                else:  # Excel file
-                    df = pd.read_excel(entry["file"])
-                st.dataframe(df.head(10), use_container_width=True, hide_index=True)
-                entry["file"].seek(0)
+                df = get_parsed_frame_cache().preview(entry["file"], entry["filename"])
+                st.dataframe(df, use_container_width=True, hide_index=True)
+                render_quality_report("battery", entry)
             except Exception as e:
                 st.error(f"Error previewing file: {e}")
 
@@ -930,13 +924,9 @@ with tabs[3]:
 
         if entry["file"]:
             try:
-                entry["file"].seek(0)
-                if entry["filename"].lower().endswith('.csv'):
-                    df = pd.read_csv(entry["file"])
-                else:  # Excel file
-                    df = pd.read_excel(entry["file"])
-                st.dataframe(df.head(10), use_container_width=True, hide_index=True)
-                entry["file"].seek(0)
+                df = get_parsed_frame_cache().preview(entry["file"], entry["filename"])
+                st.dataframe(df, use_container_width=True, hide_index=True)
+                render_quality_report("demand", entry)
             except Exception as e:
                 st.error(f"Error previewing file: {e}")
 
@@ -974,26 +964,55 @@ def check_mandatory_files_uploaded():
 
 st.markdown("---")
 col1, col2 = st.columns([3, 1])
+with col1:
+    save_mode = st.radio(
+        "Save Mode", ["New profile", "Append to existing profile"], horizontal=True, key="save_mode",
+        help="Append diffs the uploads against a saved profile and writes only new or changed rows"
+    )
+    append_profile_id = None
+    if save_mode == "Append to existing profile":
+        existing_profile_ids = get_profile_ids(selected_project_id) if selected_project_id else []
+        append_profile_id = st.selectbox("Profile ID", existing_profile_ids, key="append_profile_id")
+    columnar_store = st.checkbox(
+        "Store profiles as columnar arrays", value=True, key="columnar_store",
+        help="Also saves each profile as one compact array file, which the optimizer loads in a single read"
+    )
 with col2:
     if st.button("**Save All Profiles**", key="save_all_button", use_container_width=True):
         if not selected_project_id:
             st.error("Please select a Project ID")
         else:
             demand_uploaded, solar_or_wind_uploaded = check_mandatory_files_uploaded()
+            append = save_mode == "Append to existing profile"
+            ready_to_save = False
             
-            if not demand_uploaded:
+            if append:
+                if append_profile_id is None:
+                    st.warning("⚠️ This project has no saved profile to append to.")
+                elif not (demand_uploaded or solar_or_wind_uploaded or any(
+                    entry.get("file") is not None for entry in st.session_state["battery_model_sets"]
+                )):
+                    st.warning("⚠️ Please upload at least one profile file to append.")
+                else:
+                    st.session_state.profile_id = append_profile_id
+                    ready_to_save = True
+            elif not demand_uploaded:
                 st.warning("⚠️ Please upload demand file before saving.")
             elif not solar_or_wind_uploaded:
                 st.warning("⚠️ Please upload at least one solar or wind profile file before saving.")
             else:
                 st.session_state.profile_id = get_next_profile_id()
-                
-                errors, success_messages = save_all_profiles(
+                ready_to_save = True
+            
+            if ready_to_save:
+                errors, success_messages, warnings = save_all_profiles(
                     selected_project_id,
                     st.session_state["wind_model_sets"],
                     st.session_state["solar_model_sets"],
                     st.session_state["battery_model_sets"],
-                    st.session_state["demand_model_sets"]
+                    st.session_state["demand_model_sets"],
+                    columnar_store=columnar_store,
+                    append=append
                 )
                 
                 if errors:
@@ -1003,4 +1022,6 @@ with col2:
                 if success_messages:
                     for msg in success_messages:
                         st.success(msg)
-                    
\ No newline at end of file
+                
+                for warning in warnings:
+                    st.warning(warning)
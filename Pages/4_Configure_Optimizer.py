@@ -1,12 +1,26 @@
 import streamlit as st
-import mysql.connector
 from datetime import datetime
 import os
 import pandas as pd
 import sys
 import math
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'optimization'))
-from optimization.capacity_planning_lp import optimize_generation_capacity
+from optimization.capacity_planning_lp import optimize_generation_capacity, optimize_generation_capacity_sparse
+from optimization.hourly_capacity_lp import (
+    align_profiles, normalize_generation_shape, optimize_hourly_capacity, HOURS_PER_YEAR
+)
+from optimization.battery_dispatch_lp import optimize_battery_dispatch
+from optimization.rolling_horizon import solve_rolling_horizon, validate_rolling_horizon
+from optimization.solver_backends import available_backends
+from optimization.integer_sizing import optimize_unit_counts
+from optimization.portfolio_optimizer import optimize_portfolio
+from optimization.persistent_capacity_lp import get_persistent_optimizer
+from optimization.time_series_aggregation import evaluate_aggregation, optimize_representative_capacity
+from utils.profile_store import get_profile_array_entries, load_profile_array
+from utils.profile_alignment import align_profile_frame
+from utils.id_sequences import allocate_id, peek_next_id, run_number_sequence, RUN_NUMBER_SEED_QUERY
+from utils.db import get_connection, DatabaseError
+from utils.lookup_cache import cached_lookup, PROJECTS
 
 default_inputs = {
     "Parameter": [
@@ -24,14 +38,7 @@ default_inputs = {
     "Wind": [52500, 0, 1000, 25, 29.15, 0, 9.53, 30, 17.60, 10, 1, 10.55, 0.968, 5.72, 0.64, 1, 2, 11.55, 25, 3.60, 85, 0, 95, 1000]
 }
 
-def get_connection():
-    return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='*******', #Enter password
-        database='imdb'
-    )
-
+@cached_lookup(PROJECTS)
 def get_project_ids():
     conn = get_connection()
     cursor = conn.cursor()
@@ -42,14 +49,34 @@ def get_project_ids():
     return projects
 
 def get_next_run_number(project_id):
+    """
+    Reserve the next run number of a project from the id_sequences counter
+    Each call hands out a new number, so concurrent sessions never share a run
+    """
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT MAX(run_number) FROM run_config WHERE project_id = %s", (project_id,))
-    max_run = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
-    
-    return 0 if max_run is None else max_run + 1
+    try:
+        return allocate_id(conn, run_number_sequence(project_id), RUN_NUMBER_SEED_QUERY, (project_id,))
+    finally:
+        conn.close()
+
+def peek_next_run_number(project_id):
+    """Run number the next run of a project is expected to get, for display only"""
+    conn = get_connection()
+    try:
+        return peek_next_id(conn, run_number_sequence(project_id), RUN_NUMBER_SEED_QUERY, (project_id,))
+    finally:
+        conn.close()
+
+def reserve_run_number(project_id):
+    """
+    Run number of the current run, reserved on first use
+    Called when inputs or results are first saved, so browsing the page or switching
+    projects does not use up numbers
+    """
+    if st.session_state.get('current_run_number') is None:
+        st.session_state.current_run_number = get_next_run_number(project_id)
+        st.session_state.pop('run_number_preview', None)
+    return st.session_state.current_run_number
 
 def save_general_inputs(project_id, run_number, tech_data, profile_id=None):
     conn = get_connection()
@@ -360,51 +387,251 @@ def load_saved_inputs_to_session(project_id, run_number):
     st.session_state['run_number'] = run_number
     
     return True
+def get_stored_profile_arrays(cursor, project_id, profile_id):
+    """
+    Returns the columnar profile entries of a profile, or {} when none were stored
+    (including databases created before the profile_array_store table existed)
+    """
+    try:
+        return get_profile_array_entries(cursor, project_id, profile_id)
+    except DatabaseError:
+        return {}
+
+def get_profile_rows(cursor, table, value_column, project_id, profile_id):
+    """
+    Reads the stored rows of one profile
+    Profiles saved aligned come back with their 'gap_flag' column; rows saved before
+    that (or before the column existed) come back without it, for the caller to align
+    """
+    query = """
+        SELECT timestamp, {columns}
+        FROM {table}
+        WHERE project_id = %s AND profile_id = %s AND timestamp IS NOT NULL
+        ORDER BY timestamp
+    """
+    try:
+        cursor.execute(query.format(columns=f"{value_column}, gap_flag", table=table), (project_id, profile_id))
+    except DatabaseError:
+        cursor.execute(query.format(columns=value_column, table=table), (project_id, profile_id))
+    df = pd.DataFrame(cursor.fetchall())
+    if 'gap_flag' in df.columns:
+        if df['gap_flag'].isna().any():
+            return df.drop(columns='gap_flag')
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df[value_column] = pd.to_numeric(df[value_column])
+    return df
+
 def get_profile_data(project_id, profile_id):
     """
     Retrieve profile data for demand, solar, and wind generation
-    Returns DataFrames with hourly data
+    Profiles are stored on the canonical hourly grid: memory-mapped from their array file
+    when saved to the columnar store, otherwise read from the row tables. Profiles saved
+    before alignment was stored are aligned here (utils.profile_alignment)
+    Returns DataFrames with one row per hour and a 'gap_flag' column
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
+    stored_arrays = get_stored_profile_arrays(cursor, project_id, profile_id)
+    
+    frames = []
+    for kind, table, value_column in [
+        ("demand", "demand_profile_data", "demand"),
+        ("solar", "solar_profile_data", "generation"),
+        ("wind", "wind_profile_data", "generation")
+    ]:
+        df = load_profile_array(stored_arrays[kind], value_column) if kind in stored_arrays else None
+        if df is None:
+            df = get_profile_rows(cursor, table, value_column, project_id, profile_id)
+        if 'gap_flag' not in df.columns:
+            df = align_profile_frame(df, value_column)
+        frames.append(df)
     
-    # Get demand data
-    demand_query = """
-        SELECT timestamp, demand 
-        FROM demand_profile_data 
-        WHERE project_id = %s AND profile_id = %s 
-        ORDER BY timestamp
-    """
-    cursor.execute(demand_query, (project_id, profile_id))
-    demand_data = cursor.fetchall()
-    demand_df = pd.DataFrame(demand_data)
-    
-    # Get solar generation data
-    solar_query = """
-        SELECT timestamp, generation 
-        FROM solar_profile_data 
-        WHERE project_id = %s AND profile_id = %s 
-        ORDER BY timestamp
+    cursor.close()
+    conn.close()
+    
+    demand_df, solar_df, wind_df = frames
+    return demand_df, solar_df, wind_df
+
+def get_battery_profile_data(project_id, profile_id):
     """
-    cursor.execute(solar_query, (project_id, profile_id))
-    solar_data = cursor.fetchall()
-    solar_df = pd.DataFrame(solar_data)
-    
-    # Get wind generation data
-    wind_query = """
-        SELECT timestamp, generation 
-        FROM wind_profile_data 
-        WHERE project_id = %s AND profile_id = %s 
-        ORDER BY timestamp
+    Retrieve battery profile rows and the declared battery capacity for a profile
+    Returns (DataFrame with timestamp/generation, capacity in MWh or None)
     """
-    cursor.execute(wind_query, (project_id, profile_id))
-    wind_data = cursor.fetchall()
-    wind_df = pd.DataFrame(wind_data)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    stored_arrays = get_stored_profile_arrays(cursor, project_id, profile_id)
+    battery_df = load_profile_array(stored_arrays["battery"], "generation") if "battery" in stored_arrays else None
+    if battery_df is None:
+        battery_df = get_profile_rows(cursor, "battery_profile_data", "generation", project_id, profile_id)
+    if 'gap_flag' not in battery_df.columns:
+        battery_df = align_profile_frame(battery_df, "generation")
+    
+    cursor.execute("""
+        SELECT SUM(capacity_mwh) AS capacity_mwh 
+        FROM battery_profile 
+        WHERE project_id = %s AND id = %s
+    """, (project_id, profile_id))
+    row = cursor.fetchone()
     
     cursor.close()
     conn.close()
     
-    return demand_df, solar_df, wind_df
+    capacity_mwh = float(row['capacity_mwh']) if row and row['capacity_mwh'] is not None else None
+    return battery_df, capacity_mwh
+
+def get_portfolio_inputs(project_ids):
+    """
+    Collects the latest saved run of each project for portfolio optimization
+    Projects are grouped for transmission limits by their state
+    Returns (list of project dicts, list of skipped project ids)
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    projects = []
+    skipped = []
+
+    for project_id in project_ids:
+        cursor.execute("SELECT state FROM project_config WHERE project_id = %s", (project_id,))
+        config = cursor.fetchone()
+        cursor.execute("""
+            SELECT technology, cuf, system_capex, profile_id
+            FROM Besos_gen_param_in
+            WHERE project_id = %s AND run_number = (
+                SELECT MAX(run_number) FROM Besos_gen_param_in WHERE project_id = %s
+            )
+        """, (project_id, project_id))
+        general = {row['technology']: row for row in cursor.fetchall()}
+        profile_id = next((row['profile_id'] for row in general.values() if row['profile_id'] is not None), None)
+
+        if not general or profile_id is None:
+            skipped.append(project_id)
+            continue
+        demand_df, _, _ = get_profile_data(project_id, profile_id)
+        if demand_df.empty:
+            skipped.append(project_id)
+            continue
+
+        solar = general.get("Solar", {})
+        wind = general.get("Wind", {})
+        projects.append({
+            'project_id': project_id,
+            'demand': demand_df['demand'].astype(float).to_numpy() * 1000,  # Convert MW to kW
+            'solar_cuf': float(solar.get('cuf') or 0) / 100,
+            'wind_cuf': float(wind.get('cuf') or 0) / 100,
+            'solar_capex': float(solar.get('system_capex') or 0),
+            'wind_capex': float(wind.get('system_capex') or 0),
+            'transmission_group': config['state'] if config else None
+        })
+
+    cursor.close()
+    conn.close()
+    return projects, skipped
+
+def get_lcos_battery_inputs(project_id):
+    """
+    Retrieve the battery inputs most recently saved from the LCOS page for a project,
+    falling back to its defaults. The optimizer run being configured has not been through
+    the LCOS page yet, so the latest saved run is used rather than the current run number.
+    Efficiency, depth of discharge and O&M are returned as decimals
+    """
+    inputs = {
+        'roundtrip_efficiency': 0.97,
+        'depth_of_discharge': 0.80,
+        'storage_duration': 4.0,
+        'battery_pack_capital_cost': 20000.0,
+        'o_and_m_pct': 0.01,
+        'cycles_per_year': 730.0,
+        'cycle_life': 4000.0
+    }
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT roundtrip_efficiency, depth_of_discharge, storage_duration, battery_pack_capital_cost,
+               o_and_m_pct, cycles_per_year, cycle_life
+        FROM besos_lcos_in 
+        WHERE project_id = %s
+        ORDER BY run_number DESC
+        LIMIT 1
+    """, (project_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    
+    if row:
+        for key, value in row.items():
+            if value is not None:
+                inputs[key] = float(value)
+    return inputs
+
+def capital_recovery_factor(rate, years):
+    """Fraction of an up-front cost paid each year over `years` at discount `rate` (decimal)"""
+    if years <= 0:
+        return 1.0
+    if rate <= 0:
+        return 1.0 / years
+    return rate / (1 - (1 + rate) ** -years)
+
+def annualized_capacity_cost(capex, life_years, discount_rate, om_fraction):
+    """
+    Yearly cost of one unit of capacity: capital recovery plus fixed O&M
+
+    Args:
+        capex: Up-front cost per unit (per kW for generation, per kWh for battery packs)
+        life_years: Economic life of the asset in years
+        discount_rate: Discount rate as a decimal
+        om_fraction: Yearly O&M as a decimal fraction of capex
+
+    Returns:
+        Annualized cost per unit, in the same currency as capex
+    """
+    return capex * (capital_recovery_factor(discount_rate, life_years) + om_fraction)
+
+def battery_lp_cost_factors(general_inputs, lcos_inputs):
+    """
+    Capacity costs for the battery dispatch LP, relative to 1 kW of wind
+
+    The LP prices solar and wind per kW and battery energy per kWh against the same
+    yearly energy terms, so every cost is annualized before taking the ratio:
+    wind and solar use their plant life, discount rate and year-1 O&M from the general
+    inputs; battery packs use cycle_life / cycles_per_year as their life, the wind
+    discount rate and the LCOS O&M share. The result is annual INR per kWh of battery
+    (or per kW of solar) divided by annual INR per kW of wind.
+
+    Args:
+        general_inputs: Session general inputs keyed by 'Solar' and 'Wind'
+        lcos_inputs: Output of get_lcos_battery_inputs
+
+    Returns:
+        dict with 'solar_cost_factor' and 'battery_energy_cost' for the entries that
+        could be derived; missing entries leave the LP defaults in place
+    """
+    wind = general_inputs.get("Wind", {})
+    solar = general_inputs.get("Solar", {})
+    wind_capex = float(wind.get("system_capex") or 0)
+    if wind_capex <= 0:
+        return {}
+    discount_rate = float(wind.get("discount_rate") or 0) / 100
+    wind_annual = annualized_capacity_cost(
+        wind_capex, float(wind.get("plant_life_years") or 25), discount_rate,
+        float(wind.get("opex_year1") or 0) / 100
+    )
+    factors = {}
+    solar_capex = float(solar.get("system_capex") or 0)
+    if solar_capex > 0:
+        solar_annual = annualized_capacity_cost(
+            solar_capex, float(solar.get("plant_life_years") or 25),
+            float(solar.get("discount_rate") or 0) / 100 or discount_rate,
+            float(solar.get("opex_year1") or 0) / 100
+        )
+        factors['solar_cost_factor'] = solar_annual / wind_annual
+    cycles_per_year = lcos_inputs['cycles_per_year']
+    battery_life = lcos_inputs['cycle_life'] / cycles_per_year if cycles_per_year > 0 else 0
+    battery_annual = annualized_capacity_cost(
+        lcos_inputs['battery_pack_capital_cost'], battery_life, discount_rate, lcos_inputs['o_and_m_pct']
+    )
+    factors['battery_energy_cost'] = battery_annual / wind_annual
+    return factors
 
 def save_plant_size(project_id, profile_id, run_number, technology, given_size, optimized_size):
     """Save plant size data to Plant_size table"""
@@ -498,7 +725,41 @@ def run_capacity_optimization(project_id, profile_id, run_number, selected_techn
         st.error(f"Error in capacity optimization: {str(e)}")
         return False
 
-def get_optimized_plant_sizes(project_id, profile_id, selected_technology):
+# Optimizer options chosen on this page; get_optimized_plant_sizes fills in missing keys from here
+DEFAULT_OPTIMIZER_SETTINGS = {
+    'optimization_mode': "Scalar CUF",
+    'lp_builder': "PuLP",
+    'integer_units': False,
+    'solver_settings': None,
+    'rolling_window': (336, 48),
+    'representative_days': 0,
+    'compare_aggregation': False
+}
+
+# Rolling-horizon objective gap (%) above which the dispatch result is flagged
+ROLLING_GAP_TOLERANCE = 1.0
+
+def get_optimized_plant_sizes(project_id, profile_id, selected_technology, run_number=None, settings=None):
+    """
+    Sizes the plant for the selected profile with the chosen optimization mode
+    Args:
+        project_id: project the profile belongs to
+        profile_id: profile to size against
+        selected_technology: "Hybrid", "Solar" or "Wind"
+        run_number: run the battery results are saved under
+        settings: dict with any of the DEFAULT_OPTIMIZER_SETTINGS keys; integer_units takes
+            precedence over lp_builder in Scalar CUF mode
+    Returns:
+        (results dict, None) or (None, error message)
+    """
+    settings = {**DEFAULT_OPTIMIZER_SETTINGS, **(settings or {})}
+    optimization_mode = settings['optimization_mode']
+    lp_builder = settings['lp_builder']
+    integer_units = settings['integer_units']
+    solver_settings = settings['solver_settings']
+    rolling_window = settings['rolling_window']
+    representative_days = settings['representative_days']
+    compare_aggregation = settings['compare_aggregation']
     try:
         demand_df, solar_df, wind_df = get_profile_data(project_id, profile_id)
         
@@ -536,7 +797,175 @@ def get_optimized_plant_sizes(project_id, profile_id, selected_technology):
             wind_cuf = wind_cuf_general if has_wind_data else 0
         
         # Run optimization
-        solar_capacity, wind_capacity, _ = optimize_generation_capacity(demand_df_opt, solar_cuf, wind_cuf)
+        timings = None
+        hourly_summary = None
+        battery_results = None
+        aggregation_report = None
+        unit_counts = None
+        if optimization_mode == "Hourly Profile + Battery":
+            aligned = align_profiles(demand_df_opt, solar_df, wind_df)
+            if aligned.empty:
+                return None, "Demand and generation profiles share no common timestamps."
+            battery_df, battery_capacity_mwh = get_battery_profile_data(project_id, profile_id)
+            battery_availability = None
+            if not battery_df.empty:
+                battery_series = battery_df.groupby('timestamp')['generation'].mean()
+                battery_availability = normalize_generation_shape(
+                    battery_series.reindex(aligned.index).fillna(1.0).to_numpy()
+                )
+            lcos_inputs = get_lcos_battery_inputs(project_id)
+            
+            # Annualized capacity costs relative to 1 kW of wind, from the general and LCOS inputs
+            cost_factors = battery_lp_cost_factors(st.session_state.general_inputs, lcos_inputs)
+            
+            demand_values = aligned['demand'].to_numpy()
+            solar_shape = normalize_generation_shape(aligned['solar'].to_numpy())
+            wind_shape = normalize_generation_shape(aligned['wind'].to_numpy())
+            
+            # Multi-year profiles are sized on the first year and dispatched with a rolling horizon
+            sizing_hours = min(len(aligned), HOURS_PER_YEAR)
+            battery_result = optimize_battery_dispatch(
+                demand_values[:sizing_hours],
+                solar_shape[:sizing_hours],
+                wind_shape[:sizing_hours],
+                roundtrip_efficiency=lcos_inputs['roundtrip_efficiency'],
+                depth_of_discharge=lcos_inputs['depth_of_discharge'],
+                battery_availability=battery_availability[:sizing_hours] if battery_availability is not None else None,
+                storage_duration=lcos_inputs['storage_duration'],
+                max_battery_energy=battery_capacity_mwh * 1000 if battery_capacity_mwh else None,
+                solar_enabled=selected_technology != "Wind" and has_solar_data,
+                wind_enabled=selected_technology != "Solar" and has_wind_data,
+                **cost_factors
+            )
+            solar_capacity = battery_result['solar_capacity']
+            wind_capacity = battery_result['wind_capacity']
+            timings = battery_result['timings']
+            hourly_summary = {
+                'hours': sizing_hours,
+                'unmet_energy': battery_result['unmet_energy'],
+                'curtailed_energy': battery_result['curtailed_energy']
+            }
+            
+            if len(aligned) > sizing_hours:
+                rolling_result = solve_rolling_horizon(
+                    demand_values, solar_shape, wind_shape,
+                    {
+                        'solar': solar_capacity,
+                        'wind': wind_capacity,
+                        'battery_energy': battery_result['battery_energy_capacity'],
+                        'battery_power': battery_result['battery_power_capacity']
+                    },
+                    roundtrip_efficiency=lcos_inputs['roundtrip_efficiency'],
+                    depth_of_discharge=lcos_inputs['depth_of_discharge'],
+                    battery_availability=battery_availability,
+                    window_hours=rolling_window[0],
+                    overlap_hours=rolling_window[1]
+                )
+                rolling_check = validate_rolling_horizon(
+                    demand_values, solar_shape, wind_shape,
+                    {
+                        'solar': solar_capacity,
+                        'wind': wind_capacity,
+                        'battery_energy': battery_result['battery_energy_capacity'],
+                        'battery_power': battery_result['battery_power_capacity']
+                    },
+                    window_hours=rolling_window[0],
+                    overlap_hours=rolling_window[1],
+                    battery_availability=battery_availability,
+                    roundtrip_efficiency=lcos_inputs['roundtrip_efficiency'],
+                    depth_of_discharge=lcos_inputs['depth_of_discharge']
+                )
+                hourly_summary = {
+                    'hours': len(aligned),
+                    'unmet_energy': rolling_result['unmet_energy'],
+                    'curtailed_energy': rolling_result['curtailed_energy'],
+                    'rolling_windows': rolling_result['windows'],
+                    'rolling_seconds': rolling_result['runtime_seconds'],
+                    'rolling_gap': rolling_check['objective_gap'],
+                    'rolling_validation_hours': rolling_check['validation_hours']
+                }
+            battery_results = {
+                'energy_capacity': battery_result['battery_energy_capacity'],
+                'power_capacity': battery_result['battery_power_capacity'],
+                'roundtrip_efficiency': lcos_inputs['roundtrip_efficiency'],
+                'depth_of_discharge': lcos_inputs['depth_of_discharge']
+            }
+        elif optimization_mode == "Hourly Profile Shape":
+            aligned = align_profiles(demand_df_opt, solar_df, wind_df)
+            if aligned.empty:
+                return None, "Demand and generation profiles share no common timestamps."
+            demand_values = aligned['demand'].to_numpy()
+            solar_shape = normalize_generation_shape(aligned['solar'].to_numpy())
+            wind_shape = normalize_generation_shape(aligned['wind'].to_numpy())
+            lp_kwargs = {
+                'solar_enabled': selected_technology != "Wind" and has_solar_data,
+                'wind_enabled': selected_technology != "Solar" and has_wind_data
+            }
+            
+            # Representative days stand in for the full profile, weighted by the days they cover
+            if representative_days > 0:
+                hourly_result = optimize_representative_capacity(
+                    demand_values, solar_shape, wind_shape, representative_days,
+                    profile_id=(project_id, profile_id), **lp_kwargs
+                )
+            else:
+                hourly_result = optimize_hourly_capacity(demand_values, solar_shape, wind_shape, **lp_kwargs)
+            solar_capacity = hourly_result['solar_capacity']
+            wind_capacity = hourly_result['wind_capacity']
+            timings = hourly_result['timings']
+            hourly_summary = {
+                'hours': len(hourly_result['hourly']),
+                'unmet_energy': hourly_result['unmet_energy'],
+                'curtailed_energy': hourly_result['curtailed_energy']
+            }
+            if representative_days > 0:
+                hourly_summary['representative_days'] = len(hourly_result['clusters']['day_indices'])
+                hourly_summary['cluster_seconds'] = timings['cluster_seconds']
+                if compare_aggregation:
+                    aggregation_report = evaluate_aggregation(
+                        demand_values, solar_shape, wind_shape,
+                        k_values=sorted({4, 8, 12, 24, int(representative_days)}),
+                        profile_id=(project_id, profile_id), **lp_kwargs
+                    )
+        elif integer_units:
+            # Inverter and turbine counts are integer variables instead of rounded-up LP capacities
+            unit_result = optimize_unit_counts(
+                demand_df_opt['Demand'].to_numpy(dtype=float), solar_cuf, wind_cuf,
+                solar_inverter_capacity, wind_turbine_capacity, **(solver_settings or {})
+            )
+            if not unit_result['solver']['feasible']:
+                return None, ("No whole number of inverters/turbines satisfies the demand and generation limits. "
+                              "Try smaller unit capacities or the continuous sizing.")
+            solar_capacity = unit_result['solar_capacity']
+            wind_capacity = unit_result['wind_capacity']
+            timings = unit_result['timings']
+            unit_counts = (unit_result['solar_inverters'], unit_result['wind_turbines'])
+        elif lp_builder == "Persistent (Warm Start)":
+            # The built model is kept per profile in the session and only its inputs change between runs
+            if 'persistent_optimizers' not in st.session_state:
+                st.session_state.persistent_optimizers = {}
+            optimizer = get_persistent_optimizer(
+                st.session_state.persistent_optimizers, (project_id, profile_id),
+                demand_df_opt['Demand'].to_numpy(dtype=float), solar_cuf, wind_cuf
+            )
+            solar_capacity, wind_capacity, timings = optimizer.solve()
+        elif lp_builder == "Sparse Matrix (HiGHS)":
+            solar_capacity, wind_capacity, _, timings = optimize_generation_capacity_sparse(demand_df_opt, solar_cuf, wind_cuf)
+        else:
+            solar_capacity, wind_capacity, result_df = optimize_generation_capacity(
+                demand_df_opt, solar_cuf, wind_cuf, **(solver_settings or {})
+            )
+            solver_report = result_df.attrs['solver']
+            timings = {
+                'build_seconds': solver_report['build_seconds'],
+                'solve_seconds': solver_report['seconds'],
+                'status': f"{solver_report['backend']}: {solver_report['solution_status']}",
+                'hit_time_limit': solver_report['hit_time_limit'],
+                'feasible': solver_report['feasible']
+            }
+        if timings is not None and timings.get('feasible') is False:
+            return None, (f"The capacity LP has no solution ({timings['status']}). "
+                          "Check the CUF values and the demand band and generation limits.")
         
         # Calculate number of inverters and turbines
         solar_inverters = 0
@@ -548,6 +977,9 @@ def get_optimized_plant_sizes(project_id, profile_id, selected_technology):
         if wind_capacity > 0 and wind_turbine_capacity > 0:
             wind_turbines = math.ceil(wind_capacity / wind_turbine_capacity)
         
+        if unit_counts is not None:
+            solar_inverters, wind_turbines = unit_counts
+        
         return {
             'solar_capacity': solar_capacity,
             'wind_capacity': wind_capacity,
@@ -555,14 +987,21 @@ def get_optimized_plant_sizes(project_id, profile_id, selected_technology):
             'wind_turbines': wind_turbines,
             'solar_inverter_capacity': solar_inverter_capacity,
             'wind_turbine_capacity': wind_turbine_capacity,
-            'technology': selected_technology
+            'technology': selected_technology,
+            'timings': timings,
+            'hourly_summary': hourly_summary,
+            'battery': battery_results,
+            'aggregation_report': aggregation_report
         }, None
         
     except Exception as e:
         return None, f"Error in optimization: {str(e)}"
 
 def calculate_cuf_from_profiles(project_id, profile_id):
-    """Calculate CUF based on uploaded generation profiles"""
+    """
+    Calculate CUF based on uploaded generation profiles
+    get_profile_data returns the hourly-aligned grid, so each row is one hour
+    """
     try:
         demand_df, solar_df, wind_df = get_profile_data(project_id, profile_id)
         
@@ -638,6 +1077,13 @@ def save_optimized_plant_sizes(project_id, profile_id, run_number, optimization_
             wind_given_size, optimization_results['wind_capacity']
         ))
         
+        # Save BESS energy capacity when the battery-coupled mode was used
+        if optimization_results.get('battery'):
+            cursor.execute(query, (
+                project_id, profile_id, run_number, "BESS", 
+                0, optimization_results['battery']['energy_capacity']
+            ))
+        
         conn.commit()
         cursor.close()
         conn.close()
@@ -712,6 +1158,7 @@ def convert_inputs_to_dataframe():
 st.set_page_config(page_title="Optimizer Summary", layout="wide")
 st.title("Optimizer Summary")
 
+@cached_lookup(PROJECTS)
 def get_project_name(project_id):
     """Retrieve project name from project_config table based on project_id"""
     conn = get_connection()
@@ -749,18 +1196,28 @@ with col3:
     st.text_input("Profile ID", value=profile_display, disabled=True, key="profile_id_display")
     
 with col4:
+    # The run number is reserved when the run is first saved (reserve_run_number); until then
+    # the number it is expected to get is shown
     if 'current_run_number' not in st.session_state:
-        st.session_state.current_run_number = get_next_run_number(project_id) if project_id else 0
+        st.session_state.current_run_number = None
     
-    # Update run number if project changes
+    # Start a new run if project changes
     if 'last_project_id' not in st.session_state:
         st.session_state.last_project_id = project_id
     elif st.session_state.last_project_id != project_id:
-        st.session_state.current_run_number = get_next_run_number(project_id) if project_id else 0
+        st.session_state.current_run_number = None
         st.session_state.last_project_id = project_id
     
-    st.text_input("Run#", value=str(st.session_state.current_run_number), disabled=True, key="run_number_display")
     run_number = st.session_state.current_run_number
+    if run_number is None:
+        preview = st.session_state.get('run_number_preview')
+        if preview is None or preview[0] != project_id:
+            preview = (project_id, peek_next_run_number(project_id) if project_id else 0)
+            st.session_state.run_number_preview = preview
+        run_display = preview[1]
+    else:
+        run_display = run_number
+    st.text_input("Run#", value=str(run_display), disabled=True, key="run_number_display")
     
 with col5:
     run_date_input = st.date_input("Date", datetime.today(), key="run_date_input")
@@ -789,6 +1246,99 @@ selected_technology = st.selectbox(
     key="selected_technology"
 )
 
+opt_col1, opt_col2 = st.columns(2)
+with opt_col1:
+    optimization_mode = st.selectbox(
+        "Optimization Mode",
+        ["Scalar CUF", "Hourly Profile Shape", "Hourly Profile + Battery"],
+        key="optimization_mode",
+        help="Hourly Profile Shape uses each hour of the uploaded solar/wind profiles instead of one CUF"
+    )
+
+# Read before the builder selectbox renders, since integer sizing replaces the LP builder
+integer_units = optimization_mode == "Scalar CUF" and st.session_state.get("integer_units", False)
+with opt_col2:
+    lp_builder = st.selectbox(
+        "LP Model Builder",
+        ["PuLP", "Sparse Matrix (HiGHS)", "Persistent (Warm Start)"],
+        key="lp_builder",
+        disabled=optimization_mode != "Scalar CUF" or integer_units,
+        help="Sparse Matrix builds the hourly constraints in one vectorized pass and solves with HiGHS. "
+             "Persistent keeps the model for the profile and re-solves from the last basis when inputs change. "
+             "Not used with Integer Unit Sizing, which solves its own MILP."
+    )
+
+rolling_window = (336, 48)
+if optimization_mode == "Hourly Profile + Battery":
+    roll_col1, roll_col2 = st.columns(2)
+    with roll_col1:
+        rolling_window_hours = st.number_input(
+            "Rolling Window (hours)", min_value=24, value=336, step=24, key="rolling_window_hours",
+            help="Profiles longer than one year are sized on the first year and dispatched in overlapping windows"
+        )
+    with roll_col2:
+        rolling_overlap_hours = st.number_input(
+            "Window Overlap (hours)", min_value=0, max_value=int(rolling_window_hours) - 1, value=48, step=1,
+            key="rolling_overlap_hours"
+        )
+    rolling_window = (int(rolling_window_hours), int(rolling_overlap_hours))
+
+integer_units = False
+if optimization_mode == "Scalar CUF":
+    integer_units = st.checkbox(
+        "Integer Unit Sizing", key="integer_units",
+        help="Sizes whole numbers of inverters and turbines from the Inverter/Turbine Capacity inputs "
+             "instead of rounding the continuous capacities up"
+    )
+
+solver_settings = None
+if optimization_mode == "Scalar CUF" and (lp_builder == "PuLP" or integer_units):
+    solver_col1, solver_col2, solver_col3, solver_col4 = st.columns(4)
+    with solver_col1:
+        solver_backend = st.selectbox(
+            "Solver Backend", ["Auto"] + available_backends(), key="solver_backend",
+            help="Auto benchmarks the installed solvers once and uses the fastest for this model size"
+        )
+    with solver_col2:
+        solver_time_limit = st.number_input(
+            "Solver Time Limit (s, 0 = none)", min_value=0, value=0, step=10, key="solver_time_limit",
+            help="When the limit is reached the best feasible solution found so far is returned"
+        )
+    with solver_col3:
+        solver_threads = st.number_input(
+            "Solver Threads (0 = default)", min_value=0, value=0, step=1, key="solver_threads"
+        )
+    with solver_col4:
+        solver_mip_gap = st.number_input(
+            "MIP Gap (%, 0 = solver default)", min_value=0.0, max_value=100.0, value=0.0, step=0.1,
+            key="solver_mip_gap", disabled=not integer_units,
+            help="Relative optimality gap at which Integer Unit Sizing stops; the continuous LP has no gap"
+        )
+    solver_settings = {
+        'backend': solver_backend,
+        'time_limit': int(solver_time_limit) or None,
+        'mip_gap': solver_mip_gap / 100 if integer_units and solver_mip_gap > 0 else None,
+        'threads': int(solver_threads) or None
+    }
+
+representative_days = 0
+compare_aggregation = False
+if optimization_mode == "Hourly Profile Shape":
+    agg_col1, agg_col2 = st.columns(2)
+    with agg_col1:
+        representative_days = st.number_input(
+            "Representative Days (0 = full resolution)", min_value=0, max_value=365, value=0, step=1,
+            key="representative_days",
+            help="Clusters the profile into typical days and solves on those instead of every hour"
+        )
+    with agg_col2:
+        compare_aggregation = st.checkbox(
+            "Compare against full resolution", key="compare_aggregation",
+            disabled=representative_days == 0,
+            help="Also solves every hour and reports the capacity and unmet-energy drift for several day counts"
+        )
+    representative_days = int(representative_days)
+
 # Create tabs based on technology selection
 if selected_technology == "Solar":
     tabs = st.tabs(["Solar General Inputs", "RE Technical", "Economics", "Financials"])
@@ -1118,8 +1668,8 @@ def save_all_inputs():
         return False
     
     try:
-        # Use the current run number instead of getting next run number
-        current_run_number = run_number
+        # Reuse the run number of this run, reserving it on the first save
+        current_run_number = reserve_run_number(project_id)
         technologies = ["Solar", "Wind"]
         
         # Get profile_id from session state - try multiple possible keys
@@ -1152,9 +1702,6 @@ def save_all_inputs():
         # Save run configuration
         save_run(project_id, current_run_number, datetime.now())
         
-        # Update the session state run number after successful save
-        st.session_state.current_run_number = current_run_number
-        
         st.session_state.inputs_saved = True
         return True
         
@@ -1304,6 +1851,44 @@ if calculate_cuf_clicked:
                 st.success("CUF calculation completed!")
                 st.rerun()
                 
+with st.expander("Portfolio Optimization"):
+    st.caption(
+        "Sizes several projects together under a shared capex budget and per-state transmission limits, "
+        "using each project's latest saved inputs and profile."
+    )
+    portfolio_ids = st.multiselect("Projects", project_ids, key="portfolio_project_ids")
+    portfolio_budget = st.number_input(
+        "Shared Capex Budget (0 = no limit)", min_value=0.0, value=0.0, step=1000000.0, key="portfolio_budget"
+    )
+    portfolio_transmission = st.number_input(
+        "Transmission Limit per State (kW, 0 = no limit)", min_value=0.0, value=0.0, step=1000.0,
+        key="portfolio_transmission"
+    )
+    if st.button("Optimize Portfolio", key="optimize_portfolio", disabled=len(portfolio_ids) < 2):
+        with st.spinner("Optimizing portfolio..."):
+            portfolio_projects, skipped_ids = get_portfolio_inputs(portfolio_ids)
+            if skipped_ids:
+                st.warning(f"Skipped projects without saved inputs or demand profile: {', '.join(map(str, skipped_ids))}")
+            if portfolio_projects:
+                states = {project['transmission_group'] for project in portfolio_projects if project['transmission_group']}
+                try:
+                    portfolio_result = optimize_portfolio(
+                        portfolio_projects,
+                        budget=portfolio_budget or None,
+                        transmission_limits={state: portfolio_transmission for state in states} if portfolio_transmission else None
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    if not portfolio_result['feasible']:
+                        st.error("The budget or transmission limits are too tight for the projects' minimum contributions.")
+                    st.dataframe(portfolio_result['projects'], use_container_width=True)
+                    st.caption(
+                        f"Total capex: {portfolio_result['total_capex']:,.0f} | "
+                        f"{portfolio_result['iterations']} iterations in {portfolio_result['runtime_seconds']:.2f} s | "
+                        f"Gap: {portfolio_result['gap'] * 100:.4f}%"
+                    )
+
 if optimize_clicked:
     profile_id = st.session_state.get('profile_id', None)
     if profile_id is None:
@@ -1315,8 +1900,18 @@ if optimize_clicked:
         st.error("Please select a valid Project ID.")
     else:
         with st.spinner("Calculating optimized plant sizes..."):
+            optimizer_settings = {
+                'optimization_mode': optimization_mode,
+                'lp_builder': lp_builder,
+                'integer_units': integer_units,
+                'solver_settings': solver_settings,
+                'rolling_window': rolling_window,
+                'representative_days': representative_days,
+                'compare_aggregation': compare_aggregation
+            }
+            run_number = reserve_run_number(project_id)
             optimization_results, error_msg = get_optimized_plant_sizes(
-                project_id, profile_id, selected_technology
+                project_id, profile_id, selected_technology, run_number, optimizer_settings
             )
             
             if error_msg:
@@ -1386,6 +1981,61 @@ if optimize_clicked:
                         help=f"Based on {optimization_results['wind_capacity']:.1f} kW × {wind_cuf*100:.1f}% CUF"
                     )
                 
+                if optimization_results.get('timings'):
+                    timings = optimization_results['timings']
+                    st.caption(
+                        f"Model build: {timings['build_seconds']:.3f} s | "
+                        f"Solve: {timings['solve_seconds']:.3f} s | {timings['status']}"
+                        + (" | warm start" if timings.get('warm_start') else "")
+                    )
+                    if timings.get('hit_time_limit'):
+                        st.warning("The solver stopped at its time limit; the capacities shown are the best feasible solution found.")
+                
+                if optimization_results.get('hourly_summary'):
+                    hourly_summary = optimization_results['hourly_summary']
+                    st.caption(
+                        f"Hourly profile solve over {hourly_summary['hours']} hours | "
+                        f"Unmet demand: {hourly_summary['unmet_energy']:,.0f} kWh | "
+                        f"Curtailed generation: {hourly_summary['curtailed_energy']:,.0f} kWh"
+                    )
+                    if hourly_summary.get('representative_days'):
+                        st.caption(
+                            f"Solved on {hourly_summary['representative_days']} representative days "
+                            f"(clustering: {hourly_summary['cluster_seconds']:.3f} s)"
+                        )
+                    if hourly_summary.get('rolling_windows'):
+                        st.caption(
+                            f"Rolling-horizon dispatch: {hourly_summary['rolling_windows']} windows "
+                            f"in {hourly_summary['rolling_seconds']:.2f} s | "
+                            f"Gap to full solve over the first {hourly_summary['rolling_validation_hours']} hours: "
+                            f"{hourly_summary['rolling_gap']:.2f}%"
+                        )
+                        if hourly_summary['rolling_gap'] > ROLLING_GAP_TOLERANCE:
+                            st.warning(
+                                f"Rolling-horizon dispatch is {hourly_summary['rolling_gap']:.1f}% worse than a full "
+                                "solve on the validation slice. Increase the window or overlap before relying "
+                                "on the unmet and curtailed energy figures."
+                            )
+                
+                if optimization_results.get('battery'):
+                    battery = optimization_results['battery']
+                    bat_col1, bat_col2 = st.columns(2)
+                    with bat_col1:
+                        st.metric(
+                            label="Optimized Battery Energy", 
+                            value=f"{battery['energy_capacity']:.1f} kWh",
+                            help=f"Roundtrip efficiency {battery['roundtrip_efficiency']*100:.0f}%, depth of discharge {battery['depth_of_discharge']*100:.0f}%"
+                        )
+                    with bat_col2:
+                        st.metric(
+                            label="Optimized Battery Power", 
+                            value=f"{battery['power_capacity']:.1f} kW"
+                        )
+                
+                if optimization_results.get('aggregation_report') is not None:
+                    with st.expander("Representative-Day Accuracy"):
+                        st.dataframe(optimization_results['aggregation_report'].round(3), use_container_width=True)
+                
                 # Additional details in an expander
                 with st.expander("Detailed Breakdown"):
                     detail_col1, detail_col2 = st.columns(2)
@@ -1442,8 +2092,8 @@ if run_optimizer_clicked:
         if profile_id is None:
             st.error("No profile ID found. Please select a profile first.")
         else:
-            # Use the current run number from session state
-            current_run_number = st.session_state.current_run_number
+            # Use the run number the inputs were saved under
+            current_run_number = reserve_run_number(project_id)
             
             st.session_state['project_id'] = project_id
             st.session_state['run_number'] = current_run_number
@@ -1466,8 +2116,8 @@ if run_optimizer_clicked:
             )
             
             if optimization_success:
-                # Increment run number for next use after successful run
-                st.session_state.current_run_number += 1
+                # The next run reserves its own number when it is saved
+                st.session_state.current_run_number = None
                 try:
                     st.switch_page("pages/5_LCOE_Outputs.py")
                 except Exception as e:
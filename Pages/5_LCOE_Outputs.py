@@ -1,13 +1,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import mysql.connector
 import numpy as np
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.gemini_validator import get_lcoe_interpretation_with_gemini
+from utils.db import get_connection as get_db_connection
+from utils.financial_outputs import save_lcoe_breakdown, get_financial_writer
 
 def get_param_value(inputs_df, param_name, tech, default=0):
     try:
@@ -284,222 +285,22 @@ def compute_asset_depreciation(gross_capex, lcoe_breakdown_data, plant_life, tec
     df = pd.DataFrame(data)
     return df
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='*******', #Enter password
-        database='imdb'
-    )
-
-def save_financial_data_to_db(project_id, run_number, solar_data, wind_data):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        current_time = datetime.now()
-        
-        # Save Solar Debt Data
-        for i, row in solar_data['debt_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            debt_query = """
-            INSERT INTO besos_fin_analysis_solar_debt 
-            (project_id, run_number, year, debt_opening_balance, debt_repayment, debt_closing_balance, interest, total_debt_service, calculated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            debt_opening_balance = %s,
-            debt_repayment = %s,
-            debt_closing_balance = %s,
-            interest = %s,
-            total_debt_service = %s,
-            calculated_at = %s
-            """
-            cursor.execute(debt_query, (
-                project_id, run_number, year,
-                float(row.get('Debt opening balance', 0)),
-                float(row.get('Debt repayment', 0)),
-                float(row.get('Debt closing balance', 0)),
-                float(row.get('Interest', 0)),
-                float(row.get('Total debt service', 0)),
-                current_time,
-                float(row.get('Debt opening balance', 0)),
-                float(row.get('Debt repayment', 0)),
-                float(row.get('Debt closing balance', 0)),
-                float(row.get('Interest', 0)),
-                float(row.get('Total debt service', 0)),
-                current_time
-            ))
-        
-        # Save Solar Working Capital Data
-        for i, row in solar_data['wc_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            wc_query = """
-            INSERT INTO besos_fin_analysis_solar_working_capital 
-            (project_id, run_number, year, operation_maintenance_wcap, interest_on_wc_om, receivables_wcap, interest_on_receivables_wcap, total_working_capital, interest_on_working_capital, calculated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            operation_maintenance_wcap = %s,
-            interest_on_wc_om = %s,
-            receivables_wcap = %s,
-            interest_on_receivables_wcap = %s,
-            total_working_capital = %s,
-            interest_on_working_capital = %s,
-            calculated_at = %s
-            """
-            cursor.execute(wc_query, (
-                project_id, run_number, year,
-                float(row.get('Operation and Maintenance wcap', 0)),
-                float(row.get('Interest on working capital - O&M', 0)),
-                float(row.get('Receivables wcap', 0)),
-                float(row.get('Interest on receivables wcap', 0)),
-                float(row.get('Total Working Capital', 0)),
-                float(row.get('Interest on working capital', 0)),
-                current_time,
-                float(row.get('Operation and Maintenance wcap', 0)),
-                float(row.get('Interest on working capital - O&M', 0)),
-                float(row.get('Receivables wcap', 0)),
-                float(row.get('Interest on receivables wcap', 0)),
-                float(row.get('Total Working Capital', 0)),
-                float(row.get('Interest on working capital', 0)),
-                current_time
-            ))
-        
-        # Save Solar Asset Data
-        for i, row in solar_data['asset_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            asset_query = """
-            INSERT INTO besos_fin_analysis_solar_asset 
-            (project_id, run_number, year, asset_value, calculated_at)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            asset_value = %s,
-            calculated_at = %s
-            """
-            cursor.execute(asset_query, (
-                project_id, run_number, year,
-                float(row.get('Asset value', 0)),
-                current_time,
-                float(row.get('Asset value', 0)),
-                current_time
-            ))
-        
-        # Save Wind Debt Data
-        for i, row in wind_data['debt_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            debt_query = """
-            INSERT INTO besos_fin_analysis_wind_debt 
-            (project_id, run_number, year, debt_opening_balance, debt_repayment, debt_closing_balance, interest, total_debt_service, calculated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            debt_opening_balance = %s,
-            debt_repayment = %s,
-            debt_closing_balance = %s,
-            interest = %s,
-            total_debt_service = %s,
-            calculated_at = %s
-            """
-            cursor.execute(debt_query, (
-                project_id, run_number, year,
-                float(row.get('Debt opening balance', 0)),
-                float(row.get('Debt repayment', 0)),
-                float(row.get('Debt closing balance', 0)),
-                float(row.get('Interest', 0)),
-                float(row.get('Total debt service', 0)),
-                current_time,
-                float(row.get('Debt opening balance', 0)),
-                float(row.get('Debt repayment', 0)),
-                float(row.get('Debt closing balance', 0)),
-                float(row.get('Interest', 0)),
-                float(row.get('Total debt service', 0)),
-                current_time
-            ))
-        
-        # Save Wind Working Capital Data
-        for i, row in wind_data['wc_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            wc_query = """
-            INSERT INTO besos_fin_analysis_wind_working_capital 
-            (project_id, run_number, year, operation_maintenance_wcap, interest_on_wc_om, receivables_wcap, interest_on_receivables_wcap, total_working_capital, interest_on_working_capital, calculated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            operation_maintenance_wcap = %s,
-            interest_on_wc_om = %s,
-            receivables_wcap = %s,
-            interest_on_receivables_wcap = %s,
-            total_working_capital = %s,
-            interest_on_working_capital = %s,
-            calculated_at = %s
-            """
-            cursor.execute(wc_query, (
-                project_id, run_number, year,
-                float(row.get('Operation and Maintenance wcap', 0)),
-                float(row.get('Interest on working capital - O&M', 0)),
-                float(row.get('Receivables wcap', 0)),
-                float(row.get('Interest on receivables wcap', 0)),
-                float(row.get('Total Working Capital', 0)),
-                float(row.get('Interest on working capital', 0)),
-                current_time,
-                float(row.get('Operation and Maintenance wcap', 0)),
-                float(row.get('Interest on working capital - O&M', 0)),
-                float(row.get('Receivables wcap', 0)),
-                float(row.get('Interest on receivables wcap', 0)),
-                float(row.get('Total Working Capital', 0)),
-                float(row.get('Interest on working capital', 0)),
-                current_time
-            ))
-        
-        # Save Wind Asset Data
-        for i, row in wind_data['asset_df'].iterrows():
-            if isinstance(i, str) and 'Year' in i:
-                year = int(i.split()[1])
-            else:
-                year = int(i) + 1
-            
-            asset_query = """
-            INSERT INTO besos_fin_analysis_wind_asset 
-            (project_id, run_number, year, asset_value, calculated_at)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            asset_value = %s,
-            calculated_at = %s
-            """
-            cursor.execute(asset_query, (
-                project_id, run_number, year,
-                float(row.get('Asset value', 0)),
-                current_time,
-                float(row.get('Asset value', 0)),
-                current_time
-            ))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True, "Financial analysis data saved to database successfully"
-        
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Detailed error: {error_details}")
-        return False, f"Error saving financial analysis to database: {str(e)}"
+def render_financial_save_status(project_id, run_number):
+    """Shows how the background save of this run's financial schedules is going"""
+    status = get_financial_writer().status(project_id, run_number)
+    if status is None:
+        return
+    if status["state"] == "saved":
+        st.success(f"Financial data saved to database ({status['rows']:,} rows)")
+    elif status["state"] == "failed":
+        st.error(f"Error saving financial data: {status['error']}")
+        if st.button("Retry saving financial data"):
+            st.session_state[f"fin_data_saved_{project_id}_{run_number}"] = False
+            st.rerun()
+    else:
+        attempt = f" (attempt {status['attempts']})" if status["attempts"] > 1 else ""
+        st.info(f"Saving financial data in the background: {status['state']}{attempt}")
+        st.button("Refresh save status")
 
 st.set_page_config(page_title="General Outputs", layout="wide")
 st.title("LCOE Analysis and Financial Insights")
@@ -909,82 +710,8 @@ if calculate_lcoe_clicked:
                 df_breakdown = pd.DataFrame(rows)
                 st.session_state["lcoe_breakdown"] = df_breakdown
                 
-                # Save to database (rest of the database code remains the same)
-                for _, row in df_breakdown.iterrows():
-                    tech = row["Technology"]
-                    year_num = int(row["Year"])
-                    breakdown_sql = """
-                    INSERT INTO besos_lcoe_breakdown
-                    (project_id, run_number, technology, year, gross_generation_kwh_input, 
-                    net_generation_kwh_available, operation_maintenance_expenses, insurance, 
-                    depreciation_gross_capital, depreciation_net_capital, interest_term_loan, 
-                    interest_working_capital, return_on_equity, total_cost_generation, 
-                    cost_generation_per_kwh, discount_factor, present_value, annual_cost_inr, 
-                    discounted_cost_inr, discounted_gen_kwh, calculated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    gross_generation_kwh_input = %s,
-                    net_generation_kwh_available = %s,
-                    operation_maintenance_expenses = %s,
-                    insurance = %s,
-                    depreciation_gross_capital = %s,
-                    depreciation_net_capital = %s,
-                    interest_term_loan = %s,
-                    interest_working_capital = %s,
-                    return_on_equity = %s,
-                    total_cost_generation = %s,
-                    cost_generation_per_kwh = %s,
-                    discount_factor = %s,
-                    present_value = %s,
-                    annual_cost_inr = %s,
-                    discounted_cost_inr = %s,
-                    discounted_gen_kwh = %s,
-                    calculated_at = %s
-                    """
-                    cursor.execute(
-                        breakdown_sql,
-                        (
-                            project_id,
-                            run_number,
-                            tech,
-                            year_num,
-                            handle_nan_value(row["Gross generation / kWh input (for Storage)"]),
-                            handle_nan_value(row["Net generation / kWh available (for Storage)"]),
-                            handle_nan_value(row["Operation and Maintenance Expenses"]),
-                            handle_nan_value(row["Insurance"]),
-                            handle_nan_value(row["Depreciation (on gross capital cost)"]),
-                            handle_nan_value(row["Depreciation (on net capital cost)"]),
-                            handle_nan_value(row["Interest on Term Loan"]),
-                            handle_nan_value(row["Interest on Working Capital"]),
-                            handle_nan_value(row["Return on Equity"]),
-                            handle_nan_value(row["Total Cost of Generation"]),
-                            handle_nan_value(row["Cost Of Generation per kWh"]),
-                            handle_nan_value(row["Discount factor"]),
-                            handle_nan_value(row["Present value"]),
-                            handle_nan_value(row["Annual Cost (INR)"]),
-                            handle_nan_value(row["Discounted Cost (INR)"]),
-                            handle_nan_value(row["Discounted Gen (kWh)"]),
-                            current_time,
-                            # ON DUPLICATE KEY UPDATE values
-                            handle_nan_value(row["Gross generation / kWh input (for Storage)"]),
-                            handle_nan_value(row["Net generation / kWh available (for Storage)"]),
-                            handle_nan_value(row["Operation and Maintenance Expenses"]),
-                            handle_nan_value(row["Insurance"]),
-                            handle_nan_value(row["Depreciation (on gross capital cost)"]),
-                            handle_nan_value(row["Depreciation (on net capital cost)"]),
-                            handle_nan_value(row["Interest on Term Loan"]),
-                            handle_nan_value(row["Interest on Working Capital"]),
-                            handle_nan_value(row["Return on Equity"]),
-                            handle_nan_value(row["Total Cost of Generation"]),
-                            handle_nan_value(row["Cost Of Generation per kWh"]),
-                            handle_nan_value(row["Discount factor"]),
-                            handle_nan_value(row["Present value"]),
-                            handle_nan_value(row["Annual Cost (INR)"]),
-                            handle_nan_value(row["Discounted Cost (INR)"]),
-                            handle_nan_value(row["Discounted Gen (kWh)"]),
-                            current_time
-                        )
-                    )
+                # Save to database in one batched upsert (utils.financial_outputs)
+                save_lcoe_breakdown(cursor, project_id, run_number, df_breakdown, current_time)
                 conn.commit()
                 # st.success("LCOE breakdown saved to database")
             cursor.close()
@@ -1453,13 +1180,10 @@ with financials_tab:
     if solar_data and wind_data:
         fin_key = f"fin_data_saved_{project_id}_{run_number}"
         if fin_key not in st.session_state or not st.session_state[fin_key]:
-            with st.spinner("Saving financial data to database..."):
-                success, message = save_financial_data_to_db(project_id, run_number, solar_data, wind_data)
-                if success:
-                    st.success("Financial data saved to database successfully")
-                    st.session_state[fin_key] = True
-                else:
-                    st.error(f"Error saving financial data: {message}")
+            # Written by the background writer (utils.financial_outputs), the tab does not wait on it
+            get_financial_writer().submit(project_id, run_number, solar_data, wind_data)
+            st.session_state[fin_key] = True
+        render_financial_save_status(project_id, run_number)
     else:
         st.warning("Complete financial data not available. Cannot save to database.")
 
@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
-import mysql.connector
-from mysql.connector import Error
+from utils.db import get_connection, DatabaseError
 
 st.title("Battery Storage Inputs & LCOS Calculator")
 
@@ -40,18 +39,12 @@ def calculate_lcos(
     except Exception as e:
         return f"LCOS calculation error: {e}"
 
-# Database connection function with hardcoded credentials
+# Database connection from the shared pool (utils.db)
 def create_db_connection():
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='*******', #Enter password
-            database='imdb'
-        )
-        return connection
-    except Error as e:
-        st.error(f"Error connecting to MySQL Database: {e}")
+        return get_connection()
+    except DatabaseError as e:
+        st.error(f"Error connecting to database: {e}")
         return None
 
 # Function to save inputs to database
@@ -85,7 +78,7 @@ def save_inputs(project_id, run_number, capex, o_and_m_pct, storage_duration, ef
             cursor.close()
             connection.close()
             return True
-        except Error as e:
+        except DatabaseError as e:
             st.error(f"Error saving inputs to database: {e}")
             if connection:
                 connection.close()
@@ -114,7 +107,7 @@ def save_output(project_id, run_number, lcos_value):
             cursor.close()
             connection.close()
             return True
-        except Error as e:
+        except DatabaseError as e:
             st.error(f"Error saving output to database: {e}")
             if connection:
                 connection.close()
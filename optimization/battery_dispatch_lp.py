@@ -0,0 +1,203 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+from optimization.hourly_capacity_lp import HOURS_PER_YEAR
+
+
+def build_battery_dispatch_matrices(demand, solar_shape, wind_shape, roundtrip_efficiency=0.97,
+                                    depth_of_discharge=0.8, battery_availability=None,
+                                    solar_cost_factor=0.9, battery_energy_cost=0.38,
+                                    battery_power_cost=0.1, unmet_penalty=1.0,
+                                    curtailment_cost=0.0, initial_soc=None, storage_duration=None):
+    """
+    Builds the battery-coupled dispatch and sizing LP in sparse matrix form
+
+    Variables are ordered [Solar_Capacity, Wind_Capacity, Battery_Energy, Battery_Power,
+    Charge_0..T-1, Discharge_0..T-1, SOC_0..T-1, Unmet_0..T-1]. Each hour contributes:
+    - energy balance: solar*S + wind*W + Discharge - Charge + Unmet >= demand
+    - state of charge: SOC[t] = SOC[t-1] + eff * Charge[t] - Discharge[t] / eff
+    - SOC window: (1 - depth_of_discharge) * E <= SOC[t] <= E
+    - power limits: Charge[t], Discharge[t] <= availability[t] * P
+
+    Curtailment is the surplus of the balance row, as in the hourly capacity LP.
+
+    Parameters:
+    - demand: 1-D array of hourly demand (kW)
+    - solar_shape, wind_shape: 1-D arrays of per-kW hourly output
+    - roundtrip_efficiency: Roundtrip efficiency as decimal, split evenly between charge and discharge
+    - depth_of_discharge: Usable fraction of the energy capacity as decimal
+    - battery_availability: Optional per-hour fraction of power capacity available (defaults to 1)
+    - solar_cost_factor: Cost of 1 kW solar relative to 1 kW wind
+    - battery_energy_cost: Cost of 1 kWh storage relative to 1 kW wind
+    - battery_power_cost: Cost of 1 kW storage power relative to 1 kW wind
+    - unmet_penalty: Cost per kWh/year of unserved demand, relative to 1 kW wind
+    - curtailment_cost: Cost per kWh/year of curtailed generation
+    - initial_soc: SOC (kWh) before the first hour; None makes the horizon cyclic
+    - storage_duration: Optional fixed energy-to-power ratio (hours)
+
+    Returns:
+    - c, A_ub, b_ub, A_eq, b_eq
+    """
+    demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+    solar_shape = np.asarray(solar_shape, dtype=float)
+    wind_shape = np.asarray(wind_shape, dtype=float)
+    n_hours = demand.size
+    availability = (np.ones(n_hours) if battery_availability is None
+                    else np.asarray(battery_availability, dtype=float))
+    eff = np.sqrt(roundtrip_efficiency)
+    annual_scale = HOURS_PER_YEAR / n_hours if n_hours else 1.0
+
+    eye = sparse.eye_array(n_hours, format='csr')
+    zeros = sparse.csr_array((n_hours, n_hours))
+    ones_col = sparse.csr_array(np.ones((n_hours, 1)))
+    zero_col = sparse.csr_array((n_hours, 1))
+
+    def capacity_block(solar, wind, energy, power):
+        # Column blocks for [S, W, E, P]; arrays become one coefficient per hour
+        return [c if isinstance(c, sparse.csr_array) else sparse.csr_array(np.reshape(c, (-1, 1)))
+                for c in (solar, wind, energy, power)]
+
+    # Energy balance, written as <= rows
+    balance = sparse.hstack(
+        capacity_block(-solar_shape, -wind_shape, zero_col, zero_col) + [eye, -eye, zeros, -eye]
+    )
+    # SOC window and power limits
+    soc_max = sparse.hstack(capacity_block(zero_col, zero_col, -ones_col, zero_col) + [zeros, zeros, eye, zeros])
+    soc_min = sparse.hstack(
+        capacity_block(zero_col, zero_col, (1 - depth_of_discharge) * np.ones(n_hours), zero_col) +
+        [zeros, zeros, -eye, zeros]
+    )
+    charge_max = sparse.hstack(capacity_block(zero_col, zero_col, zero_col, -availability) + [eye, zeros, zeros, zeros])
+    discharge_max = sparse.hstack(capacity_block(zero_col, zero_col, zero_col, -availability) + [zeros, eye, zeros, zeros])
+
+    A_ub = sparse.vstack([balance, soc_max, soc_min, charge_max, discharge_max], format='csr')
+    b_ub = np.concatenate([-demand, np.zeros(4 * n_hours)])
+
+    # SOC dynamics; the previous-hour shift wraps around when the horizon is cyclic
+    shift = sparse.diags_array(np.ones(n_hours - 1), offsets=-1, shape=(n_hours, n_hours), format='lil')
+    if initial_soc is None:
+        shift[0, n_hours - 1] = 1
+    dynamics = sparse.hstack(
+        capacity_block(zero_col, zero_col, zero_col, zero_col) +
+        [-eff * eye, eye / eff, eye - shift.tocsr(), zeros]
+    )
+    b_eq = np.zeros(n_hours)
+    if initial_soc is not None:
+        b_eq[0] = initial_soc
+    A_eq = dynamics
+    if storage_duration:
+        ratio_row = sparse.csr_array(
+            ([1.0, -float(storage_duration)], ([0, 0], [2, 3])), shape=(1, 4 + 4 * n_hours)
+        )
+        A_eq = sparse.vstack([dynamics, ratio_row])
+        b_eq = np.append(b_eq, 0.0)
+    A_eq = sparse.csr_array(A_eq)
+
+    energy_weight = annual_scale * np.ones(n_hours)
+    c = np.concatenate([
+        [solar_cost_factor + curtailment_cost * annual_scale * solar_shape.sum(),
+         1.0 + curtailment_cost * annual_scale * wind_shape.sum(),
+         battery_energy_cost,
+         battery_power_cost],
+        -curtailment_cost * energy_weight,
+        curtailment_cost * energy_weight,
+        np.zeros(n_hours),
+        (unmet_penalty + curtailment_cost) * energy_weight
+    ])
+    return c, A_ub, b_ub, A_eq, b_eq
+
+
+def optimize_battery_dispatch(demand, solar_shape, wind_shape, roundtrip_efficiency=0.97,
+                              depth_of_discharge=0.8, battery_availability=None,
+                              solar_cost_factor=0.9, battery_energy_cost=0.38,
+                              battery_power_cost=0.1, unmet_penalty=1.0, curtailment_cost=0.0,
+                              initial_soc=None, storage_duration=None, max_battery_energy=None,
+                              solar_enabled=True, wind_enabled=True, fixed_capacities=None):
+    """
+    Co-optimizes solar, wind and battery energy/power capacity with hourly dispatch
+
+    Parameters:
+    - demand: 1-D array of hourly demand (kW)
+    - solar_shape, wind_shape: 1-D arrays of per-kW hourly output, aligned with demand
+    - roundtrip_efficiency, depth_of_discharge: Battery parameters as decimals (LCOS page inputs)
+    - battery_availability: Optional per-hour fraction of power capacity available
+    - solar_cost_factor, battery_energy_cost, battery_power_cost: Capacity costs relative to 1 kW wind
+    - unmet_penalty, curtailment_cost: Energy costs per kWh/year, relative to 1 kW wind
+    - initial_soc: SOC (kWh) before the first hour; None makes the horizon cyclic
+    - storage_duration: Optional fixed energy-to-power ratio (hours)
+    - max_battery_energy: Optional upper bound on battery energy capacity (kWh)
+    - solar_enabled, wind_enabled: Fix the capacity of a technology to 0 when False
+    - fixed_capacities: Optional dict with 'solar', 'wind', 'battery_energy', 'battery_power'
+      to dispatch a given plant instead of sizing it
+
+    Returns:
+    - dict with 'solar_capacity', 'wind_capacity', 'battery_energy_capacity',
+      'battery_power_capacity', 'unmet_energy', 'curtailed_energy', 'final_soc',
+      'objective', 'hourly' (DataFrame), 'timings' and 'status'
+    """
+    build_start = time.perf_counter()
+    demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+    solar_shape = np.asarray(solar_shape, dtype=float)
+    wind_shape = np.asarray(wind_shape, dtype=float)
+    n_hours = demand.size
+
+    c, A_ub, b_ub, A_eq, b_eq = build_battery_dispatch_matrices(
+        demand, solar_shape, wind_shape, roundtrip_efficiency, depth_of_discharge,
+        battery_availability, solar_cost_factor, battery_energy_cost, battery_power_cost,
+        unmet_penalty, curtailment_cost, initial_soc, storage_duration
+    )
+
+    bounds = np.zeros((c.size, 2))
+    bounds[:, 1] = np.inf
+    bounds[0, 1] = np.inf if solar_enabled else 0
+    bounds[1, 1] = np.inf if wind_enabled else 0
+    if max_battery_energy is not None:
+        bounds[2, 1] = max_battery_energy
+    if fixed_capacities:
+        for idx, key in enumerate(('solar', 'wind', 'battery_energy', 'battery_power')):
+            if key in fixed_capacities:
+                bounds[idx] = fixed_capacities[key]
+    build_seconds = time.perf_counter() - build_start
+
+    solve_start = time.perf_counter()
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method="highs")
+    solve_seconds = time.perf_counter() - solve_start
+
+    x = res.x if res.x is not None else np.zeros(c.size)
+    solar_val, wind_val, energy_val, power_val = (float(v) for v in x[:4])
+    charge, discharge, soc, unmet = (x[4 + k * n_hours:4 + (k + 1) * n_hours] for k in range(4))
+    generation = solar_val * solar_shape + wind_val * wind_shape
+    curtailment = np.clip(generation + discharge - charge + unmet - demand, 0, None)
+
+    hourly = pd.DataFrame({
+        "Demand": demand,
+        "Solar_Generation": solar_val * solar_shape,
+        "Wind_Generation": wind_val * wind_shape,
+        "Charge": charge,
+        "Discharge": discharge,
+        "SOC": soc,
+        "Curtailment": curtailment,
+        "Unmet_Demand": unmet
+    })
+    hourly["Total_Generation"] = hourly["Solar_Generation"] + hourly["Wind_Generation"]
+
+    return {
+        'solar_capacity': solar_val,
+        'wind_capacity': wind_val,
+        'battery_energy_capacity': energy_val,
+        'battery_power_capacity': power_val,
+        'unmet_energy': float(unmet.sum()),
+        'curtailed_energy': float(curtailment.sum()),
+        'final_soc': float(soc[-1]) if n_hours else 0.0,
+        'objective': float(res.fun) if res.fun is not None else None,
+        'hourly': hourly,
+        'timings': {
+            'build_seconds': build_seconds,
+            'solve_seconds': solve_seconds,
+            'status': res.message
+        },
+        'status': res.status
+    }
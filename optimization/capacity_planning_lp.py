@@ -1,8 +1,15 @@
 from pulp import LpProblem, LpVariable, LpMinimize, lpSum
 import pandas as pd
 import numpy as np
+import time
+from scipy import sparse
+from scipy.optimize import linprog
 
-def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_factor=0.9):
+from optimization.solver_backends import solve_problem
+
+def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_factor=0.9,
+                                 band_low=0.6, band_high=1.4, max_generation_factor=1.3,
+                                 backend="CBC", time_limit=None, mip_gap=None, threads=None):
     """
     Solves LP for minimum required solar/wind capacity to meet hourly demand
     with balanced generation and cost optimization
@@ -11,15 +18,22 @@ def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_fact
     - demand_df: DataFrame with 'Hour' and 'Demand' columns
     - solar_cuf, wind_cuf: Capacity Utilization Factor (as decimal, e.g., 0.18)
     - solar_cost_factor: Cost preference factor for solar (default 0.9 makes solar preferred)
+    - band_low, band_high: Hours with demand outside [band_low, band_high] x average are ignored
+    - max_generation_factor: Cap on average generation as a multiple of average demand
+    - backend: Solver backend ('CBC', 'HiGHS', 'GLPK' or 'Auto', see solver_backends)
+    - time_limit, mip_gap, threads: Solver settings; a solve stopped by the time limit
+      returns its best feasible solution
 
     Returns:
     - solar_capacity (MW)
     - wind_capacity (MW)
-    - demand_df with estimated generation columns
+    - demand_df with estimated generation columns; the solve_problem report
+      (backend, status, runtime, time-limit flag) is in demand_df.attrs['solver']
     """
+    build_start = time.perf_counter()
     avg_demand = demand_df['Demand'].mean()
-    demand_threshold_low = avg_demand * 0.6  # 40% below average
-    demand_threshold_high = avg_demand * 1.4  # 40% above average
+    demand_threshold_low = avg_demand * band_low  # 40% below average by default
+    demand_threshold_high = avg_demand * band_high  # 40% above average by default
     
     filtered_demand = demand_df[
         (demand_df['Demand'] >= demand_threshold_low) & 
@@ -54,7 +68,6 @@ def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_fact
     elif wind_cuf > 0 and solar_cuf == 0:
         prob += wind_capacity * wind_cuf >= avg_demand, "Wind_Only_Contribution"
     
-    max_generation_factor = 1.3
     max_allowed_generation = avg_demand * max_generation_factor
     prob += (solar_capacity * solar_cuf + wind_capacity * wind_cuf <= 
             max_allowed_generation), "Max_Generation_Limit"
@@ -62,7 +75,10 @@ def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_fact
     if solar_cuf > 0 and wind_cuf > 0 and abs(solar_cuf - wind_cuf) < 0.01:
         prob += solar_capacity * solar_cuf >= wind_capacity * wind_cuf, "Solar_Preference"
     
-    prob.solve()
+    build_seconds = time.perf_counter() - build_start
+    
+    solver_report = solve_problem(prob, backend, time_limit, mip_gap, threads, model_size=total_hours)
+    solver_report['build_seconds'] = build_seconds
     
     solar_val = solar_capacity.varValue if solar_capacity.varValue else 0
     wind_val = wind_capacity.varValue if wind_capacity.varValue else 0
@@ -72,4 +88,123 @@ def optimize_generation_capacity(demand_df, solar_cuf, wind_cuf, solar_cost_fact
     demand_df_result["Wind_Generation"] = wind_val * wind_cuf
     demand_df_result["Total_Generation"] = (demand_df_result["Solar_Generation"] + 
                                            demand_df_result["Wind_Generation"])
-    return solar_val, wind_val, demand_df_result 
\ No newline at end of file
+    demand_df_result.attrs['solver'] = solver_report
+    return solar_val, wind_val, demand_df_result
+
+def build_capacity_lp_matrices(demand, solar_cuf, wind_cuf, band_low=0.6, band_high=1.4,
+                               max_generation_factor=1.3, solar_cost_factor=None):
+    """
+    Builds the capacity LP of optimize_generation_capacity in matrix form
+
+    Variables are ordered [Solar_Capacity, Wind_Capacity] and every constraint
+    is expressed as a row of A_ub @ x <= b_ub.
+
+    Parameters:
+    - demand: 1-D NumPy array of hourly demand
+    - solar_cuf, wind_cuf: Capacity Utilization Factor (as decimal, e.g., 0.18)
+    - band_low, band_high, max_generation_factor: As for optimize_generation_capacity
+    - solar_cost_factor: Optional objective weight on solar capacity; None keeps the
+      unweighted S + W objective of optimize_generation_capacity
+
+    Returns:
+    - c: objective coefficients
+    - A_ub: scipy.sparse CSR constraint matrix
+    - b_ub: right-hand side of the constraints
+    """
+    demand = np.asarray(demand, dtype=float)
+    avg_demand = np.nanmean(demand)
+    band_mask = (demand >= avg_demand * band_low) & (demand <= avg_demand * band_high)
+    filtered = demand[band_mask]
+
+    if filtered.size == 0:
+        filtered = demand
+        avg_demand = np.nanmean(filtered)
+
+    n_hours = filtered.size
+    rows = [np.repeat(np.arange(n_hours), 2)]
+    cols = [np.tile([0, 1], n_hours)]
+    data = [np.tile([-solar_cuf, -wind_cuf], n_hours)]
+    rhs = [-filtered]
+
+    def add_row(coefs, bound):
+        row = n_hours + len(rhs) - 1
+        rows.append(np.array([row, row]))
+        cols.append(np.array([0, 1]))
+        data.append(np.asarray(coefs, dtype=float))
+        rhs.append(np.array([bound], dtype=float))
+
+    if solar_cuf > 0 and wind_cuf > 0:
+        if solar_cuf >= wind_cuf:
+            add_row([-solar_cuf, 0], -avg_demand * 0.8)
+            add_row([0, -wind_cuf], -avg_demand * 0.2)
+        else:
+            add_row([0, -wind_cuf], -avg_demand * 0.8)
+            add_row([-solar_cuf, 0], -avg_demand * 0.2)
+    elif solar_cuf > 0 and wind_cuf == 0:
+        add_row([-solar_cuf, 0], -avg_demand)
+    elif wind_cuf > 0 and solar_cuf == 0:
+        add_row([0, -wind_cuf], -avg_demand)
+
+    add_row([solar_cuf, wind_cuf], avg_demand * max_generation_factor)
+
+    if solar_cuf > 0 and wind_cuf > 0 and abs(solar_cuf - wind_cuf) < 0.01:
+        add_row([-solar_cuf, wind_cuf], 0.0)
+
+    b_ub = np.concatenate(rhs)
+    A_ub = sparse.csr_array(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(b_ub.size, 2)
+    )
+    c = np.array([1.0 if solar_cost_factor is None else solar_cost_factor, 1.0])
+    return c, A_ub, b_ub
+
+
+def optimize_generation_capacity_sparse(demand_df, solar_cuf, wind_cuf, solar_cost_factor=0.9):
+    """
+    Matrix-form counterpart of optimize_generation_capacity
+
+    Assembles the same LP as a scipy.sparse matrix straight from the demand
+    array and solves it with HiGHS through scipy.optimize.linprog, avoiding
+    the per-hour PuLP constraint loop.
+
+    Parameters:
+    - demand_df: DataFrame with 'Hour' and 'Demand' columns
+    - solar_cuf, wind_cuf: Capacity Utilization Factor (as decimal, e.g., 0.18)
+    - solar_cost_factor: Kept for signature parity with optimize_generation_capacity
+
+    Returns:
+    - solar_capacity (MW)
+    - wind_capacity (MW)
+    - demand_df with estimated generation columns
+    - timings: dict with 'build_seconds', 'solve_seconds', solver 'status' and 'feasible';
+      like optimize_generation_capacity, a failed solve returns zero capacities
+    """
+    build_start = time.perf_counter()
+    c, A_ub, b_ub = build_capacity_lp_matrices(
+        demand_df['Demand'].to_numpy(dtype=float), solar_cuf, wind_cuf
+    )
+    build_seconds = time.perf_counter() - build_start
+
+    solve_start = time.perf_counter()
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=[(0, None), (0, None)], method="highs")
+    solve_seconds = time.perf_counter() - solve_start
+
+    # Only an optimal solve is used; iteration/time limits and infeasibility give zero capacities
+    feasible = res.status == 0 and res.x is not None
+    solar_val = float(res.x[0]) if feasible else 0
+    wind_val = float(res.x[1]) if feasible else 0
+
+    demand_df_result = demand_df.copy()
+    demand_df_result["Solar_Generation"] = solar_val * solar_cuf
+    demand_df_result["Wind_Generation"] = wind_val * wind_cuf
+    demand_df_result["Total_Generation"] = (demand_df_result["Solar_Generation"] +
+                                           demand_df_result["Wind_Generation"])
+
+    timings = {
+        "build_seconds": build_seconds,
+        "solve_seconds": solve_seconds,
+        "status": res.message,
+        "feasible": feasible
+    }
+    return solar_val, wind_val, demand_df_result, timings
+
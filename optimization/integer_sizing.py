@@ -0,0 +1,171 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+from pulp import LpProblem, LpVariable, LpMinimize, LpInteger, LpContinuous
+from scipy.optimize import linprog
+
+from optimization.capacity_planning_lp import build_capacity_lp_matrices
+from optimization.solver_backends import solve_problem
+
+RELAXATION_CACHE_SIZE = 64
+
+_relaxation_cache = OrderedDict()
+
+
+def _relaxation_key(demand, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor):
+    digest = hashlib.sha1(np.ascontiguousarray(demand, dtype=float).tobytes()).hexdigest()
+    return (digest, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor)
+
+
+def get_lp_relaxation(demand, solar_cuf, wind_cuf, band_low=0.6, band_high=1.4, max_generation_factor=1.3):
+    """
+    Solves (or returns the cached) continuous capacity LP used to bound the integer model
+
+    The key is a hash of the demand array together with the CUFs and band settings,
+    so repeated integer solves for the same inputs with other unit sizes reuse it.
+
+    Returns:
+    - dict with 'solar_capacity', 'wind_capacity', 'objective', 'feasible', 'peak_demand'
+      (largest in-band demand) and 'avg_demand'
+    """
+    demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+    key = _relaxation_key(demand, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor)
+    if key in _relaxation_cache:
+        _relaxation_cache.move_to_end(key)
+        return _relaxation_cache[key]
+
+    c, A_ub, b_ub = build_capacity_lp_matrices(
+        demand, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor
+    )
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=[(0, None), (0, None)], method="highs")
+
+    avg_demand = demand.mean() if demand.size else 0.0
+    in_band = demand[(demand >= avg_demand * band_low) & (demand <= avg_demand * band_high)]
+    relaxation = {
+        'solar_capacity': float(res.x[0]) if res.status == 0 else 0.0,
+        'wind_capacity': float(res.x[1]) if res.status == 0 else 0.0,
+        'objective': float(res.fun) if res.status == 0 else None,
+        'feasible': res.status == 0,
+        'peak_demand': float(in_band.max()) if in_band.size else float(demand.max(initial=0.0)),
+        'avg_demand': float(avg_demand)
+    }
+    _relaxation_cache[key] = relaxation
+    if len(_relaxation_cache) > RELAXATION_CACHE_SIZE:
+        _relaxation_cache.popitem(last=False)
+    return relaxation
+
+
+def optimize_unit_counts(demand, solar_cuf, wind_cuf, solar_unit_capacity, wind_unit_capacity,
+                         band_low=0.6, band_high=1.4, max_generation_factor=1.3,
+                         backend="CBC", time_limit=None, mip_gap=None, threads=None):
+    """
+    Sizes solar and wind as whole numbers of inverters and turbines
+
+    Solves the constraints of optimize_generation_capacity with capacity = count x unit
+    size. Every hourly demand row shares the same coefficients, so only the largest
+    in-band demand can bind and the hourly rows are replaced by that single row. The
+    cached LP relaxation then bounds the branch-and-bound: its objective is a lower
+    bound on total capacity, and rounding it up gives an incumbent that caps each
+    count.
+
+    Parameters:
+    - demand: 1-D array of hourly demand (kW)
+    - solar_cuf, wind_cuf: Capacity Utilization Factor (as decimal, e.g., 0.18)
+    - solar_unit_capacity, wind_unit_capacity: kW per inverter / turbine; a size of 0
+      leaves that capacity continuous
+    - band_low, band_high, max_generation_factor: As for optimize_generation_capacity
+    - backend, time_limit, mip_gap, threads: Solver settings (see solver_backends)
+
+    Returns:
+    - dict with 'solar_capacity', 'wind_capacity', 'solar_inverters', 'wind_turbines',
+      'lp_solar_capacity', 'lp_wind_capacity', 'solver' (solve_problem report) and 'timings'
+    """
+    build_start = time.perf_counter()
+    relaxation = get_lp_relaxation(demand, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor)
+    avg_demand = relaxation['avg_demand']
+    units = {'solar': solar_unit_capacity, 'wind': wind_unit_capacity}
+    cufs = {'solar': solar_cuf, 'wind': wind_cuf}
+
+    # Rounding the relaxation up is feasible unless it breaks the generation cap
+    incumbent = None
+    if relaxation['feasible']:
+        rounded = {
+            tech: (math.ceil(relaxation[f'{tech}_capacity'] / units[tech] - 1e-9) * units[tech]
+                   if units[tech] > 0 else relaxation[f'{tech}_capacity'])
+            for tech in units
+        }
+        if solar_cuf * rounded['solar'] + wind_cuf * rounded['wind'] <= avg_demand * max_generation_factor:
+            incumbent = rounded['solar'] + rounded['wind']
+
+    prob = LpProblem("Unit_Count_Sizing", LpMinimize)
+    counts = {}
+    capacity = {}
+    for tech in units:
+        if cufs[tech] <= 0:
+            capacity[tech] = 0
+            continue
+        cap_bound = avg_demand * max_generation_factor / cufs[tech]
+        if incumbent is not None:
+            cap_bound = min(cap_bound, incumbent)
+        if units[tech] > 0:
+            counts[tech] = LpVariable(f"{tech.title()}_Units", lowBound=0,
+                                      upBound=math.floor(cap_bound / units[tech] + 1e-9), cat=LpInteger)
+            capacity[tech] = units[tech] * counts[tech]
+        else:
+            capacity[tech] = LpVariable(f"{tech.title()}_Capacity", lowBound=0, upBound=cap_bound, cat=LpContinuous)
+
+    solar_cap, wind_cap = capacity['solar'], capacity['wind']
+    prob += solar_cap + wind_cap
+    prob += solar_cap * solar_cuf + wind_cap * wind_cuf >= relaxation['peak_demand'], "Peak_Demand"
+
+    if solar_cuf > 0 and wind_cuf > 0:
+        if solar_cuf >= wind_cuf:
+            prob += solar_cap * solar_cuf >= avg_demand * 0.8, "Solar_Min_Contribution"
+            prob += wind_cap * wind_cuf >= avg_demand * 0.2, "Wind_Min_Contribution"
+        else:
+            prob += wind_cap * wind_cuf >= avg_demand * 0.8, "Wind_Min_Contribution"
+            prob += solar_cap * solar_cuf >= avg_demand * 0.2, "Solar_Min_Contribution"
+    elif solar_cuf > 0:
+        prob += solar_cap * solar_cuf >= avg_demand, "Solar_Only_Contribution"
+    elif wind_cuf > 0:
+        prob += wind_cap * wind_cuf >= avg_demand, "Wind_Only_Contribution"
+
+    prob += (solar_cap * solar_cuf + wind_cap * wind_cuf <=
+             avg_demand * max_generation_factor), "Max_Generation_Limit"
+
+    if solar_cuf > 0 and wind_cuf > 0 and abs(solar_cuf - wind_cuf) < 0.01:
+        prob += solar_cap * solar_cuf >= wind_cap * wind_cuf, "Solar_Preference"
+
+    # Bounds from the relaxation: the integer objective lies between its optimum and the rounded incumbent
+    if relaxation['objective'] is not None:
+        prob += solar_cap + wind_cap >= relaxation['objective'] - 1e-6, "LP_Relaxation_Bound"
+    build_seconds = time.perf_counter() - build_start
+
+    report = solve_problem(prob, backend, time_limit, mip_gap, threads, model_size=len(prob.constraints))
+
+    def value(expr):
+        if isinstance(expr, (int, float)):
+            return float(expr)
+        result = expr.value() if hasattr(expr, 'value') else expr.varValue
+        return float(result) if result is not None and report['feasible'] else 0.0
+
+    solar_val = value(solar_cap)
+    wind_val = value(wind_cap)
+    return {
+        'solar_capacity': solar_val,
+        'wind_capacity': wind_val,
+        'solar_inverters': int(round(value(counts['solar']))) if 'solar' in counts else 0,
+        'wind_turbines': int(round(value(counts['wind']))) if 'wind' in counts else 0,
+        'lp_solar_capacity': relaxation['solar_capacity'],
+        'lp_wind_capacity': relaxation['wind_capacity'],
+        'solver': report,
+        'timings': {
+            'build_seconds': build_seconds,
+            'solve_seconds': report['seconds'],
+            'status': f"{report['backend']}: {report['solution_status']}",
+            'hit_time_limit': report['hit_time_limit']
+        }
+    }
@@ -0,0 +1,135 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+
+from optimization.capacity_planning_lp import build_capacity_lp_matrices
+
+SWEEP_PARAMETERS = ('solar_cuf', 'wind_cuf', 'solar_cost_factor', 'band_low', 'band_high', 'max_generation_factor')
+
+# Demand is sent to each worker once through the pool initializer, not with every task
+_worker_demand = None
+
+
+def _init_worker(demand):
+    global _worker_demand
+    _worker_demand = demand
+
+
+def _solve_case(params):
+    demand = _worker_demand
+    solar_cuf, wind_cuf, solar_cost_factor, band_low, band_high, max_generation_factor = params
+
+    start = time.perf_counter()
+    c, A_ub, b_ub = build_capacity_lp_matrices(
+        demand, solar_cuf, wind_cuf, band_low, band_high, max_generation_factor, solar_cost_factor
+    )
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=[(0, None), (0, None)], method="highs")
+    seconds = time.perf_counter() - start
+
+    feasible = res.status == 0
+    solar_val = float(res.x[0]) if feasible else 0.0
+    wind_val = float(res.x[1]) if feasible else 0.0
+    generation = solar_val * solar_cuf + wind_val * wind_cuf
+    surplus = generation - demand
+
+    return dict(zip(SWEEP_PARAMETERS, params), **{
+        "solar_capacity": solar_val,
+        "wind_capacity": wind_val,
+        "total_capacity": solar_val + wind_val,
+        "hourly_generation": generation,
+        "over_generation": float(np.clip(surplus, 0, None).sum()),
+        "unmet_energy": float(np.clip(-surplus, 0, None).sum()),
+        "feasible": feasible,
+        "status": res.message,
+        "solve_seconds": seconds
+    })
+
+
+def build_sweep_grid(solar_cufs, wind_cufs, solar_cost_factors=(0.9,), band_lows=(0.6,),
+                     band_highs=(1.4,), max_generation_factors=(1.3,)):
+    """
+    Builds the full-factorial parameter grid for run_parameter_sweep
+
+    Returns:
+    - list of tuples ordered as SWEEP_PARAMETERS
+    """
+    return list(itertools.product(
+        solar_cufs, wind_cufs, solar_cost_factors, band_lows, band_highs, max_generation_factors
+    ))
+
+
+def pareto_front(results, objectives=("total_capacity", "over_generation")):
+    """
+    Flags the rows not dominated on two minimized objectives
+
+    Parameters:
+    - results: DataFrame from run_parameter_sweep
+    - objectives: Pair of column names, both minimized
+
+    Returns:
+    - Boolean Series aligned with results, True for Pareto-optimal feasible rows
+    """
+    first, second = objectives
+    on_front = pd.Series(False, index=results.index)
+    candidates = results[results["feasible"]].sort_values(list(objectives))
+
+    best_second = np.inf
+    for idx, value in candidates[second].items():
+        if value < best_second:
+            on_front[idx] = True
+            best_second = value
+    return on_front
+
+
+def run_parameter_sweep(demand_df, solar_cufs, wind_cufs, solar_cost_factors=(0.9,), band_lows=(0.6,),
+                        band_highs=(1.4,), max_generation_factors=(1.3,), max_workers=None, chunksize=None):
+    """
+    Solves the scalar-CUF capacity LP for every combination of the given parameters
+
+    Cases are independent, so they are spread over a process pool; each worker
+    receives the demand array once and then only small parameter tuples, which
+    keeps throughput close to linear in the number of cores. Unlike the page
+    solve, solar_cost_factor weights solar capacity in the objective here so the
+    sweep can trade the two technologies off.
+
+    Parameters:
+    - demand_df: DataFrame with a 'Demand' column (kW)
+    - solar_cufs, wind_cufs: Iterables of CUFs as decimals
+    - solar_cost_factors: Iterable of solar objective weights relative to wind
+    - band_lows, band_highs: Iterables of demand-band thresholds (multiples of average demand)
+    - max_generation_factors: Iterables of generation caps (multiples of average demand)
+    - max_workers: Process count (defaults to os.cpu_count(); 1 solves in-process)
+    - chunksize: Cases per task sent to a worker (defaults to about 4 chunks per worker)
+
+    Returns:
+    - results: tidy DataFrame with one row per case and a 'pareto' column
+    - pareto: the Pareto-optimal rows on total capacity vs over-generation
+    """
+    demand = np.nan_to_num(demand_df['Demand'].to_numpy(dtype=float), nan=0.0)
+    grid = build_sweep_grid(solar_cufs, wind_cufs, solar_cost_factors, band_lows,
+                            band_highs, max_generation_factors)
+    workers = max_workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(grid)))
+
+    if workers == 1:
+        _init_worker(demand)
+        rows = [_solve_case(params) for params in grid]
+    else:
+        if chunksize is None:
+            chunksize = max(1, len(grid) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(demand,)) as executor:
+            rows = list(executor.map(_solve_case, grid, chunksize=chunksize))
+
+    results = pd.DataFrame(rows, columns=list(SWEEP_PARAMETERS) + [
+        "solar_capacity", "wind_capacity", "total_capacity", "hourly_generation",
+        "over_generation", "unmet_energy", "feasible", "status", "solve_seconds"
+    ])
+    results["pareto"] = pareto_front(results) if len(results) else False
+    pareto = results[results["pareto"]].sort_values("total_capacity").reset_index(drop=True)
+    return results, pareto
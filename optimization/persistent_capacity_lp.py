@@ -0,0 +1,167 @@
+import time
+import numpy as np
+from scipy import sparse
+
+from optimization.warm_start_lp import WarmStartLP
+
+
+class PersistentCapacityOptimizer:
+    """
+    Scalar-CUF capacity LP that stays built between solves
+
+    The model is the one solved by optimize_generation_capacity, written in terms of
+    average solar and wind generation (X_s = solar_cuf * S, X_w = wind_cuf * W) instead
+    of capacity. In that form the hourly demand rows X_s + X_w >= demand[t] do not
+    depend on the CUFs at all:
+    - a new CUF only changes the objective cost 1 / cuf of its column
+    - new or rescaled demand only changes row bounds
+    - the contribution, generation-cap and preference rows are switched on and off
+      through their bounds
+    The constraint matrix is therefore never rebuilt and every re-solve warm-starts
+    from the previous basis (see WarmStartLP).
+    """
+
+    def __init__(self, demand, solar_cuf, wind_cuf, band_low=0.6, band_high=1.4,
+                 max_generation_factor=1.3, time_limit=None):
+        """
+        Parameters:
+        - demand: 1-D array of hourly demand (kW)
+        - solar_cuf, wind_cuf: Capacity Utilization Factor (as decimal, e.g., 0.18)
+        - band_low, band_high, max_generation_factor: As for optimize_generation_capacity
+        - time_limit: Optional solver time limit in seconds
+        """
+        build_start = time.perf_counter()
+        self.demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+        self.n_hours = self.demand.size
+        self.band_low = band_low
+        self.band_high = band_high
+        self.max_generation_factor = max_generation_factor
+        self.solar_cuf = solar_cuf
+        self.wind_cuf = wind_cuf
+
+        n = self.n_hours
+        # Rows: hourly demand, solar contribution, wind contribution, generation cap, solar preference
+        self.solar_row, self.wind_row, self.cap_row, self.preference_row = n, n + 1, n + 2, n + 3
+        hourly = sparse.csr_array(np.ones((n, 2)))
+        extra = sparse.csr_array(np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, -1.0]]))
+        A = sparse.vstack([hourly, extra], format='csr')
+
+        self.lp = WarmStartLP(
+            np.ones(2), A,
+            np.full(n + 4, -np.inf), np.full(n + 4, np.inf),
+            np.zeros(2), np.full(2, np.inf),
+            time_limit=time_limit
+        )
+        self._apply_demand()
+        self._apply_cufs()
+        self.build_seconds = time.perf_counter() - build_start
+
+    def _apply_demand(self):
+        avg_demand = self.demand.mean() if self.n_hours else 0.0
+        in_band = (self.demand >= avg_demand * self.band_low) & (self.demand <= avg_demand * self.band_high)
+        if not in_band.any():
+            in_band[:] = True
+        self.avg_demand = avg_demand
+        self.lp.set_row_bounds(np.arange(self.n_hours), np.where(in_band, self.demand, -np.inf), np.inf)
+        self.lp.set_row_bounds([self.cap_row], -np.inf, avg_demand * self.max_generation_factor)
+
+    def _apply_cufs(self):
+        solar_cuf, wind_cuf, avg_demand = self.solar_cuf, self.wind_cuf, self.avg_demand
+        self.lp.set_costs([0, 1], [1 / solar_cuf if solar_cuf > 0 else 0.0,
+                                   1 / wind_cuf if wind_cuf > 0 else 0.0])
+        self.lp.set_col_bounds([0, 1], 0.0, [np.inf if solar_cuf > 0 else 0.0,
+                                             np.inf if wind_cuf > 0 else 0.0])
+
+        solar_min = wind_min = -np.inf
+        if solar_cuf > 0 and wind_cuf > 0:
+            if solar_cuf >= wind_cuf:
+                solar_min, wind_min = avg_demand * 0.8, avg_demand * 0.2
+            else:
+                solar_min, wind_min = avg_demand * 0.2, avg_demand * 0.8
+        elif solar_cuf > 0:
+            solar_min = avg_demand
+        elif wind_cuf > 0:
+            wind_min = avg_demand
+        preference_min = 0.0 if solar_cuf > 0 and wind_cuf > 0 and abs(solar_cuf - wind_cuf) < 0.01 else -np.inf
+
+        self.lp.set_row_bounds([self.solar_row, self.wind_row, self.preference_row],
+                               [solar_min, wind_min, preference_min], np.inf)
+
+    def update(self, demand=None, demand_scale=None, solar_cuf=None, wind_cuf=None):
+        """
+        Changes the inputs of the built model in place
+
+        Parameters:
+        - demand: New 1-D hourly demand array of the same length
+        - demand_scale: Factor applied to the current demand
+        - solar_cuf, wind_cuf: New CUFs as decimals
+        """
+        if demand is not None:
+            demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+            if demand.size != self.n_hours:
+                raise ValueError("Demand length differs from the built model; create a new optimizer")
+            self.demand = demand
+        if demand_scale is not None:
+            self.demand = self.demand * demand_scale
+        if solar_cuf is not None:
+            self.solar_cuf = solar_cuf
+        if wind_cuf is not None:
+            self.wind_cuf = wind_cuf
+
+        if demand is not None or demand_scale is not None:
+            self._apply_demand()
+        self._apply_cufs()
+
+    def solve(self):
+        """
+        Solves the current model
+
+        Returns:
+        - solar_capacity, wind_capacity
+        - timings: dict with 'build_seconds', 'solve_seconds', solver 'status', 'feasible',
+          'iterations' and 'warm_start'
+        """
+        result = self.lp.solve()
+        solar_val = wind_val = 0
+        feasible = result['status'] == 0 and result['x'] is not None
+        if feasible:
+            solar_generation, wind_generation = result['x']
+            solar_val = float(solar_generation / self.solar_cuf) if self.solar_cuf > 0 else 0
+            wind_val = float(wind_generation / self.wind_cuf) if self.wind_cuf > 0 else 0
+
+        timings = {
+            'build_seconds': self.build_seconds,
+            'solve_seconds': result['seconds'],
+            'status': result['message'],
+            'feasible': feasible,
+            'iterations': result['iterations'],
+            'warm_start': result['warm_start']
+        }
+        self.build_seconds = 0.0
+        return solar_val, wind_val, timings
+
+
+def get_persistent_optimizer(cache, key, demand, solar_cuf, wind_cuf, **model_kwargs):
+    """
+    Returns the optimizer stored under key, updated to the given inputs
+
+    A new optimizer is built when none is cached for the key or the demand length
+    changed (e.g. a different profile was uploaded under the same id).
+
+    Parameters:
+    - cache: dict holding optimizers (e.g. a Streamlit session_state entry)
+    - key: Cache key, usually (project_id, profile_id)
+    - demand: 1-D array of hourly demand (kW)
+    - solar_cuf, wind_cuf: CUFs as decimals
+    - model_kwargs: band_low, band_high, max_generation_factor, time_limit
+    """
+    optimizer = cache.get(key)
+    demand = np.asarray(demand, dtype=float)
+    if optimizer is None or optimizer.n_hours != demand.size:
+        optimizer = PersistentCapacityOptimizer(demand, solar_cuf, wind_cuf, **model_kwargs)
+        cache[key] = optimizer
+    else:
+        update_start = time.perf_counter()
+        optimizer.update(demand=demand, solar_cuf=solar_cuf, wind_cuf=wind_cuf)
+        optimizer.build_seconds = time.perf_counter() - update_start
+    return optimizer
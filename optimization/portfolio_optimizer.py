@@ -0,0 +1,347 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+from optimization.warm_start_lp import WarmStartLP
+
+
+def _in_band_demand(project, band_low, band_high):
+    # Hourly demand (kW) and the hours between band_low and band_high times the average
+    demand = np.nan_to_num(np.asarray(project['demand'], dtype=float), nan=0.0)
+    avg_demand = demand.mean() if demand.size else 0.0
+    in_band = demand[(demand >= avg_demand * band_low) & (demand <= avg_demand * band_high)]
+    return demand, avg_demand, in_band
+
+
+def _project_rows(project, band_low=0.6, band_high=1.4, max_generation_factor=1.3):
+    """
+    Rows of one project's capacity model over [Solar_Capacity, Wind_Capacity, Shortfall]
+
+    The rules are those of optimize_generation_capacity. The hourly demand rows share
+    the same coefficients, so only the largest in-band demand can bind; Shortfall (kW)
+    relaxes that peak row and the minimum-contribution rows at a penalty, so a tight
+    budget yields a smaller plant instead of an infeasible portfolio.
+
+    Returns:
+    - A (dense rows), row_lower, row_upper
+    """
+    demand, avg_demand, in_band = _in_band_demand(project, band_low, band_high)
+    solar_cuf, wind_cuf = project['solar_cuf'], project['wind_cuf']
+    peak = in_band.max() if in_band.size else demand.max(initial=0.0)
+
+    rows = [[solar_cuf, wind_cuf, 1.0]]
+    lower = [peak]
+    upper = [np.inf]
+
+    def add_row(coefs, low, high=np.inf):
+        rows.append(coefs)
+        lower.append(low)
+        upper.append(high)
+
+    if solar_cuf > 0 and wind_cuf > 0:
+        if solar_cuf >= wind_cuf:
+            add_row([solar_cuf, 0, 1.0], avg_demand * 0.8)
+            add_row([0, wind_cuf, 1.0], avg_demand * 0.2)
+        else:
+            add_row([0, wind_cuf, 1.0], avg_demand * 0.8)
+            add_row([solar_cuf, 0, 1.0], avg_demand * 0.2)
+    elif solar_cuf > 0:
+        add_row([solar_cuf, 0, 1.0], avg_demand)
+    elif wind_cuf > 0:
+        add_row([0, wind_cuf, 1.0], avg_demand)
+
+    add_row([solar_cuf, wind_cuf, 0], -np.inf, avg_demand * max_generation_factor)
+
+    if solar_cuf > 0 and wind_cuf > 0 and abs(solar_cuf - wind_cuf) < 0.01:
+        add_row([solar_cuf, -wind_cuf, 0], 0.0)
+
+    return np.array(rows, dtype=float), np.array(lower), np.array(upper)
+
+
+class _ProjectSubproblem:
+    """One project's model kept in a WarmStartLP; only its costs change between iterations"""
+
+    def __init__(self, project, shortfall_penalty, band_low=0.6, band_high=1.4, max_generation_factor=1.3):
+        self.capex = np.array([project['solar_capex'], project['wind_capex']], dtype=float)
+        self.shortfall_penalty = shortfall_penalty
+        # Costs are scaled by the penalty so priced re-solves stay well conditioned
+        self.scale = shortfall_penalty if shortfall_penalty > 0 else 1.0
+        A, row_lower, row_upper = _project_rows(project, band_low, band_high, max_generation_factor)
+        col_upper = np.array([
+            np.inf if project['solar_cuf'] > 0 else 0.0,
+            np.inf if project['wind_cuf'] > 0 else 0.0,
+            np.inf
+        ])
+        self.lp = WarmStartLP(
+            np.append(self.capex, shortfall_penalty) / self.scale, sparse.csr_array(A),
+            row_lower, row_upper, np.zeros(3), col_upper
+        )
+
+    def solve(self, budget_price, transmission_price):
+        """Prices are the multipliers (>= 0) of the budget and transmission rows"""
+        self.lp.set_costs([0, 1, 2], np.append(
+            self.capex * (1 + budget_price) + transmission_price, self.shortfall_penalty
+        ) / self.scale)
+        result = self.lp.solve()
+        if result['status'] != 0 or result['x'] is None:
+            raise ValueError(f"A project cannot meet its contribution and generation limits on its own: {result['message']}")
+        return np.asarray(result['x'], dtype=float)
+
+
+def _default_penalty(projects):
+    # Ten times the dearest way any project could cover 1 kW of peak demand
+    ratios = [
+        project[f'{tech}_capex'] / project[f'{tech}_cuf']
+        for project in projects for tech in ('solar', 'wind')
+        if project[f'{tech}_cuf'] > 0
+    ]
+    return 10 * max(ratios + [1.0])
+
+
+def optimize_portfolio(projects, budget=None, transmission_limits=None, shortfall_penalty=None,
+                       band_low=0.6, band_high=1.4, max_generation_factor=1.3,
+                       max_iterations=200, tolerance=1e-6):
+    """
+    Sizes solar and wind for several projects that share a capex budget and transmission limits
+
+    The joint model is block-structured: one small capacity model per project, tied
+    together only by the budget row and one row per transmission group. It is solved
+    by Lagrangian relaxation: the shared rows are priced out, every project is then
+    solved on its own with those prices added to its capex (a warm-started re-solve),
+    and the prices are updated from a Dantzig-Wolfe restricted master LP over the
+    plans generated so far. The master gives exact LP prices and a feasible portfolio
+    at every step, and work per iteration grows linearly with the number of projects.
+
+    Parameters:
+    - projects: list of dicts with 'project_id', 'demand' (1-D hourly kW array),
+      'solar_cuf', 'wind_cuf' (decimals), 'solar_capex', 'wind_capex' (cost per kW) and
+      optional 'transmission_group'
+    - budget: Total capex allowed across the portfolio (None for no limit)
+    - transmission_limits: dict of transmission group -> installed kW allowed
+    - shortfall_penalty: Cost per kW of peak demand left uncovered
+    - band_low, band_high, max_generation_factor: As for optimize_generation_capacity
+    - max_iterations: Price-update iterations
+    - tolerance: Relative gap between the upper and Lagrangian lower bound to stop at
+
+    Returns:
+    - dict with 'projects' (DataFrame), 'total_capex', 'objective', 'lower_bound', 'gap',
+      'iterations', 'multipliers', 'feasible', 'converged' and 'runtime_seconds'
+    """
+    start_time = time.perf_counter()
+    transmission_limits = transmission_limits or {}
+    shortfall_penalty = _default_penalty(projects) if shortfall_penalty is None else shortfall_penalty
+    groups = list(transmission_limits)
+    n_projects = len(projects)
+
+    subproblems = [
+        _ProjectSubproblem(project, shortfall_penalty, band_low, band_high, max_generation_factor)
+        for project in projects
+    ]
+    group_of = [
+        groups.index(project.get('transmission_group')) if project.get('transmission_group') in transmission_limits else None
+        for project in projects
+    ]
+
+    # Coupling rows: budget (if any) then one per transmission group
+    n_coupling = (budget is not None) + len(groups)
+    coupling_rhs = np.array(([budget] if budget is not None else []) +
+                            [transmission_limits[group] for group in groups], dtype=float)
+
+    def coupling_column(p, x):
+        column = np.zeros(n_coupling)
+        offset = 0
+        if budget is not None:
+            column[0] = subproblems[p].capex @ x[:2]
+            offset = 1
+        if group_of[p] is not None:
+            column[offset + group_of[p]] = x[0] + x[1]
+        return column
+
+    def plan_cost(p, x):
+        return subproblems[p].capex @ x[:2] + shortfall_penalty * x[2]
+
+    plans = [[subproblem.solve(0.0, 0.0)] for subproblem in subproblems]
+    # Artificial slack keeps the first masters feasible; its cost exceeds any price the row can
+    # reach (a kW of capacity never saves more than shortfall_penalty)
+    min_capex = min((subproblem.capex[subproblem.capex > 0].min(initial=np.inf) for subproblem in subproblems),
+                    default=np.inf)
+    budget_artificial = 1e2 * (1 + shortfall_penalty / min_capex) if np.isfinite(min_capex) else 1e2
+    artificial_costs = ([budget_artificial] if budget is not None else []) + [1e2 * shortfall_penalty] * len(groups)
+
+    upper_bound = lower_bound = None
+    prices = np.zeros(n_coupling)
+    converged = False
+    iterations = 0
+    weights = None
+    for iterations in range(1, max_iterations + 1):
+        owners = [p for p in range(n_projects) for _ in plans[p]]
+        columns = [x for p in range(n_projects) for x in plans[p]]
+        costs = np.array([plan_cost(p, x) for p, x in zip(owners, columns)] + artificial_costs)
+        A_coupling = np.column_stack([coupling_column(p, x) for p, x in zip(owners, columns)]
+                                     + [-np.eye(n_coupling)]) if n_coupling else None
+        A_convexity = np.zeros((n_projects, costs.size))
+        A_convexity[owners, np.arange(len(columns))] = 1.0
+
+        master = linprog(
+            costs,
+            A_ub=A_coupling, b_ub=coupling_rhs if n_coupling else None,
+            A_eq=A_convexity, b_eq=np.ones(n_projects),
+            bounds=(0, None), method="highs"
+        )
+        weights = master.x
+        upper_bound = float(master.fun)
+        prices = -master.ineqlin.marginals if n_coupling else np.zeros(0)
+        convexity_duals = master.eqlin.marginals
+
+        # Price each project's capacity with the shared-row multipliers and re-solve it
+        budget_price = prices[0] if budget is not None else 0.0
+        group_prices = prices[1:] if budget is not None else prices
+        lagrangian = -prices @ coupling_rhs if n_coupling else 0.0
+        improving = False
+        for p, subproblem in enumerate(subproblems):
+            transmission_price = group_prices[group_of[p]] if group_of[p] is not None else 0.0
+            x = subproblem.solve(budget_price, transmission_price)
+            reduced = plan_cost(p, x) + prices @ coupling_column(p, x) if n_coupling else plan_cost(p, x)
+            lagrangian += reduced
+            if reduced - convexity_duals[p] < -tolerance * max(1.0, abs(upper_bound)):
+                plans[p].append(x)
+                improving = True
+
+        lower_bound = lagrangian if lower_bound is None else max(lower_bound, lagrangian)
+        if not improving or upper_bound - lower_bound <= tolerance * max(1.0, abs(upper_bound)):
+            converged = True
+            break
+
+    # Recover each project's plan as the master's convex combination of its plans
+    owners = [p for p in range(n_projects) for _ in plans[p]]
+    columns = [x for p in range(n_projects) for x in plans[p]]
+    solution = np.zeros((n_projects, 3))
+    for weight, p, x in zip(weights[:len(columns)], owners, columns):
+        solution[p] += weight * x
+    artificial = weights[len(columns):]
+
+    rows = []
+    for p, project in enumerate(projects):
+        solar_val, wind_val, shortfall = solution[p]
+        rows.append({
+            "Project Id": project.get('project_id', p),
+            "Solar Capacity (kW)": solar_val,
+            "Wind Capacity (kW)": wind_val,
+            "Peak Shortfall (kW)": shortfall,
+            "Capex": float(subproblems[p].capex @ solution[p, :2]),
+            "Transmission Group": project.get('transmission_group')
+        })
+    result_df = pd.DataFrame(rows)
+
+    multipliers = {}
+    if budget is not None:
+        multipliers['budget'] = float(prices[0])
+    for g, group in enumerate(groups):
+        multipliers[group] = float(prices[g + (budget is not None)])
+
+    return {
+        'projects': result_df,
+        'total_capex': float(result_df["Capex"].sum()) if len(result_df) else 0.0,
+        'objective': upper_bound,
+        'lower_bound': lower_bound,
+        'gap': (upper_bound - lower_bound) / max(1.0, abs(upper_bound)) if upper_bound is not None else None,
+        'iterations': iterations,
+        'multipliers': multipliers,
+        'feasible': bool(np.all(artificial <= 1e-6)),
+        'converged': converged,
+        'runtime_seconds': time.perf_counter() - start_time
+    }
+
+
+def solve_portfolio_monolithic(projects, budget=None, transmission_limits=None, shortfall_penalty=None,
+                               band_low=0.6, band_high=1.4, max_generation_factor=1.3):
+    """
+    Solves the same portfolio as one LP with every project's hourly demand rows
+
+    Used as the reference for benchmark_portfolio; the parameters are those of
+    optimize_portfolio.
+
+    Returns:
+    - dict with 'objective', 'total_capex', 'solution' (n_projects x 3) and 'runtime_seconds'
+    """
+    start_time = time.perf_counter()
+    transmission_limits = transmission_limits or {}
+    shortfall_penalty = _default_penalty(projects) if shortfall_penalty is None else shortfall_penalty
+    groups = list(transmission_limits)
+    n_projects = len(projects)
+
+    blocks, lowers, uppers = [], [], []
+    for project in projects:
+        A, row_lower, row_upper = _project_rows(project, band_low, band_high, max_generation_factor)
+        # Expand the peak row back to one row per in-band hour
+        demand, _, in_band = _in_band_demand(project, band_low, band_high)
+        hourly = in_band if in_band.size else demand
+        blocks.append(sparse.vstack([sparse.csr_array(np.tile(A[0], (hourly.size, 1))), sparse.csr_array(A[1:])]))
+        lowers.append(np.concatenate([hourly, row_lower[1:]]))
+        uppers.append(np.concatenate([np.full(hourly.size, np.inf), row_upper[1:]]))
+    A = sparse.block_diag(blocks, format='csr')
+    row_lower = np.concatenate(lowers)
+    row_upper = np.concatenate(uppers)
+
+    capex = np.array([[project['solar_capex'], project['wind_capex']] for project in projects], dtype=float)
+    coupling, coupling_rhs = [], []
+    if budget is not None:
+        coefs = np.zeros((n_projects, 3))
+        coefs[:, :2] = capex
+        coupling.append(coefs.ravel())
+        coupling_rhs.append(budget)
+    for group in groups:
+        coefs = np.zeros((n_projects, 3))
+        members = [p for p, project in enumerate(projects) if project.get('transmission_group') == group]
+        coefs[members, :2] = 1.0
+        coupling.append(coefs.ravel())
+        coupling_rhs.append(transmission_limits[group])
+
+    c = np.column_stack([capex, np.full(n_projects, shortfall_penalty)]).ravel()
+    lower_rows = np.isfinite(row_lower)
+    upper_rows = np.isfinite(row_upper)
+    A_ub = sparse.vstack([-A[lower_rows], A[upper_rows]] + ([sparse.csr_array(np.array(coupling))] if coupling else []),
+                         format='csr')
+    b_ub = np.concatenate([-row_lower[lower_rows], row_upper[upper_rows], coupling_rhs])
+    col_upper = np.array([[np.inf if p['solar_cuf'] > 0 else 0, np.inf if p['wind_cuf'] > 0 else 0, np.inf]
+                          for p in projects]).ravel()
+
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=np.column_stack([np.zeros(c.size), col_upper]), method="highs")
+    solution = res.x.reshape(n_projects, 3) if res.x is not None else np.zeros((n_projects, 3))
+    return {
+        'objective': float(res.fun) if res.x is not None else None,
+        'total_capex': float((capex * solution[:, :2]).sum()),
+        'solution': solution,
+        'runtime_seconds': time.perf_counter() - start_time
+    }
+
+
+def benchmark_portfolio(projects, project_counts=(5, 10, 20, 40), budget_share=0.8, **portfolio_kwargs):
+    """
+    Compares decomposition and monolithic runtimes as the portfolio grows
+
+    The budget for each subset is budget_share of the capex its projects would spend
+    unconstrained, so the shared row is binding at every size. portfolio_kwargs
+    (transmission limits, shortfall penalty and demand band) are given to both solvers.
+
+    Returns:
+    - DataFrame with one row per project count
+    """
+    rows = []
+    for count in project_counts:
+        subset = projects[:count]
+        free = optimize_portfolio(subset, **portfolio_kwargs)
+        budget = budget_share * free['total_capex']
+        decomposed = optimize_portfolio(subset, budget=budget, **portfolio_kwargs)
+        monolithic = solve_portfolio_monolithic(subset, budget=budget, **portfolio_kwargs)
+        rows.append({
+            "Projects": len(subset),
+            "Decomposition (s)": decomposed['runtime_seconds'],
+            "Monolithic (s)": monolithic['runtime_seconds'],
+            "Iterations": decomposed['iterations'],
+            "Objective Gap (%)": ((decomposed['objective'] - monolithic['objective']) / abs(monolithic['objective']) * 100
+                                  if monolithic['objective'] else None)
+        })
+    return pd.DataFrame(rows)
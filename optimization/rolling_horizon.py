@@ -0,0 +1,323 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from optimization.warm_start_lp import WarmStartLP
+
+
+def build_dispatch_window(n_hours, roundtrip_efficiency, depth_of_discharge, energy_capacity,
+                          power_capacity, unmet_penalty=1.0, curtailment_cost=0.0):
+    """
+    Builds the battery dispatch LP for a fixed plant over one window of hours
+
+    Variables are ordered [Charge_0..T-1, Discharge_0..T-1, SOC_0..T-1, Unmet_0..T-1].
+    The first T rows are the energy balance (Discharge - Charge + Unmet >= net demand)
+    and the next T rows the SOC dynamics; row T holds the carried-in state of charge.
+    Net demand, power availability and the initial SOC are left at 0 and are set per
+    window through WarmStartLP so the matrix itself never changes.
+
+    Parameters:
+    - n_hours: Window length in hours
+    - roundtrip_efficiency, depth_of_discharge: Battery parameters as decimals
+    - energy_capacity, power_capacity: Fixed battery size (kWh, kW)
+    - unmet_penalty, curtailment_cost: Energy costs per kWh
+
+    Returns:
+    - c, A, row_lower, row_upper, col_lower, col_upper
+    """
+    eff = np.sqrt(roundtrip_efficiency)
+    eye = sparse.eye_array(n_hours, format='csr')
+    zeros = sparse.csr_array((n_hours, n_hours))
+    shift = sparse.diags_array(np.ones(n_hours - 1), offsets=-1, shape=(n_hours, n_hours), format='csr')
+
+    balance = sparse.hstack([-eye, eye, zeros, eye])
+    dynamics = sparse.hstack([-eff * eye, eye / eff, eye - shift, zeros])
+    A = sparse.vstack([balance, dynamics], format='csr')
+
+    row_lower = np.zeros(2 * n_hours)
+    row_upper = np.concatenate([np.full(n_hours, np.inf), np.zeros(n_hours)])
+
+    col_lower = np.concatenate([
+        np.zeros(2 * n_hours),
+        np.full(n_hours, (1 - depth_of_discharge) * energy_capacity),
+        np.zeros(n_hours)
+    ])
+    col_upper = np.concatenate([
+        np.full(2 * n_hours, power_capacity),
+        np.full(n_hours, energy_capacity),
+        np.full(n_hours, np.inf)
+    ])
+
+    c = np.concatenate([
+        np.full(n_hours, -curtailment_cost),
+        np.full(n_hours, curtailment_cost),
+        np.zeros(n_hours),
+        np.full(n_hours, unmet_penalty + curtailment_cost)
+    ])
+    return c, A, row_lower, row_upper, col_lower, col_upper
+
+
+class _DispatchWindow:
+    """Window LP plus the index bookkeeping needed to update it in place"""
+
+    def __init__(self, n_hours, roundtrip_efficiency, depth_of_discharge, energy_capacity,
+                 power_capacity, unmet_penalty, curtailment_cost):
+        self.n_hours = n_hours
+        self.power_capacity = power_capacity
+        self.lp = WarmStartLP(*build_dispatch_window(
+            n_hours, roundtrip_efficiency, depth_of_discharge, energy_capacity,
+            power_capacity, unmet_penalty, curtailment_cost
+        ))
+        self.balance_rows = np.arange(n_hours)
+        self.power_cols = np.arange(2 * n_hours)
+
+    def solve(self, net_demand, availability, initial_soc):
+        n = self.n_hours
+        self.lp.set_row_bounds(self.balance_rows, net_demand, np.inf)
+        self.lp.set_row_bounds([n], initial_soc, initial_soc)
+        power_upper = np.tile(availability * self.power_capacity, 2)
+        self.lp.set_col_bounds(self.power_cols, 0.0, power_upper)
+        result = self.lp.solve()
+        x = result['x'] if result['x'] is not None else np.zeros(4 * n)
+        result['charge'], result['discharge'], result['soc'], result['unmet'] = (
+            x[k * n:(k + 1) * n] for k in range(4)
+        )
+        return result
+
+
+def _dispatch_frame(demand, generation, charge, discharge, soc, unmet):
+    curtailment = np.clip(generation + discharge - charge + unmet - demand, 0, None)
+    return pd.DataFrame({
+        "Demand": demand,
+        "Total_Generation": generation,
+        "Charge": charge,
+        "Discharge": discharge,
+        "SOC": soc,
+        "Curtailment": curtailment,
+        "Unmet_Demand": unmet
+    })
+
+
+def _dispatch_cost(hourly, unmet_penalty, curtailment_cost):
+    return float(unmet_penalty * hourly["Unmet_Demand"].sum() +
+                 curtailment_cost * hourly["Curtailment"].sum())
+
+
+def _prepare_inputs(demand, solar_shape, wind_shape, capacities, battery_availability):
+    demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+    generation = (capacities.get('solar', 0) * np.asarray(solar_shape, dtype=float) +
+                  capacities.get('wind', 0) * np.asarray(wind_shape, dtype=float))
+    availability = (np.ones(demand.size) if battery_availability is None
+                    else np.asarray(battery_availability, dtype=float))
+    return demand, generation, availability
+
+
+def solve_rolling_horizon(demand, solar_shape, wind_shape, capacities, roundtrip_efficiency=0.97,
+                          depth_of_discharge=0.8, battery_availability=None, window_hours=336,
+                          overlap_hours=48, initial_soc=None, unmet_penalty=1.0, curtailment_cost=0.0):
+    """
+    Dispatches a fixed solar/wind/battery plant over a long horizon in overlapping windows
+
+    Each window of window_hours is solved, the first window_hours - overlap_hours are
+    committed and the state of charge at the end of the committed part is carried into
+    the next window. All full-length windows share one LP whose right-hand sides and
+    bounds are updated in place, so each solve warm-starts from the previous basis.
+
+    Parameters:
+    - demand: 1-D array of hourly demand (kW), e.g. 25 years x 8760 hours
+    - solar_shape, wind_shape: 1-D arrays of per-kW hourly output, aligned with demand
+    - capacities: dict with 'solar', 'wind', 'battery_energy', 'battery_power'
+    - roundtrip_efficiency, depth_of_discharge: Battery parameters as decimals
+    - battery_availability: Optional per-hour fraction of power capacity available
+    - window_hours, overlap_hours: Window length and look-ahead overlap (hours); a one-day
+      overlap lets windows drain the battery just before the look-ahead ends, so the
+      default keeps two days
+    - initial_soc: SOC (kWh) before the first hour (defaults to the minimum SOC)
+    - unmet_penalty, curtailment_cost: Energy costs per kWh
+
+    Returns:
+    - dict with 'hourly' (DataFrame), 'unmet_energy', 'curtailed_energy', 'objective',
+      'windows', 'runtime_seconds', 'iterations' and 'warm_start'
+    """
+    step = window_hours - overlap_hours
+    if step <= 0:
+        raise ValueError("overlap_hours must be smaller than window_hours")
+
+    start_time = time.perf_counter()
+    demand, generation, availability = _prepare_inputs(
+        demand, solar_shape, wind_shape, capacities, battery_availability
+    )
+    n_hours = demand.size
+    energy_capacity = capacities.get('battery_energy', 0)
+    power_capacity = capacities.get('battery_power', 0)
+    soc = (1 - depth_of_discharge) * energy_capacity if initial_soc is None else initial_soc
+
+    window_args = (roundtrip_efficiency, depth_of_discharge, energy_capacity,
+                   power_capacity, unmet_penalty, curtailment_cost)
+    full_window = _DispatchWindow(window_hours, *window_args)
+
+    committed = {key: np.zeros(n_hours) for key in ('charge', 'discharge', 'soc', 'unmet')}
+    windows = 0
+    iterations = 0
+    warm_start = False
+
+    for start in range(0, n_hours, step):
+        end = min(start + window_hours, n_hours)
+        length = end - start
+        window = full_window if length == window_hours else _DispatchWindow(length, *window_args)
+
+        result = window.solve(
+            demand[start:end] - generation[start:end], availability[start:end], soc
+        )
+        commit = length if end == n_hours else min(step, length)
+        for key in committed:
+            committed[key][start:start + commit] = result[key][:commit]
+        soc = result['soc'][commit - 1]
+
+        windows += 1
+        iterations += result['iterations']
+        warm_start = warm_start or result['warm_start']
+        if end == n_hours:
+            break
+
+    hourly = _dispatch_frame(demand, generation, committed['charge'], committed['discharge'],
+                             committed['soc'], committed['unmet'])
+    return {
+        'hourly': hourly,
+        'unmet_energy': float(hourly["Unmet_Demand"].sum()),
+        'curtailed_energy': float(hourly["Curtailment"].sum()),
+        'objective': _dispatch_cost(hourly, unmet_penalty, curtailment_cost),
+        'windows': windows,
+        'runtime_seconds': time.perf_counter() - start_time,
+        'iterations': iterations,
+        'warm_start': warm_start
+    }
+
+
+def solve_monolithic_dispatch(demand, solar_shape, wind_shape, capacities, roundtrip_efficiency=0.97,
+                              depth_of_discharge=0.8, battery_availability=None, initial_soc=None,
+                              unmet_penalty=1.0, curtailment_cost=0.0):
+    """
+    Dispatches a fixed plant over the whole horizon in a single LP
+
+    Uses the same window model as solve_rolling_horizon with one window spanning every
+    hour, so the two results are directly comparable.
+
+    Returns:
+    - dict with 'hourly', 'unmet_energy', 'curtailed_energy', 'objective' and 'runtime_seconds'
+    """
+    start_time = time.perf_counter()
+    demand, generation, availability = _prepare_inputs(
+        demand, solar_shape, wind_shape, capacities, battery_availability
+    )
+    energy_capacity = capacities.get('battery_energy', 0)
+    soc = (1 - depth_of_discharge) * energy_capacity if initial_soc is None else initial_soc
+
+    window = _DispatchWindow(
+        demand.size, roundtrip_efficiency, depth_of_discharge, energy_capacity,
+        capacities.get('battery_power', 0), unmet_penalty, curtailment_cost
+    )
+    result = window.solve(demand - generation, availability, soc)
+
+    hourly = _dispatch_frame(demand, generation, result['charge'], result['discharge'],
+                             result['soc'], result['unmet'])
+    return {
+        'hourly': hourly,
+        'unmet_energy': float(hourly["Unmet_Demand"].sum()),
+        'curtailed_energy': float(hourly["Curtailment"].sum()),
+        'objective': _dispatch_cost(hourly, unmet_penalty, curtailment_cost),
+        'runtime_seconds': time.perf_counter() - start_time
+    }
+
+
+def _objective_gap(rolling, monolithic):
+    """Rolling-horizon objective gap to the monolithic solve, in percent"""
+    if not monolithic['objective']:
+        return 0.0 if not rolling['objective'] else float('inf')
+    return (rolling['objective'] - monolithic['objective']) / abs(monolithic['objective']) * 100
+
+
+def validate_rolling_horizon(demand, solar_shape, wind_shape, capacities, window_hours=336,
+                             overlap_hours=48, validation_hours=2 * 8760, battery_availability=None,
+                             **dispatch_kwargs):
+    """
+    Measures the rolling-horizon objective gap against a single full solve
+
+    A monolithic LP over a multi-decade profile is what the rolling horizon avoids, so
+    both solvers are run on the first validation_hours only and the gap on that slice is
+    reported as an estimate for the whole horizon.
+
+    Parameters:
+    - demand, solar_shape, wind_shape, capacities: As for solve_rolling_horizon
+    - window_hours, overlap_hours: Rolling-horizon settings being validated
+    - validation_hours: Length of the leading slice solved both ways
+    - battery_availability: Optional per-hour fraction of power capacity available
+    - dispatch_kwargs: Battery and cost parameters passed to both solvers
+
+    Returns:
+    - dict with 'validation_hours', 'rolling_objective', 'monolithic_objective' and
+      'objective_gap' (percent)
+    """
+    hours = min(len(demand), validation_hours)
+    sliced = [np.asarray(values, dtype=float)[:hours] for values in (demand, solar_shape, wind_shape)]
+    availability = None if battery_availability is None else np.asarray(battery_availability)[:hours]
+    monolithic = solve_monolithic_dispatch(
+        *sliced, capacities, battery_availability=availability, **dispatch_kwargs
+    )
+    rolling = solve_rolling_horizon(
+        *sliced, capacities, battery_availability=availability,
+        window_hours=window_hours, overlap_hours=overlap_hours, **dispatch_kwargs
+    )
+    return {
+        'validation_hours': hours,
+        'rolling_objective': rolling['objective'],
+        'monolithic_objective': monolithic['objective'],
+        'objective_gap': _objective_gap(rolling, monolithic)
+    }
+
+
+def benchmark_rolling_horizon(demand, solar_shape, wind_shape, capacities,
+                              horizons=((168, 24), (336, 48), (720, 48)), **dispatch_kwargs):
+    """
+    Compares rolling-horizon dispatch against the monolithic solve
+
+    Parameters:
+    - demand, solar_shape, wind_shape, capacities: As for solve_rolling_horizon
+    - horizons: Iterable of (window_hours, overlap_hours) pairs to benchmark
+    - dispatch_kwargs: Battery and cost parameters passed to both solvers
+
+    Returns:
+    - DataFrame with one row per horizon: runtime, objective, gap to the monolithic
+      objective and speed-up
+    """
+    monolithic = solve_monolithic_dispatch(demand, solar_shape, wind_shape, capacities, **dispatch_kwargs)
+    rows = [{
+        "Window (h)": len(monolithic['hourly']),
+        "Overlap (h)": 0,
+        "Windows": 1,
+        "Runtime (s)": monolithic['runtime_seconds'],
+        "Objective": monolithic['objective'],
+        "Objective Gap (%)": 0.0,
+        "Speed-up": 1.0,
+        "Warm Start": False
+    }]
+
+    for window_hours, overlap_hours in horizons:
+        rolling = solve_rolling_horizon(
+            demand, solar_shape, wind_shape, capacities,
+            window_hours=window_hours, overlap_hours=overlap_hours, **dispatch_kwargs
+        )
+        rows.append({
+            "Window (h)": window_hours,
+            "Overlap (h)": overlap_hours,
+            "Windows": rolling['windows'],
+            "Runtime (s)": rolling['runtime_seconds'],
+            "Objective": rolling['objective'],
+            "Objective Gap (%)": _objective_gap(rolling, monolithic),
+            "Speed-up": monolithic['runtime_seconds'] / rolling['runtime_seconds']
+            if rolling['runtime_seconds'] > 0 else None,
+            "Warm Start": rolling['warm_start']
+        })
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,183 @@
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from pulp import (
+    LpProblem, LpVariable, LpMinimize, LpStatus, LpSolution, LpSolutionOptimal,
+    LpSolutionIntegerFeasible, lpSum, listSolvers,
+    PULP_CBC_CMD, HiGHS, HiGHS_CMD, GLPK_CMD
+)
+
+# Backend name -> PuLP solver classes, in order of preference
+SOLVER_BACKENDS = {
+    "CBC": (PULP_CBC_CMD,),
+    "HiGHS": (HiGHS, HiGHS_CMD),
+    "GLPK": (GLPK_CMD,)
+}
+
+BENCHMARK_SIZES = (168, 2190, 8760)
+
+_benchmark_cache = {}
+
+
+@lru_cache(maxsize=1)
+def _installed_solvers():
+    # listSolvers probes every solver executable, so it is only run once
+    return frozenset(listSolvers(onlyAvailable=True))
+
+
+def _available_class(backend):
+    available = _installed_solvers()
+    for solver_class in SOLVER_BACKENDS[backend]:
+        if solver_class.__name__ in available:
+            return solver_class
+    return None
+
+
+def available_backends():
+    """
+    Lists the solver backends installed on this machine
+
+    Returns:
+    - list of backend names from SOLVER_BACKENDS
+    """
+    return [backend for backend in SOLVER_BACKENDS if _available_class(backend) is not None]
+
+
+def get_solver(backend="CBC", time_limit=None, mip_gap=None, threads=None, msg=False):
+    """
+    Creates a PuLP solver for a backend with the given limits
+
+    GLPK has no thread option and takes its MIP gap as a command-line option.
+
+    Parameters:
+    - backend: 'CBC', 'HiGHS' or 'GLPK'
+    - time_limit: Wall-clock limit in seconds (None for no limit)
+    - mip_gap: Relative MIP gap as decimal (e.g. 0.01)
+    - threads: Number of solver threads
+    - msg: Show solver output
+
+    Returns:
+    - PuLP solver instance
+    """
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"Unknown solver backend '{backend}'. Choose from {list(SOLVER_BACKENDS)}")
+    solver_class = _available_class(backend)
+    if solver_class is None:
+        raise ValueError(f"Solver backend '{backend}' is not installed")
+
+    if solver_class is GLPK_CMD:
+        options = ["--mipgap", str(mip_gap)] if mip_gap is not None else None
+        return GLPK_CMD(msg=msg, timeLimit=time_limit, options=options)
+    return solver_class(msg=msg, timeLimit=time_limit, gapRel=mip_gap, threads=threads)
+
+
+def solve_problem(prob, backend="CBC", time_limit=None, mip_gap=None, threads=None, model_size=None):
+    """
+    Solves a PuLP problem and reports how the solve ended
+
+    A solve stopped by the time limit keeps the best feasible solution PuLP
+    loaded into the variables; 'hit_time_limit' and 'solution_status' tell the
+    caller whether it is proven optimal.
+
+    Parameters:
+    - prob: PuLP LpProblem
+    - backend: Backend name or 'Auto' to use select_backend
+    - time_limit, mip_gap, threads: Solver settings
+    - model_size: Number of hourly rows, used by 'Auto' (defaults to the constraint count)
+
+    Returns:
+    - dict with 'backend', 'status', 'solution_status', 'objective', 'seconds',
+      'hit_time_limit' and 'feasible'
+    """
+    if backend == "Auto":
+        backend = select_backend(model_size if model_size is not None else len(prob.constraints))
+    solver = get_solver(backend, time_limit, mip_gap, threads)
+
+    start = time.perf_counter()
+    prob.solve(solver)
+    seconds = time.perf_counter() - start
+
+    solution_status = LpSolution.get(prob.sol_status, "Unknown")
+    feasible = prob.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible)
+    hit_time_limit = bool(time_limit) and seconds >= time_limit * 0.95 and prob.sol_status != LpSolutionOptimal
+    return {
+        'backend': backend,
+        'status': LpStatus.get(prob.status, "Unknown"),
+        'solution_status': solution_status,
+        'objective': prob.objective.value() if feasible and prob.objective is not None else None,
+        'seconds': seconds,
+        'hit_time_limit': hit_time_limit,
+        'feasible': feasible
+    }
+
+
+def _benchmark_problem(n_hours, seed=0):
+    # Same shape as optimize_generation_capacity: two capacities and one row per hour
+    rng = np.random.default_rng(seed)
+    demand = 1000 + 100 * np.sin(np.arange(n_hours) / 24 * 2 * np.pi) + rng.normal(0, 20, n_hours)
+    prob = LpProblem("Solver_Benchmark", LpMinimize)
+    solar = LpVariable("Solar_Capacity", lowBound=0)
+    wind = LpVariable("Wind_Capacity", lowBound=0)
+    prob += lpSum([solar, wind])
+    for i, value in enumerate(demand):
+        prob += solar * 0.2 + wind * 0.35 >= value, f"Demand_Hour_{i}"
+    prob += solar * 0.2 >= demand.mean() * 0.2, "Solar_Min_Contribution"
+    return prob
+
+
+def benchmark_backends(sizes=BENCHMARK_SIZES, backends=None, time_limit=30):
+    """
+    Times every installed backend on synthetic capacity models of several sizes
+
+    Parameters:
+    - sizes: Model sizes in hourly rows
+    - backends: Backends to compare (defaults to available_backends())
+    - time_limit: Per-solve time limit in seconds
+
+    Returns:
+    - DataFrame with 'Model Size', 'Backend', 'Runtime (s)' and 'Status'
+    """
+    backends = backends or available_backends()
+    rows = []
+    for size in sizes:
+        for backend in backends:
+            prob = _benchmark_problem(size)
+            result = solve_problem(prob, backend, time_limit=time_limit)
+            rows.append({
+                "Model Size": size,
+                "Backend": backend,
+                "Runtime (s)": result['seconds'],
+                "Status": result['solution_status']
+            })
+    return pd.DataFrame(rows)
+
+
+def select_backend(model_size, sizes=BENCHMARK_SIZES):
+    """
+    Picks the fastest installed backend for a model of the given size
+
+    The benchmark runs once per process for the benchmark size closest to
+    model_size and the winner is cached.
+
+    Parameters:
+    - model_size: Number of hourly rows in the model
+
+    Returns:
+    - backend name
+    """
+    backends = available_backends()
+    if not backends:
+        raise ValueError("No supported solver backend is installed")
+    if len(backends) == 1:
+        return backends[0]
+
+    bucket = min(sizes, key=lambda size: abs(size - model_size))
+    if bucket not in _benchmark_cache:
+        timings = benchmark_backends(sizes=(bucket,), backends=backends)
+        timings = timings[timings["Status"] == LpSolution[LpSolutionOptimal]]
+        if timings.empty:
+            _benchmark_cache[bucket] = backends[0]
+        else:
+            _benchmark_cache[bucket] = timings.sort_values("Runtime (s)").iloc[0]["Backend"]
+    return _benchmark_cache[bucket]
@@ -0,0 +1,210 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import cdist
+
+from optimization.hourly_capacity_lp import optimize_hourly_capacity
+
+HOURS_PER_DAY = 24
+CLUSTER_CACHE_SIZE = 32
+
+_cluster_cache = OrderedDict()
+
+
+def _daily_matrix(values, n_days):
+    return np.nan_to_num(np.asarray(values, dtype=float)[:n_days * HOURS_PER_DAY], nan=0.0).reshape(
+        n_days, HOURS_PER_DAY
+    )
+
+
+def cluster_representative_days(demand, solar_shape, wind_shape, k, include_extreme_day=True):
+    """
+    Clusters the days of a profile into k representative days
+
+    Each day is described by its 24 demand, solar and wind values, each series scaled
+    by its own peak so no series dominates the distance. Days are grouped with Ward
+    hierarchical clustering and each cluster is represented by its medoid, the member
+    day closest to all others, so representative days are real observed days.
+    Trailing hours that do not fill a whole day are ignored.
+
+    Capacity is sized by the hardest hours, which averaging tends to smooth away, so by
+    default the day with the largest demand left over after scaled solar and wind is
+    kept as its own period with a weight of one day.
+
+    Parameters:
+    - demand, solar_shape, wind_shape: aligned 1-D hourly arrays
+    - k: Number of representative days (including the extreme day)
+    - include_extreme_day: Keep the worst residual-demand day as a separate period
+
+    Returns:
+    - dict with 'day_indices' (medoid day of each cluster), 'weights' (days per cluster),
+      'assignments' (cluster of every day), 'demand', 'solar', 'wind' (k x 24 hours,
+      flattened) and 'hour_weights'
+    """
+    n_days = len(demand) // HOURS_PER_DAY
+    if n_days == 0:
+        raise ValueError("At least one full day of data is required for clustering")
+    k = max(1, min(int(k), n_days))
+
+    daily = [_daily_matrix(series, n_days) for series in (demand, solar_shape, wind_shape)]
+    features = np.hstack([
+        series / series.max() if series.max() > 0 else series for series in daily
+    ])
+
+    extreme_day = None
+    if include_extreme_day and 1 < k < n_days:
+        residual = features[:, :HOURS_PER_DAY] - features[:, HOURS_PER_DAY:2 * HOURS_PER_DAY] - features[:, 2 * HOURS_PER_DAY:]
+        extreme_day = int(np.argmax(residual.max(axis=1)))
+        k -= 1
+
+    remaining = np.arange(n_days) if extreme_day is None else np.delete(np.arange(n_days), extreme_day)
+    if k >= remaining.size:
+        assignments = np.arange(n_days)
+    else:
+        assignments = np.empty(n_days, dtype=int)
+        assignments[remaining] = fcluster(linkage(features[remaining], method='ward'), t=k, criterion='maxclust') - 1
+    if extreme_day is not None:
+        assignments[extreme_day] = assignments.max() + 1
+
+    clusters = np.unique(assignments)
+    day_indices = np.empty(clusters.size, dtype=int)
+    weights = np.empty(clusters.size, dtype=float)
+    for i, cluster in enumerate(clusters):
+        members = np.flatnonzero(assignments == cluster)
+        member_features = features[members]
+        distances = cdist(member_features, member_features).sum(axis=1)
+        day_indices[i] = members[np.argmin(distances)]
+        weights[i] = members.size
+
+    return {
+        'day_indices': day_indices,
+        'weights': weights,
+        'assignments': assignments,
+        'demand': daily[0][day_indices].ravel(),
+        'solar': daily[1][day_indices].ravel(),
+        'wind': daily[2][day_indices].ravel(),
+        'hour_weights': np.repeat(weights, HOURS_PER_DAY)
+    }
+
+
+def get_representative_days(profile_id, demand, solar_shape, wind_shape, k):
+    """
+    Cached cluster_representative_days keyed by profile_id and k
+
+    The key also carries a hash of the input arrays so a re-uploaded profile that
+    reuses an id is clustered again. The cache keeps the most recent
+    CLUSTER_CACHE_SIZE results.
+    """
+    digest = hashlib.sha1()
+    for series in (demand, solar_shape, wind_shape):
+        digest.update(np.ascontiguousarray(series, dtype=float).tobytes())
+    key = (profile_id, int(k), digest.hexdigest())
+
+    if key in _cluster_cache:
+        _cluster_cache.move_to_end(key)
+        return _cluster_cache[key]
+
+    result = cluster_representative_days(demand, solar_shape, wind_shape, k)
+    _cluster_cache[key] = result
+    if len(_cluster_cache) > CLUSTER_CACHE_SIZE:
+        _cluster_cache.popitem(last=False)
+    return result
+
+
+def optimize_representative_capacity(demand, solar_shape, wind_shape, k, profile_id=None, **lp_kwargs):
+    """
+    Runs the hourly-shape capacity LP on k representative days instead of every hour
+
+    Parameters:
+    - demand, solar_shape, wind_shape: aligned 1-D hourly arrays
+    - k: Number of representative days
+    - profile_id: Optional profile id used to cache the clustering
+    - lp_kwargs: Passed to optimize_hourly_capacity
+
+    Returns:
+    - optimize_hourly_capacity result with the clustering under 'clusters' and the
+      clustering time under timings['cluster_seconds']
+    """
+    cluster_start = time.perf_counter()
+    if profile_id is None:
+        clusters = cluster_representative_days(demand, solar_shape, wind_shape, k)
+    else:
+        clusters = get_representative_days(profile_id, demand, solar_shape, wind_shape, k)
+    cluster_seconds = time.perf_counter() - cluster_start
+
+    result = optimize_hourly_capacity(
+        clusters['demand'], clusters['solar'], clusters['wind'],
+        hour_weights=clusters['hour_weights'], **lp_kwargs
+    )
+    result['clusters'] = clusters
+    result['timings']['cluster_seconds'] = cluster_seconds
+    return result
+
+
+def evaluate_aggregation(demand, solar_shape, wind_shape, k_values=(4, 8, 12, 24), profile_id=None, **lp_kwargs):
+    """
+    Reports how far representative-day solves drift from the full-resolution solve
+
+    Capacities from each aggregated solve are replayed against every hour of the full
+    profile to measure the unmet energy they would actually leave.
+
+    Parameters:
+    - demand, solar_shape, wind_shape: aligned 1-D hourly arrays
+    - k_values: Numbers of representative days to compare
+    - profile_id: Optional profile id used to cache the clustering
+    - lp_kwargs: Passed to optimize_hourly_capacity
+
+    Returns:
+    - DataFrame with one row per k (plus the full-resolution reference)
+    """
+    demand = np.nan_to_num(np.asarray(demand, dtype=float), nan=0.0)
+    solar_shape = np.asarray(solar_shape, dtype=float)
+    wind_shape = np.asarray(wind_shape, dtype=float)
+
+    def replay_unmet(solar_capacity, wind_capacity):
+        generation = solar_capacity * solar_shape + wind_capacity * wind_shape
+        return float(np.clip(demand - generation, 0, None).sum())
+
+    full_start = time.perf_counter()
+    full = optimize_hourly_capacity(demand, solar_shape, wind_shape, **lp_kwargs)
+    full_seconds = time.perf_counter() - full_start
+    full_total = full['solar_capacity'] + full['wind_capacity']
+    full_unmet = replay_unmet(full['solar_capacity'], full['wind_capacity'])
+
+    rows = [{
+        "Representative Days": "Full",
+        "Hours Modelled": demand.size,
+        "Runtime (s)": full_seconds,
+        "Solar Capacity (kW)": full['solar_capacity'],
+        "Wind Capacity (kW)": full['wind_capacity'],
+        "Capacity Delta (%)": 0.0,
+        "Unmet Energy (kWh)": full_unmet,
+        "Unmet Delta (kWh)": 0.0,
+        "Speed-up": 1.0
+    }]
+
+    for k in k_values:
+        start = time.perf_counter()
+        result = optimize_representative_capacity(
+            demand, solar_shape, wind_shape, k, profile_id=profile_id, **lp_kwargs
+        )
+        seconds = time.perf_counter() - start
+        total = result['solar_capacity'] + result['wind_capacity']
+        unmet = replay_unmet(result['solar_capacity'], result['wind_capacity'])
+        rows.append({
+            "Representative Days": int(k),
+            "Hours Modelled": result['clusters']['demand'].size,
+            "Runtime (s)": seconds,
+            "Solar Capacity (kW)": result['solar_capacity'],
+            "Wind Capacity (kW)": result['wind_capacity'],
+            "Capacity Delta (%)": (total - full_total) / full_total * 100 if full_total else 0.0,
+            "Unmet Energy (kWh)": unmet,
+            "Unmet Delta (kWh)": unmet - full_unmet,
+            "Speed-up": full_seconds / seconds if seconds > 0 else None
+        })
+
+    return pd.DataFrame(rows)
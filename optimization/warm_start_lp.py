@@ -0,0 +1,159 @@
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+
+class WarmStartLP:
+    """
+    LP kept in memory between solves so bounds, costs and coefficients can be changed in place
+
+    The model is stored as row_lower <= A @ x <= row_upper with column bounds. When
+    highspy is installed the HiGHS instance keeps its simplex basis across edits, so
+    every re-solve warm-starts from the previous optimum. Without highspy the stored
+    arrays are re-solved from scratch with scipy.optimize.linprog.
+    """
+
+    def __init__(self, c, A, row_lower, row_upper, col_lower, col_upper, time_limit=None):
+        """
+        Parameters:
+        - c: objective coefficients (minimized)
+        - A: scipy.sparse constraint matrix
+        - row_lower, row_upper: row activity bounds (use -np.inf / np.inf for open sides)
+        - col_lower, col_upper: variable bounds
+        - time_limit: Optional solver time limit in seconds
+        """
+        self.c = np.asarray(c, dtype=float).copy()
+        self.A = sparse.csr_array(A)
+        self.row_lower = np.asarray(row_lower, dtype=float).copy()
+        self.row_upper = np.asarray(row_upper, dtype=float).copy()
+        self.col_lower = np.asarray(col_lower, dtype=float).copy()
+        self.col_upper = np.asarray(col_upper, dtype=float).copy()
+        self.time_limit = time_limit
+        self.solve_count = 0
+        self._highs = self._create_highs() if highspy is not None else None
+
+    @property
+    def warm_start(self):
+        return self._highs is not None
+
+    def _create_highs(self):
+        h = highspy.Highs()
+        h.setOptionValue("output_flag", False)
+        if self.time_limit:
+            h.setOptionValue("time_limit", float(self.time_limit))
+
+        csc = self.A.tocsc()
+        lp = highspy.HighsLp()
+        lp.num_col_ = csc.shape[1]
+        lp.num_row_ = csc.shape[0]
+        lp.col_cost_ = self.c
+        lp.col_lower_ = self.col_lower
+        lp.col_upper_ = self.col_upper
+        lp.row_lower_ = self.row_lower
+        lp.row_upper_ = self.row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = csc.indptr
+        lp.a_matrix_.index_ = csc.indices
+        lp.a_matrix_.value_ = csc.data
+        h.passModel(lp)
+        return h
+
+    def set_row_bounds(self, rows, lower, upper):
+        rows = np.asarray(rows, dtype=np.int32)
+        lower = np.broadcast_to(np.asarray(lower, dtype=float), rows.shape)
+        upper = np.broadcast_to(np.asarray(upper, dtype=float), rows.shape)
+        self.row_lower[rows] = lower
+        self.row_upper[rows] = upper
+        if self._highs is not None:
+            self._highs.changeRowsBounds(rows.size, rows, np.ascontiguousarray(lower), np.ascontiguousarray(upper))
+
+    def set_col_bounds(self, cols, lower, upper):
+        cols = np.asarray(cols, dtype=np.int32)
+        lower = np.broadcast_to(np.asarray(lower, dtype=float), cols.shape)
+        upper = np.broadcast_to(np.asarray(upper, dtype=float), cols.shape)
+        self.col_lower[cols] = lower
+        self.col_upper[cols] = upper
+        if self._highs is not None:
+            self._highs.changeColsBounds(cols.size, cols, np.ascontiguousarray(lower), np.ascontiguousarray(upper))
+
+    def set_costs(self, cols, costs):
+        cols = np.asarray(cols, dtype=np.int32)
+        costs = np.broadcast_to(np.asarray(costs, dtype=float), cols.shape)
+        self.c[cols] = costs
+        if self._highs is not None:
+            self._highs.changeColsCost(cols.size, cols, np.ascontiguousarray(costs))
+
+    def set_coefficient(self, row, col, value):
+        self.A[row, col] = value
+        if self._highs is not None:
+            self._highs.changeCoeff(int(row), int(col), float(value))
+
+    def solve(self):
+        """
+        Solves the current model
+
+        Returns:
+        - dict with 'x', 'objective', 'status' (0 when optimal), 'message', 'seconds',
+          'iterations' and 'warm_start'
+        """
+        start = time.perf_counter()
+        if self._highs is not None:
+            result = self._solve_highs()
+        else:
+            result = self._solve_linprog()
+        result['seconds'] = time.perf_counter() - start
+        result['warm_start'] = self._highs is not None and self.solve_count > 0
+        self.solve_count += 1
+        return result
+
+    def _solve_highs(self):
+        h = self._highs
+        h.run()
+        model_status = h.getModelStatus()
+        if model_status != highspy.HighsModelStatus.kOptimal and self.solve_count > 0:
+            # A stale basis can leave HiGHS without a status; retry once from scratch
+            h.clearSolver()
+            h.run()
+            model_status = h.getModelStatus()
+        info = h.getInfo()
+        optimal = model_status == highspy.HighsModelStatus.kOptimal
+        has_solution = info.primal_solution_status == 2
+        x = np.asarray(h.getSolution().col_value) if has_solution else None
+        return {
+            'x': x,
+            'objective': float(info.objective_function_value) if has_solution else None,
+            'status': 0 if optimal else 1,
+            'message': h.modelStatusToString(model_status),
+            'iterations': int(info.simplex_iteration_count)
+        }
+
+    def _solve_linprog(self):
+        eq = self.row_lower == self.row_upper
+        ub = ~eq & np.isfinite(self.row_upper)
+        lb = ~eq & np.isfinite(self.row_lower)
+        A_ub = sparse.vstack([self.A[ub], -self.A[lb]], format='csr')
+        b_ub = np.concatenate([self.row_upper[ub], -self.row_lower[lb]])
+        A_eq = self.A[eq] if eq.any() else None
+        b_eq = self.row_lower[eq] if eq.any() else None
+        options = {'time_limit': float(self.time_limit)} if self.time_limit else None
+
+        res = linprog(
+            self.c,
+            A_ub=A_ub if b_ub.size else None, b_ub=b_ub if b_ub.size else None,
+            A_eq=A_eq, b_eq=b_eq,
+            bounds=np.column_stack([self.col_lower, self.col_upper]),
+            method="highs", options=options
+        )
+        return {
+            'x': res.x,
+            'objective': float(res.fun) if res.x is not None else None,
+            'status': res.status,
+            'message': res.message,
+            'iterations': int(getattr(res, 'nit', 0))
+        }
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# utils.db and utils.sqlite_backend read these at import, so they are set before any test imports them
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='besos-tests-'), 'energy_projects.db')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
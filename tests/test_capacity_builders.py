@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimization.capacity_planning_lp import optimize_generation_capacity, optimize_generation_capacity_sparse
+from optimization.persistent_capacity_lp import PersistentCapacityOptimizer
+
+
+def _demand(hours=24 * 14, seed=0):
+    rng = np.random.default_rng(seed)
+    demand = 1000 + 200 * np.sin(np.arange(hours) / 24 * 2 * np.pi) + rng.normal(0, 30, hours)
+    return pd.DataFrame({'Hour': range(hours), 'Demand': demand})
+
+
+@pytest.mark.parametrize('solar_cuf, wind_cuf', [(0.2, 0.35), (0.35, 0.2), (0.2, 0.0), (0.0, 0.3), (0.255, 0.25)])
+def test_builders_agree(solar_cuf, wind_cuf):
+    demand_df = _demand()
+    dense_solar, dense_wind, result_df = optimize_generation_capacity(demand_df, solar_cuf, wind_cuf)
+    sparse_solar, sparse_wind, _, timings = optimize_generation_capacity_sparse(demand_df, solar_cuf, wind_cuf)
+    persistent_solar, persistent_wind, persistent_timings = PersistentCapacityOptimizer(
+        demand_df['Demand'].to_numpy(), solar_cuf, wind_cuf
+    ).solve()
+
+    assert result_df.attrs['solver']['feasible']
+    assert timings['feasible'] and persistent_timings['feasible']
+    dense_total = dense_solar + dense_wind
+    assert sparse_solar + sparse_wind == pytest.approx(dense_total, rel=1e-6)
+    assert persistent_solar + persistent_wind == pytest.approx(dense_total, rel=1e-6)
+
+
+def test_persistent_update_matches_fresh_build():
+    demand_df = _demand()
+    optimizer = PersistentCapacityOptimizer(demand_df['Demand'].to_numpy(), 0.2, 0.35)
+    optimizer.solve()
+    optimizer.update(solar_cuf=0.22, wind_cuf=0.3)
+    solar, wind, _ = optimizer.solve()
+    sparse_solar, sparse_wind, _, _ = optimize_generation_capacity_sparse(demand_df, 0.22, 0.3)
+    assert solar + wind == pytest.approx(sparse_solar + sparse_wind, rel=1e-6)
+
+
+def test_infeasible_solve_is_reported():
+    # A solar-only peak above the generation cap cannot be met
+    demand_df = pd.DataFrame({'Hour': range(4), 'Demand': [100.0, 100.0, 100.0, 150.0]})
+    _, _, result_df = optimize_generation_capacity(demand_df, 0.2, 0.0)
+    solar, wind, _, timings = optimize_generation_capacity_sparse(demand_df, 0.2, 0.0)
+    _, _, persistent_timings = PersistentCapacityOptimizer(demand_df['Demand'].to_numpy(), 0.2, 0.0).solve()
+
+    assert not result_df.attrs['solver']['feasible']
+    assert not timings['feasible'] and (solar, wind) == (0, 0)
+    assert not persistent_timings['feasible']
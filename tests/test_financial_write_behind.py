@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from utils.db import get_connection, release_connection
+from utils.financial_outputs import FinancialWriteBehind
+
+PROJECT_ID = 'test-write-behind'
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    # Jobs are drained and written by the test instead of the worker thread
+    writer = FinancialWriteBehind(retry_delays=())
+    monkeypatch.setattr(writer, '_ensure_worker', lambda: None)
+    yield writer
+    release_connection()
+
+
+def _schedules(asset_value):
+    asset_df = pd.DataFrame({'Asset value': [asset_value, asset_value / 2]}, index=['Year 1', 'Year 2'])
+    return {'asset_df': asset_df}
+
+
+def _stored_asset_values(run_number):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT asset_value FROM besos_fin_analysis_solar_asset WHERE project_id = %s AND run_number = %s "
+        "ORDER BY year", (PROJECT_ID, run_number)
+    )
+    values = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return values
+
+
+def test_drain_keeps_newest_submission_per_run(writer):
+    writer.submit(PROJECT_ID, 1, _schedules(100.0), {})
+    writer.submit(PROJECT_ID, 1, _schedules(200.0), {})
+    writer.submit(PROJECT_ID, 2, _schedules(300.0), {})
+
+    batch = writer._drain()
+    assert set(batch) == {(PROJECT_ID, 1), (PROJECT_ID, 2)}
+    snapshot, _, sequence = batch[(PROJECT_ID, 1)]
+    assert sequence == 2
+    assert snapshot['solar']['asset_df']['Asset value'].iloc[0] == 200.0
+
+
+def test_older_write_does_not_mark_newer_submission_saved(writer):
+    key = (PROJECT_ID, 3)
+    writer.submit(*key, _schedules(100.0), {})
+    older = writer._drain()
+    writer.submit(*key, _schedules(200.0), {})
+
+    writer._write(older)
+    assert writer.status(*key)['state'] == 'queued'
+    assert _stored_asset_values(3) == [100.0, 50.0]
+
+    writer._write(writer._drain())
+    status = writer.status(*key)
+    assert status['state'] == 'saved' and status['rows'] == 2
+    assert _stored_asset_values(3) == [200.0, 100.0]
+
+
+def test_failed_write_is_reported(writer, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr('utils.financial_outputs.save_financial_schedules', fail)
+    writer.submit(PROJECT_ID, 4, _schedules(100.0), {})
+    writer._write(writer._drain())
+    status = writer.status(PROJECT_ID, 4)
+    assert status['state'] == 'failed'
+    assert status['error'] == "database unavailable"
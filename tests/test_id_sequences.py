@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db import get_connection, release_connection
+from utils.id_sequences import allocate_id, peek_next_id
+
+SEED_QUERY = "SELECT %s"
+
+
+def _allocate(name, seed):
+    try:
+        return allocate_id(get_connection(), name, SEED_QUERY, (seed,))
+    finally:
+        release_connection()
+
+
+def test_first_allocation_continues_from_seed():
+    assert peek_next_id(get_connection(), 'test-seed', SEED_QUERY, (41,)) == 42
+    assert _allocate('test-seed', 41) == 42
+    assert _allocate('test-seed', 41) == 43
+    assert peek_next_id(get_connection(), 'test-seed', SEED_QUERY, (41,)) == 44
+
+
+def test_concurrent_allocations_are_distinct():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda _: _allocate('test-threads', 0), range(64)))
+    assert sorted(ids) == list(range(1, 65))
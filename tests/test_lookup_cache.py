@@ -0,0 +1,78 @@
+import pytest
+
+from utils import lookup_cache
+from utils.lookup_cache import PROFILES, PROJECTS, cached_lookup, invalidate
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    # Entries are keyed by where the function is defined, so tests would otherwise share them
+    invalidate(PROJECTS, PROFILES)
+
+
+@pytest.fixture
+def counted():
+    calls = []
+
+    @cached_lookup(PROJECTS)
+    def lookup(project_id):
+        calls.append(project_id)
+        return [project_id, len(calls)]
+
+    return lookup, calls
+
+
+def test_results_are_cached_per_arguments(counted):
+    lookup, calls = counted
+    assert lookup('a') == lookup('a')
+    lookup('b')
+    assert calls == ['a', 'b']
+
+
+def test_callers_get_copies(counted):
+    lookup, _ = counted
+    lookup('copy').append('changed')
+    assert lookup('copy') == ['copy', 1]
+
+
+def test_invalidate_drops_only_its_group(counted):
+    lookup, calls = counted
+    lookup('c')
+    invalidate(PROFILES)
+    lookup('c')
+    assert calls == ['c']
+    invalidate(PROJECTS)
+    assert lookup('c') == ['c', 2]
+
+
+def test_expired_entries_are_reloaded(monkeypatch):
+    calls = []
+
+    @cached_lookup(PROFILES, ttl=10)
+    def lookup():
+        calls.append(1)
+        return len(calls)
+
+    now = [1000.0]
+    monkeypatch.setattr(lookup_cache.time, 'monotonic', lambda: now[0])
+    assert lookup() == 1
+    now[0] += 5
+    assert lookup() == 1
+    now[0] += 10
+    assert lookup() == 2
+
+
+def test_lookup_racing_an_invalidation_is_not_stored():
+    calls = []
+
+    @cached_lookup(PROJECTS)
+    def lookup():
+        calls.append(1)
+        if len(calls) == 1:
+            # A write lands while the first lookup is still reading
+            invalidate(PROJECTS)
+        return len(calls)
+
+    assert lookup() == 1
+    assert lookup() == 2
+    assert lookup() == 2
@@ -0,0 +1,87 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.db import get_connection
+from utils.profile_ingestion import (
+    ensure_staging_tables, fetch_profile_grid, fetch_stored_profile, publish_staged_profile,
+    stage_hourly_gaps, staging_table, stream_profile_file, upsert_staged_profile
+)
+
+PROJECT_ID = 'test-upsert'
+
+
+@pytest.fixture
+def cursor():
+    conn = get_connection()
+    cursor = conn.cursor()
+    ensure_staging_tables(cursor)
+    conn.commit()
+    yield cursor
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+
+def _csv(timestamps, values):
+    frame = pd.DataFrame({'timestamp': pd.DatetimeIndex(timestamps).astype(str), 'demand': values})
+    return io.BytesIO(frame.to_csv(index=False).encode())
+
+
+def _save(cursor, profile_id, files, append):
+    stored = fetch_stored_profile(cursor, 'demand', PROJECT_ID, profile_id) if append else None
+    resolutions = [
+        stream_profile_file(cursor, 'demand', PROJECT_ID, profile_id, file, 'demand.csv',
+                            table=staging_table('demand'), stored=stored, chunk_rows=17)['native_resolution']
+        for file in files
+    ]
+    stage_hourly_gaps(cursor, 'demand', PROJECT_ID, profile_id, min(resolutions), append)
+    if append:
+        return upsert_staged_profile(cursor, 'demand', PROJECT_ID, profile_id)
+    return publish_staged_profile(cursor, 'demand', PROJECT_ID, profile_id)
+
+
+def test_save_then_append_round_trip(cursor):
+    hours = pd.date_range('2024-01-01', periods=48, freq='h')
+    assert _save(cursor, 1, [_csv(hours[:24], np.arange(24.0))], append=False) == 24
+
+    # Hours 20-23 change, 24-29 are new
+    added, replaced = _save(cursor, 1, [_csv(hours[20:30], np.arange(20.0, 30.0) + 100)], append=True)
+    assert (added, replaced) == (6, 4)
+
+    grid = fetch_profile_grid(cursor, 'demand', PROJECT_ID, 1)
+    assert list(grid['timestamp']) == list(hours[:30])
+    np.testing.assert_allclose(grid['value'], np.r_[np.arange(20.0), np.arange(20.0, 30.0) + 100])
+    assert (grid['gap_flag'] == 0).all()
+
+    # Appending the same rows again changes nothing
+    assert _save(cursor, 1, [_csv(hours[20:30], np.arange(20.0, 30.0) + 100)], append=True) == (0, 0)
+
+
+def test_append_counts_hours_staged_by_several_files(cursor):
+    hours = pd.date_range('2024-02-01', periods=12, freq='h')
+    _save(cursor, 2, [_csv(hours[:8], np.ones(8))], append=False)
+
+    added, replaced = _save(cursor, 2, [_csv(hours[6:], np.full(6, 3.0)), _csv(hours[6:], np.full(6, 5.0))],
+                            append=True)
+    assert (added, replaced) == (4, 2)
+
+    grid = fetch_profile_grid(cursor, 'demand', PROJECT_ID, 2)
+    assert len(grid) == 12
+    np.testing.assert_allclose(grid['value'][6:], 4.0)
+    cursor.execute(f"SELECT COUNT(*) FROM {staging_table('demand')} WHERE project_id = %s", (PROJECT_ID,))
+    assert cursor.fetchone()[0] == 0
+
+
+def test_gaps_are_filled_with_flags(cursor):
+    hours = pd.date_range('2024-03-01', periods=24, freq='h')
+    keep = np.ones(24, dtype=bool)
+    keep[5:7] = False
+    _save(cursor, 3, [_csv(hours[keep], np.arange(24.0)[keep])], append=False)
+
+    grid = fetch_profile_grid(cursor, 'demand', PROJECT_ID, 3)
+    assert len(grid) == 24
+    assert (grid['gap_flag'][5:7] > 0).all()
+    np.testing.assert_allclose(grid['value'][5:7], [5.0, 6.0])
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+try:
+    import mysql.connector
+    import mysql.connector.pooling
+except ImportError:
+    mysql = None
+
+from utils.sqlite_backend import SQLITE_PATH, SQLitePool
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
+# 'mysql' (server) or 'sqlite' (local energy_projects.db, no server needed)
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '3306')),
+    'user': os.getenv('DB_USER', 'root'),
+    'password': os.getenv('DB_PASSWORD', '*******'), #Set DB_PASSWORD in .env
+    'database': os.getenv('DB_NAME', 'imdb')
+}
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+# A leased connection idle for longer than this is pinged before it is reused
+HEALTH_CHECK_SECONDS = float(os.getenv('DB_HEALTH_CHECK_SECONDS', '30'))
+
+# Exceptions raised by either backend, for the pages' except clauses
+DatabaseError = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql is not None else ())
+
+_pool = None
+_pool_lock = threading.Lock()
+# Thread ident -> _Lease; read and written under _pool_lock. A lease is popped before its
+# connection goes back to the pool, so only the thread that popped it returns it
+_leases = {}
+
+
+def get_pool():
+    """Process-wide connection pool of the configured DB_BACKEND, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None and DB_BACKEND == 'sqlite':
+                _pool = SQLitePool(SQLITE_PATH, size=DB_POOL_SIZE)
+            elif _pool is None:
+                _pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name="besos", pool_size=DB_POOL_SIZE, pool_reset_session=True, **DB_CONFIG
+                )
+    return _pool
+
+
+class _Lease:
+    def __init__(self, thread, connection):
+        self.thread = thread
+        self.connection = connection
+        self.last_used = time.monotonic()
+        self.open_handles = 0
+
+
+class LeasedConnection:
+    """
+    Connection handed to page helpers
+    Behaves like a mysql.connector connection, but close() only ends the helper's use of
+    it and the connection stays leased to the thread for the next helper, so no new
+    handshake is needed. When the last open handle on the thread is closed, an
+    uncommitted transaction is rolled back as a real close would; a helper nested in
+    another one therefore never rolls back the outer helper's work.
+    """
+
+    def __init__(self, lease):
+        self._lease = lease
+        self._closed = False
+        lease.open_handles += 1
+
+    def __getattr__(self, name):
+        return getattr(self._lease.connection, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._lease.open_handles -= 1
+        if self._lease.open_handles == 0 and self._lease.connection.in_transaction:
+            self._lease.connection.rollback()
+
+
+def _return_to_pool(connection):
+    try:
+        connection.close()
+    except DatabaseError:
+        pass
+
+
+def _reclaim_dead_leases():
+    # Streamlit runs each script run on its own thread; leases of finished runs go back to the pool
+    with _pool_lock:
+        dead = [ident for ident, lease in _leases.items() if not lease.thread.is_alive()]
+        connections = [_leases.pop(ident).connection for ident in dead]
+    for connection in connections:
+        _return_to_pool(connection)
+
+
+def _borrow():
+    _reclaim_dead_leases()
+    if DB_BACKEND == 'sqlite':
+        return get_pool().get_connection()
+    try:
+        return get_pool().get_connection()
+    except mysql.connector.errors.PoolError:
+        # Every pooled connection is leased; serve this thread without the pool
+        return mysql.connector.connect(**DB_CONFIG)
+
+
+def get_connection():
+    """
+    Returns the calling thread's database connection
+    The backend is chosen by DB_BACKEND; both speak the mysql.connector interface and
+    SQL dialect (see utils.sqlite_backend for the SQLite translation). The first call on a thread leases a connection from the process-wide pool; later
+    calls on the same thread (the rest of a Streamlit run) reuse it. A connection idle
+    for more than HEALTH_CHECK_SECONDS is pinged and reconnected if the server dropped it.
+    Returns:
+        LeasedConnection
+    """
+    thread = threading.current_thread()
+    stale = None
+    with _pool_lock:
+        lease = _leases.get(thread.ident)
+        if lease is not None and lease.thread is not thread:
+            # The thread ident was reused after the leasing thread ended
+            stale = _leases.pop(thread.ident)
+            lease = None
+    if stale is not None:
+        _return_to_pool(stale.connection)
+
+    if lease is None:
+        lease = _Lease(thread, _borrow())
+        with _pool_lock:
+            _leases[thread.ident] = lease
+    elif lease.open_handles == 0 and time.monotonic() - lease.last_used > HEALTH_CHECK_SECONDS:
+        try:
+            lease.connection.ping(reconnect=True, attempts=1)
+        except DatabaseError:
+            _return_to_pool(lease.connection)
+            lease.connection = _borrow()
+    lease.last_used = time.monotonic()
+    return LeasedConnection(lease)
+
+
+def release_connection():
+    """Returns the calling thread's leased connection to the pool (e.g. at the end of a worker)"""
+    with _pool_lock:
+        lease = _leases.pop(threading.get_ident(), None)
+    if lease is not None:
+        if lease.connection.in_transaction:
+            lease.connection.rollback()
+        _return_to_pool(lease.connection)
@@ -0,0 +1,366 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.db import get_connection, release_connection
+
+# LCOE breakdown frame column -> besos_lcoe_breakdown column
+BREAKDOWN_COLUMNS = {
+    "Gross generation / kWh input (for Storage)": "gross_generation_kwh_input",
+    "Net generation / kWh available (for Storage)": "net_generation_kwh_available",
+    "Operation and Maintenance Expenses": "operation_maintenance_expenses",
+    "Insurance": "insurance",
+    "Depreciation (on gross capital cost)": "depreciation_gross_capital",
+    "Depreciation (on net capital cost)": "depreciation_net_capital",
+    "Interest on Term Loan": "interest_term_loan",
+    "Interest on Working Capital": "interest_working_capital",
+    "Return on Equity": "return_on_equity",
+    "Total Cost of Generation": "total_cost_generation",
+    "Cost Of Generation per kWh": "cost_generation_per_kwh",
+    "Discount factor": "discount_factor",
+    "Present value": "present_value",
+    "Annual Cost (INR)": "annual_cost_inr",
+    "Discounted Cost (INR)": "discounted_cost_inr",
+    "Discounted Gen (kWh)": "discounted_gen_kwh"
+}
+
+_BREAKDOWN_VALUE_COLUMNS = list(BREAKDOWN_COLUMNS.values()) + ["calculated_at"]
+
+# Each row is sent once; the update side reads it back with VALUES(col)
+BREAKDOWN_UPSERT = f"""
+    INSERT INTO besos_lcoe_breakdown
+        (project_id, run_number, technology, year, {", ".join(_BREAKDOWN_VALUE_COLUMNS)})
+    VALUES ({", ".join(["%s"] * (4 + len(_BREAKDOWN_VALUE_COLUMNS)))})
+    ON DUPLICATE KEY UPDATE {", ".join(f"{column} = VALUES({column})" for column in _BREAKDOWN_VALUE_COLUMNS)}
+"""
+
+# Rows per executemany call; mysql.connector sends each call as one multi-row INSERT
+BREAKDOWN_BATCH_ROWS = 500
+
+# financial data key -> (table suffix, schedule frame column -> table column)
+FINANCIAL_SCHEDULES = {
+    'debt_df': ('debt', {
+        'Debt opening balance': 'debt_opening_balance',
+        'Debt repayment': 'debt_repayment',
+        'Debt closing balance': 'debt_closing_balance',
+        'Interest': 'interest',
+        'Total debt service': 'total_debt_service'
+    }),
+    'wc_df': ('working_capital', {
+        'Operation and Maintenance wcap': 'operation_maintenance_wcap',
+        'Interest on working capital - O&M': 'interest_on_wc_om',
+        'Receivables wcap': 'receivables_wcap',
+        'Interest on receivables wcap': 'interest_on_receivables_wcap',
+        'Total Working Capital': 'total_working_capital',
+        'Interest on working capital': 'interest_on_working_capital'
+    }),
+    'asset_df': ('asset', {
+        'Asset value': 'asset_value'
+    })
+}
+
+# Seconds to wait before each retry of a failed background write
+WRITE_RETRY_DELAYS = (1, 5, 15)
+
+BENCHMARK_HORIZONS = (25, 40, 100)
+BENCHMARK_PROJECT_ID = "__breakdown_benchmark__"
+
+
+def breakdown_rows(project_id, run_number, df_breakdown, calculated_at):
+    """
+    Converts an LCOE breakdown frame to besos_lcoe_breakdown parameter rows
+    Values are converted column-wise; missing or non-numeric values become 0, as
+    handle_nan_value does on the LCOE Outputs page.
+    Args:
+        df_breakdown: frame with 'Technology', 'Year' and every BREAKDOWN_COLUMNS key
+        calculated_at: timestamp stored with every row
+    Returns:
+        list of tuples in BREAKDOWN_UPSERT parameter order
+    """
+    values = (
+        df_breakdown[list(BREAKDOWN_COLUMNS)]
+        .apply(pd.to_numeric, errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=float)
+        .tolist()
+    )
+    technologies = df_breakdown["Technology"].tolist()
+    years = df_breakdown["Year"].astype(int).tolist()
+    return [
+        (project_id, run_number, technology, year, *row, calculated_at)
+        for technology, year, row in zip(technologies, years, values)
+    ]
+
+
+def save_lcoe_breakdown(cursor, project_id, run_number, df_breakdown, calculated_at, batch_size=BREAKDOWN_BATCH_ROWS):
+    """
+    Upserts a whole LCOE breakdown with executemany
+    A 100-year two-technology breakdown is one statement instead of 200 single-row
+    upserts that each carry every value twice. The caller owns the transaction.
+    Returns:
+        number of rows written
+    """
+    rows = breakdown_rows(project_id, run_number, df_breakdown, calculated_at)
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(BREAKDOWN_UPSERT, rows[start:start + batch_size])
+    return len(rows)
+
+
+def _save_lcoe_breakdown_per_row(cursor, project_id, run_number, df_breakdown, calculated_at):
+    # The per-row path the LCOE Outputs page used before save_lcoe_breakdown, kept as the benchmark baseline
+    update = ", ".join(f"{column} = %s" for column in _BREAKDOWN_VALUE_COLUMNS)
+    query = BREAKDOWN_UPSERT.split("ON DUPLICATE KEY UPDATE")[0] + f"ON DUPLICATE KEY UPDATE {update}"
+    for _, row in df_breakdown.iterrows():
+        values = []
+        for label in BREAKDOWN_COLUMNS:
+            value = pd.to_numeric(row[label], errors="coerce")
+            values.append(0.0 if pd.isna(value) else float(value))
+        values.append(calculated_at)
+        cursor.execute(query, (project_id, run_number, row["Technology"], int(row["Year"]), *values, *values))
+    return len(df_breakdown)
+
+
+def _benchmark_breakdown(horizon, seed=0):
+    # Same shape as the LCOE Outputs breakdown: Solar and Wind, one row per year
+    rng = np.random.default_rng(seed)
+    frames = []
+    for technology in ("Solar", "Wind"):
+        frame = pd.DataFrame(rng.uniform(0, 1e7, size=(horizon, len(BREAKDOWN_COLUMNS))), columns=list(BREAKDOWN_COLUMNS))
+        frame.insert(0, "Year", np.arange(1, horizon + 1))
+        frame.insert(0, "Technology", technology)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def benchmark_breakdown_writes(conn, horizons=BENCHMARK_HORIZONS, runs=20):
+    """
+    Times the per-row and executemany breakdown writers against a live database
+    Every run writes a fresh run number (insert) and then writes it again (update),
+    committing each write like the LCOE Outputs page does. The benchmark rows are
+    written under BENCHMARK_PROJECT_ID and deleted afterwards.
+    Args:
+        conn: database connection (utils.db.get_connection)
+        horizons: project lives in years to benchmark
+        runs: runs per horizon and writer
+    Returns:
+        DataFrame with 'Horizon (years)', 'Writer', 'Operation', 'Rows' and 'Mean (ms)'
+    """
+    writers = {"per row": _save_lcoe_breakdown_per_row, "executemany": save_lcoe_breakdown}
+    cursor = conn.cursor()
+    results = []
+    run_number = 0
+    try:
+        for horizon in horizons:
+            df_breakdown = _benchmark_breakdown(horizon)
+            for writer_name, writer in writers.items():
+                timings = {"insert": [], "update": []}
+                for _ in range(runs):
+                    run_number += 1
+                    for operation in ("insert", "update"):
+                        start = time.perf_counter()
+                        writer(cursor, BENCHMARK_PROJECT_ID, run_number, df_breakdown, datetime.now())
+                        conn.commit()
+                        timings[operation].append(time.perf_counter() - start)
+                for operation, seconds in timings.items():
+                    results.append({
+                        "Horizon (years)": horizon,
+                        "Writer": writer_name,
+                        "Operation": operation,
+                        "Rows": len(df_breakdown),
+                        "Mean (ms)": round(float(np.mean(seconds)) * 1000, 2)
+                    })
+    finally:
+        conn.rollback()
+        cursor.execute("DELETE FROM besos_lcoe_breakdown WHERE project_id = %s", (BENCHMARK_PROJECT_ID,))
+        conn.commit()
+        cursor.close()
+    return pd.DataFrame(results)
+
+
+def _schedule_upsert(table, columns):
+    value_columns = list(columns) + ["calculated_at"]
+    return f"""
+        INSERT INTO {table} (project_id, run_number, year, {", ".join(value_columns)})
+        VALUES ({", ".join(["%s"] * (3 + len(value_columns)))})
+        ON DUPLICATE KEY UPDATE {", ".join(f"{column} = VALUES({column})" for column in value_columns)}
+    """
+
+
+def schedule_rows(project_id, run_number, schedule_df, columns, calculated_at):
+    """
+    Converts a debt, working capital or asset schedule to upsert parameter rows
+    The year comes from the index: 'Year N' labels, or the position plus one. Missing
+    columns and NaN values are stored as 0.
+    Args:
+        columns: schedule frame column -> table column (see FINANCIAL_SCHEDULES)
+    Returns:
+        list of tuples (project_id, run_number, year, *values, calculated_at)
+    """
+    years = [
+        int(label.split()[1]) if isinstance(label, str) and 'Year' in label else int(label) + 1
+        for label in schedule_df.index
+    ]
+    values = (
+        schedule_df.reindex(columns=list(columns))
+        .apply(pd.to_numeric, errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=float)
+        .tolist()
+    )
+    return [(project_id, run_number, year, *row, calculated_at) for year, row in zip(years, values)]
+
+
+def save_financial_schedules(cursor, project_id, run_number, solar_data, wind_data, calculated_at):
+    """
+    Upserts the debt, working capital and asset schedules of solar and wind
+    One executemany per table, keyed on (project_id, run_number, year), so writing the
+    same results again updates the rows instead of adding any. The caller owns the
+    transaction.
+    Args:
+        solar_data, wind_data: dicts with 'debt_df', 'wc_df' and 'asset_df'
+    Returns:
+        number of rows written
+    """
+    written = 0
+    for technology, data in (('solar', solar_data), ('wind', wind_data)):
+        for key, (suffix, columns) in FINANCIAL_SCHEDULES.items():
+            schedule_df = data.get(key)
+            if schedule_df is None or schedule_df.empty:
+                continue
+            rows = schedule_rows(project_id, run_number, schedule_df, columns, calculated_at)
+            cursor.executemany(_schedule_upsert(f"besos_fin_analysis_{technology}_{suffix}", columns.values()), rows)
+            written += len(rows)
+    return written
+
+
+class FinancialWriteBehind:
+    """
+    Background writer for the financial schedules of the LCOE Outputs page
+    submit() only queues copies of the result frames, so the page renders without
+    waiting on the database. A worker thread drains the queue, keeps the latest
+    submission per (project_id, run_number), and writes the batch in one transaction
+    with save_financial_schedules. A failed batch is rolled back and retried after each
+    of WRITE_RETRY_DELAYS; the writes are upserts, so a retry never duplicates rows.
+    status() reports each submission as 'queued', 'saving', 'retrying', 'saved' or 'failed'.
+    Submissions are numbered, and a write reports its state only while it holds the
+    latest submission of its run, so a newer one stays 'queued' until it is written.
+    """
+
+    def __init__(self, retry_delays=WRITE_RETRY_DELAYS):
+        self.retry_delays = retry_delays
+        self._queue = queue.Queue()
+        self._status = {}
+        # (project_id, run_number) -> sequence number of its latest submission
+        self._latest = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, project_id, run_number, solar_data, wind_data):
+        """Queues the schedules of one run for writing"""
+        snapshot = {
+            technology: {key: data[key].copy() for key in FINANCIAL_SCHEDULES if key in data}
+            for technology, data in (('solar', solar_data), ('wind', wind_data))
+        }
+        key = (project_id, run_number)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._latest[key] = self._sequence
+        self._set_status(key, 'queued', sequence)
+        self._queue.put((key, snapshot, datetime.now(), sequence))
+        self._ensure_worker()
+
+    def status(self, project_id, run_number):
+        """
+        Returns:
+            dict with 'state', 'attempts', 'rows', 'error' and 'updated', or None if never submitted
+        """
+        with self._lock:
+            status = self._status.get((project_id, run_number))
+            return dict(status) if status else None
+
+    def _set_status(self, key, state, sequence, **details):
+        # A write of an older submission leaves the state of the newer one alone
+        with self._lock:
+            if self._latest.get(key) != sequence:
+                return
+            status = self._status.setdefault(key, {'attempts': 0, 'rows': 0, 'error': None})
+            status.update(details, state=state, updated=datetime.now())
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="financial-write-behind", daemon=True)
+                self._worker.start()
+
+    def _drain(self):
+        # Block for the first job, then take whatever else is queued; the newest job per run wins
+        jobs = [self._queue.get()]
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        latest = {}
+        for key, snapshot, calculated_at, sequence in jobs:
+            latest[key] = (snapshot, calculated_at, sequence)
+        return latest
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            try:
+                self._write(batch)
+            finally:
+                release_connection()
+
+    def _write(self, batch):
+        for attempt in range(len(self.retry_delays) + 1):
+            for key, (_, _, sequence) in batch.items():
+                self._set_status(key, 'saving', sequence, attempts=attempt + 1)
+            conn = None
+            try:
+                conn = get_connection()
+                cursor = conn.cursor()
+                rows = {}
+                for key, (snapshot, calculated_at, _) in batch.items():
+                    rows[key] = save_financial_schedules(
+                        cursor, key[0], key[1], snapshot['solar'], snapshot['wind'], calculated_at
+                    )
+                conn.commit()
+                cursor.close()
+                for key, written in rows.items():
+                    self._set_status(key, 'saved', batch[key][2], rows=written, error=None)
+                return
+            except Exception as e:
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                    release_connection()
+                if attempt == len(self.retry_delays):
+                    for key, (_, _, sequence) in batch.items():
+                        self._set_status(key, 'failed', sequence, error=str(e))
+                    return
+                for key, (_, _, sequence) in batch.items():
+                    self._set_status(key, 'retrying', sequence, error=str(e))
+                time.sleep(self.retry_delays[attempt])
+
+
+_financial_writer = None
+_financial_writer_lock = threading.Lock()
+
+
+def get_financial_writer():
+    """Process-wide FinancialWriteBehind, created on first use"""
+    global _financial_writer
+    if _financial_writer is None:
+        with _financial_writer_lock:
+            if _financial_writer is None:
+                _financial_writer = FinancialWriteBehind()
+    return _financial_writer
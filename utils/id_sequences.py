@@ -0,0 +1,113 @@
+from utils.sqlite_backend import is_sqlite
+
+SEQUENCE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS id_sequences (
+        name VARCHAR(255) NOT NULL PRIMARY KEY,
+        last_value BIGINT NOT NULL
+    )
+"""
+
+PROFILE_ID_SEQUENCE = "profile_id"
+
+# Largest profile id handed out before the sequence existed
+PROFILE_ID_SEED_QUERY = """
+    SELECT GREATEST(
+        (SELECT IFNULL(MAX(id), 0) FROM wind_profile),
+        (SELECT IFNULL(MAX(id), 0) FROM solar_profile),
+        (SELECT IFNULL(MAX(id), 0) FROM battery_profile),
+        (SELECT IFNULL(MAX(id), 0) FROM demand_profile)
+    )
+"""
+
+RUN_NUMBER_SEED_QUERY = "SELECT IFNULL(MAX(run_number), -1) FROM run_config WHERE project_id = %s"
+
+
+def run_number_sequence(project_id):
+    return f"run_number:{project_id}"
+
+
+def ensure_sequence_table(cursor):
+    """
+    Creates the id_sequences table if it does not exist
+    DDL commits implicitly in MySQL, so call this before starting a transaction.
+    """
+    cursor.execute(SEQUENCE_TABLE_DDL)
+
+
+def allocate_id(conn, name, seed_query, seed_params=()):
+    """
+    Hands out the next value of a named sequence, unique across concurrent sessions
+    The increment is one primary-key UPDATE using LAST_INSERT_ID(expr), which MySQL keeps
+    per connection, so the value read back is the one this session wrote. The row lock
+    is released right away by committing, independent of the caller's transactions.
+    The first call for a name seeds the sequence from seed_query (the largest id already
+    in use); concurrent first calls are serialised by the primary key and still get
+    distinct values. SQLite has no LAST_INSERT_ID(expr); there the write lock taken by the
+    UPDATE serialises allocations and RETURNING reads the value back.
+    Args:
+        conn: connection used only for the allocation (it is committed)
+        name: sequence name
+        seed_query: query returning the largest existing value, run once per name
+    Returns:
+        allocated id (int)
+    """
+    cursor = conn.cursor()
+    try:
+        ensure_sequence_table(cursor)
+        if is_sqlite(conn):
+            allocated = _allocate_sqlite(cursor, name, seed_query, seed_params)
+            conn.commit()
+            return allocated
+        cursor.execute(
+            "UPDATE id_sequences SET last_value = LAST_INSERT_ID(last_value + 1) WHERE name = %s", (name,)
+        )
+        if cursor.rowcount == 0:
+            cursor.execute(seed_query, seed_params)
+            seed = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO id_sequences (name, last_value) VALUES (%s, LAST_INSERT_ID(%s))
+                ON DUPLICATE KEY UPDATE last_value = LAST_INSERT_ID(last_value + 1)
+            """, (name, int(seed) + 1))
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        allocated = int(cursor.fetchone()[0])
+        conn.commit()
+        return allocated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _allocate_sqlite(cursor, name, seed_query, seed_params):
+    cursor.execute("UPDATE id_sequences SET last_value = last_value + 1 WHERE name = %s RETURNING last_value",
+                   (name,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(seed_query, seed_params)
+        seed = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO id_sequences (name, last_value) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE last_value = last_value + 1
+            RETURNING last_value
+        """, (name, int(seed) + 1))
+        row = cursor.fetchone()
+    return int(row[0])
+
+
+def peek_next_id(conn, name, seed_query, seed_params=()):
+    """
+    Returns the value allocate_id would hand out next, without reserving it
+    Only for display; another session may take it first.
+    """
+    cursor = conn.cursor()
+    try:
+        ensure_sequence_table(cursor)
+        cursor.execute("SELECT last_value FROM id_sequences WHERE name = %s", (name,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(seed_query, seed_params)
+            row = cursor.fetchone()
+        return int(row[0]) + 1
+    finally:
+        cursor.close()
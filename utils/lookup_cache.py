@@ -0,0 +1,67 @@
+import copy
+import functools
+import threading
+import time
+
+# Groups of cached lookups; a write invalidates every lookup of its group
+REFERENCE = 'reference'  # project types, states
+PROJECTS = 'projects'    # project_config lookups (ids, names, descriptions)
+PROFILES = 'profiles'    # profile ids saved per project
+
+# Seconds a lookup is served from the cache; the TTL bounds staleness from writes made
+# outside this process, writes inside it invalidate right away
+LOOKUP_TTL_SECONDS = {
+    REFERENCE: 3600,
+    PROJECTS: 300,
+    PROFILES: 300
+}
+
+_lock = threading.Lock()
+# (group, file, function, args) -> (expires at, value)
+_entries = {}
+# Bumped by invalidate(), so a lookup that started before a write does not store its stale result
+_generations = {}
+
+
+def cached_lookup(group, ttl=None):
+    """
+    Caches a lookup function process-wide, per positional arguments
+    Every Streamlit session shares the cache, so dropdowns render without a query once
+    warm. Callers get a shallow copy and may modify it freely. Exceptions are not cached.
+    Args:
+        group: REFERENCE, PROJECTS or PROFILES; invalidate(group) drops the cached results
+        ttl: seconds to keep a result, defaults to LOOKUP_TTL_SECONDS[group]
+    Returns:
+        decorator
+    """
+    ttl = LOOKUP_TTL_SECONDS[group] if ttl is None else ttl
+
+    def decorator(func):
+        # Pages are scripts re-run on every interaction, so key by source location, not identity
+        location = (func.__code__.co_filename, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (group,) + location + (args,)
+            with _lock:
+                entry = _entries.get(key)
+                generation = _generations.get(group, 0)
+            if entry is not None and entry[0] > time.monotonic():
+                return copy.copy(entry[1])
+
+            value = func(*args)
+            with _lock:
+                if _generations.get(group, 0) == generation:
+                    _entries[key] = (time.monotonic() + ttl, value)
+            return copy.copy(value)
+        return wrapper
+    return decorator
+
+
+def invalidate(*groups):
+    """Drops the cached results of the given groups, e.g. after a write to project_config"""
+    with _lock:
+        for group in groups:
+            _generations[group] = _generations.get(group, 0) + 1
+        for key in [key for key in _entries if key[0] in groups]:
+            del _entries[key]
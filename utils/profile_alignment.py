@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+CANONICAL_STEP = pd.Timedelta(hours=1)
+# Gaps up to this many hours are interpolated; longer ones get the hour-of-day mean
+MAX_INTERPOLATED_GAP_HOURS = 3
+
+GAP_FLAGS = {
+    0: 'measured',
+    1: 'partial',       # sub-hourly data covered only part of the hour
+    2: 'interpolated',  # short gap, linear between neighbouring hours
+    3: 'filled'         # long or edge gap, hour-of-day mean of measured hours
+}
+
+
+def detect_resolution(timestamps):
+    """
+    Detects the native time step of a profile
+    Args:
+        timestamps: datetime values (any order, duplicates allowed)
+    Returns:
+        pd.Timedelta of the most common spacing between distinct timestamps, or None
+        when there are fewer than two
+    """
+    distinct = pd.DatetimeIndex(timestamps).dropna().unique().sort_values()
+    if len(distinct) < 2:
+        return None
+    return pd.Series(distinct[1:] - distinct[:-1]).mode().iloc[0]
+
+
+def _empty_grid():
+    return pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'), 'value': pd.Series(dtype=float),
+                         'gap_flag': pd.Series(dtype=np.uint8)})
+
+
+def align_to_hourly(timestamps, values, aggregation='mean', max_interpolated_gap=MAX_INTERPOLATED_GAP_HOURS):
+    """
+    Resamples a profile onto a gap-free canonical hourly grid
+    Sub-hourly data is aggregated per clock hour: 'mean' for power values (kW, so the
+    hourly value is the energy of the hour) or 'sum' for energy per interval. Coarser
+    data is spread over the hours it covers: repeated for 'mean', divided evenly for
+    'sum'. Duplicate timestamps are averaged. Missing hours are filled and flagged
+    with a GAP_FLAGS code, so every row of the result is one hour.
+    Args:
+        timestamps, values: profile points (NaT and NaN points are ignored)
+        aggregation: 'mean' or 'sum'
+        max_interpolated_gap: longest gap in hours that is interpolated
+    Returns:
+        tuple: (DataFrame with 'timestamp', 'value' and 'gap_flag',
+                dict with 'native_resolution', 'hours', 'partial', 'interpolated' and 'filled')
+    """
+    if aggregation not in ('mean', 'sum'):
+        raise ValueError("aggregation must be 'mean' or 'sum'")
+    series = pd.Series(np.asarray(values, dtype=float), index=pd.DatetimeIndex(timestamps))
+    series = series[series.index.notna() & series.notna()]
+    series = series.groupby(level=0).mean()
+    summary = {'native_resolution': detect_resolution(series.index), 'hours': 0,
+               'partial': 0, 'interpolated': 0, 'filled': 0}
+    if series.empty:
+        return _empty_grid(), summary
+
+    native = summary['native_resolution'] or CANONICAL_STEP
+    if native <= CANONICAL_STEP:
+        grouped = series.resample(CANONICAL_STEP)
+        hourly = grouped.sum(min_count=1) if aggregation == 'sum' else grouped.mean()
+        expected = max(int(CANONICAL_STEP / native), 1)
+        partial = (grouped.count() < expected).to_numpy() & hourly.notna().to_numpy()
+    else:
+        # Each point holds for the native step; the last one too
+        hours_per_step = int(np.ceil(native / CANONICAL_STEP))
+        start = series.index[0].floor(CANONICAL_STEP)
+        end = series.index[-1].floor(CANONICAL_STEP) + CANONICAL_STEP * (hours_per_step - 1)
+        coarse = series / hours_per_step if aggregation == 'sum' else series
+        coarse.index = coarse.index.floor(CANONICAL_STEP)
+        coarse = coarse.groupby(level=0).mean()
+        hourly = coarse.reindex(pd.date_range(start, end, freq=CANONICAL_STEP)).ffill(limit=hours_per_step - 1)
+        partial = np.zeros(len(hourly), dtype=bool)
+
+    return _fill_gaps(hourly, partial, summary, max_interpolated_gap)
+
+
+def fill_hourly_gaps(hourly_values, gap_flags, native_resolution=None,
+                     max_interpolated_gap=MAX_INTERPOLATED_GAP_HOURS):
+    """
+    Completes a profile already averaged per clock hour to a gap-free hourly grid
+    The second half of align_to_hourly, for hourly means computed elsewhere (e.g. while
+    an upload is streamed, see utils.profile_ingestion). Data coarser than an hour holds
+    for its native step, as in align_to_hourly; other missing hours are filled and flagged.
+    Args:
+        hourly_values: Series of hourly means indexed by clock hour
+        gap_flags: Series of GAP_FLAGS codes (0 or 1) on the same index
+        native_resolution: time step of the source data, if known
+    Returns:
+        tuple: (DataFrame with 'timestamp', 'value' and 'gap_flag', summary dict as align_to_hourly)
+    """
+    series = pd.Series(np.asarray(hourly_values, dtype=float), index=pd.DatetimeIndex(hourly_values.index))
+    valid = series.notna().to_numpy()
+    series = series[valid].sort_index()
+    flags = pd.Series(np.asarray(gap_flags, dtype=float)[valid], index=series.index).sort_index()
+    summary = {'native_resolution': native_resolution, 'hours': 0, 'partial': 0, 'interpolated': 0, 'filled': 0}
+    if series.empty:
+        return _empty_grid(), summary
+
+    hours_per_step = int(np.ceil(native_resolution / CANONICAL_STEP)) if native_resolution else 1
+    grid = pd.date_range(series.index[0], series.index[-1] + CANONICAL_STEP * (hours_per_step - 1),
+                         freq=CANONICAL_STEP)
+    hourly = series.reindex(grid)
+    if hours_per_step > 1:
+        hourly = hourly.ffill(limit=hours_per_step - 1)
+    partial = (flags.reindex(grid) == 1).to_numpy()
+    return _fill_gaps(hourly, partial, summary, max_interpolated_gap)
+
+
+def _fill_gaps(hourly, partial, summary, max_interpolated_gap):
+    # hourly: Series on the full hourly grid with NaN for missing hours
+    missing = hourly.isna().to_numpy()
+    flags = np.where(partial, 1, 0).astype(np.uint8)
+    filled = hourly.to_numpy(copy=True)
+    if missing.any():
+        # Length of the run of missing hours each hour belongs to
+        run_id = np.cumsum(~missing)
+        run_length = pd.Series(missing).groupby(run_id).transform('sum').to_numpy()
+        interpolated = hourly.interpolate(method='time', limit_area='inside').to_numpy()
+        short = missing & (run_length <= max_interpolated_gap) & ~np.isnan(interpolated)
+        filled[short] = interpolated[short]
+        flags[short] = 2
+
+        long_gap = missing & ~short
+        if long_gap.any():
+            hour_of_day = hourly.index.hour.to_numpy()
+            hour_means = pd.Series(filled[~missing]).groupby(hour_of_day[~missing]).mean()
+            fallback = hour_means.reindex(hour_of_day[long_gap]).to_numpy()
+            filled[long_gap] = np.nan_to_num(fallback, nan=float(np.nanmean(filled[~missing])))
+            flags[long_gap] = 3
+
+    summary.update({'hours': len(filled), 'partial': int((flags == 1).sum()),
+                    'interpolated': int((flags == 2).sum()), 'filled': int((flags == 3).sum())})
+    aligned = pd.DataFrame({'timestamp': hourly.index, 'value': filled, 'gap_flag': flags})
+    return aligned, summary
+
+
+def align_profile_frame(df, value_column, aggregation='mean'):
+    """
+    Aligns a profile DataFrame as read from the profile tables to the hourly grid
+    Args:
+        df: DataFrame with 'timestamp' and value_column (may be empty or lack columns)
+        value_column: 'generation' or 'demand'
+    Returns:
+        DataFrame with 'timestamp', value_column and 'gap_flag'
+    """
+    if df is None or df.empty or 'timestamp' not in df.columns:
+        timestamps, values = [], []
+    else:
+        timestamps = pd.to_datetime(df['timestamp'], errors='coerce')
+        values = pd.to_numeric(df[value_column], errors='coerce')
+    aligned, _ = align_to_hourly(timestamps, values, aggregation)
+    return aligned.rename(columns={'value': value_column})
+
+
+def describe_alignment(kind, summary):
+    """
+    Summarises how a profile was aligned in one message, or None when nothing changed
+    """
+    native = summary['native_resolution']
+    changes = []
+    if native is not None and native != CANONICAL_STEP:
+        changes.append(f"resampled from {native} steps to hourly")
+    for key in ('partial', 'interpolated', 'filled'):
+        if summary[key]:
+            changes.append(f"{summary[key]} {key} hours")
+    if not changes:
+        return None
+    return f"{kind.title()} profile ({summary['hours']} hours): " + ", ".join(changes)
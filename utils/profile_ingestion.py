@@ -0,0 +1,641 @@
+import hashlib
+import re
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.profile_alignment import CANONICAL_STEP, detect_resolution, fill_hourly_gaps
+from utils.sqlite_backend import is_sqlite
+
+INSERT_BATCH_SIZE = 5000
+STREAM_CHUNK_ROWS = 200000
+MAX_REPORTED_INVALID_ROWS = 1000
+PARSED_CACHE_MAX_BYTES = 256 * 1024 * 1024
+HEADER_SAMPLE_ROWS = 20
+
+# Profile kind -> (data table, value column, timestamp column aliases, value column aliases)
+PROFILE_TABLES = {
+    'wind': ('wind_profile_data', 'generation',
+             ['datetime', 'date', 'time', 'timestamp', 'hour'],
+             ['generation', 'gen', 'power', 'output']),
+    'solar': ('solar_profile_data', 'generation',
+              ['datetime', 'date', 'time', 'timestamp', 'hour'],
+              ['generation', 'gen', 'power', 'output']),
+    'battery': ('battery_profile_data', 'generation',
+                ['datetime', 'date', 'time', 'timestamp', 'hour'],
+                ['generation', 'gen', 'power', 'output', 'capacity']),
+    'demand': ('demand_profile_data', 'demand',
+               ['hour', 'datetime', 'date', 'time', 'timestamp'],
+               ['demand', 'load', 'consumption', 'usage'])
+}
+
+
+class AliasIndex:
+    """
+    Precompiled matcher for one list of column name aliases
+    A column matches an alias when either contains the other (case insensitive); the
+    earliest alias wins, then the leftmost column. One lookahead regex finds every alias
+    inside a column name, and a table of all alias substrings answers the reverse
+    direction with a single dict lookup.
+    """
+
+    def __init__(self, aliases):
+        self.aliases = [name.lower().strip() for name in aliases]
+        self._priority = {}
+        self._contained = {}
+        for priority, name in enumerate(self.aliases):
+            self._priority.setdefault(name, priority)
+            for start in range(len(name) + 1):
+                for end in range(start, len(name) + 1):
+                    self._contained.setdefault(name[start:end], priority)
+        # Alternation tries aliases in priority order at each position
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, self.aliases)) + '))')
+
+    def priority(self, column):
+        """Returns the priority of the best alias matching column, or None"""
+        column = str(column).lower().strip()
+        best = self._contained.get(column)
+        for match in self._pattern.finditer(column):
+            priority = self._priority[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+        return best
+
+    def match(self, columns):
+        """Returns the best matching column name, or None"""
+        best = None
+        for column in columns:
+            priority = self.priority(column)
+            if priority is not None and (best is None or priority < best[0]):
+                best = (priority, column)
+        return best[1] if best else None
+
+
+@lru_cache(maxsize=64)
+def get_alias_index(aliases):
+    return AliasIndex(aliases)
+
+
+def find_column_flexible(df, target_names):
+    """
+    Find column that matches any of the target names (case insensitive)
+    Args:
+        df: pandas DataFrame
+        target_names: list of possible column names to match
+    Returns:
+        actual column name if found, None otherwise
+    """
+    return get_alias_index(tuple(target_names)).match(df.columns)
+
+
+def read_profile_file(file, filename, nrows=None):
+    """
+    Reads an uploaded CSV or Excel profile from the start of the file
+    """
+    file.seek(0)
+    if filename.lower().endswith('.csv'):
+        return pd.read_csv(file, nrows=nrows)
+    return pd.read_excel(file, nrows=nrows)
+
+
+def validate_profile_header(file, filename, datetime_aliases, value_aliases, sample_rows=HEADER_SAMPLE_ROWS):
+    """
+    Checks the columns of an upload from its header and first rows only
+    The sample is also sniffed: the timestamp column must hold some parseable dates and
+    the value column some numbers, which catches a wrongly matched column at upload time.
+    Args:
+        datetime_aliases, value_aliases: possible names of the timestamp and value columns
+    Returns:
+        tuple: (is_valid, error_message, sample DataFrame)
+    """
+    sample = read_profile_file(file, filename, nrows=sample_rows)
+    file.seek(0)
+
+    columns = {}
+    missing_columns = []
+    for role, aliases in (('timestamp', datetime_aliases), ('value', value_aliases)):
+        columns[role] = get_alias_index(tuple(aliases)).match(sample.columns)
+        if columns[role] is None:
+            missing_columns.append(f"'{'/'.join(aliases)}'")
+    if missing_columns:
+        error_msg = (f"Missing required columns: {', '.join(missing_columns)}. "
+                     f"Available columns: {', '.join(map(str, sample.columns))}")
+        return False, error_msg, sample
+
+    timestamps = sample[columns['timestamp']].dropna()
+    with warnings.catch_warnings():
+        # A failed format inference is the expected outcome for a non-date column
+        warnings.simplefilter('ignore', UserWarning)
+        parsed_timestamps = pd.to_datetime(timestamps.astype(str), errors='coerce')
+    if not timestamps.empty and parsed_timestamps.isna().all():
+        return False, (f"Column '{columns['timestamp']}' does not contain dates or times "
+                       f"(first value: '{timestamps.iloc[0]}')"), sample
+    values = sample[columns['value']].dropna()
+    if not values.empty and pd.to_numeric(values, errors='coerce').isna().all():
+        return False, (f"Column '{columns['value']}' does not contain numbers "
+                       f"(first value: '{values.iloc[0]}')"), sample
+    return True, "", sample
+
+
+class ParsedFrameCache:
+    """
+    LRU cache of parsed upload DataFrames keyed by a hash of the file content
+    Streamlit reruns hand the page a fresh file object each time, so keying on content
+    lets validation, previews and saving share one parse per file per session. Entries
+    are evicted least-recently-used once their in-memory size passes max_bytes; files
+    too large to hold are never parsed whole here and callers fall back to reading the
+    preview rows or streaming.
+    """
+
+    def __init__(self, max_bytes=PARSED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+
+    @staticmethod
+    def content_key(file, filename):
+        digest = hashlib.blake2b(digest_size=16)
+        if hasattr(file, 'getbuffer'):
+            digest.update(file.getbuffer())
+        else:
+            file.seek(0)
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        extension = filename.lower().rsplit('.', 1)[-1]
+        return digest.hexdigest(), extension
+
+    @staticmethod
+    def _raw_size(file):
+        if hasattr(file, 'getbuffer'):
+            return file.getbuffer().nbytes
+        position = file.tell()
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(position)
+        return size
+
+    def get_cached(self, file, filename):
+        """Returns the parsed frame if this content was parsed before, else None"""
+        key = self.content_key(file, filename)
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return self._frames[key][0]
+        return None
+
+    def get(self, file, filename):
+        """
+        Returns the parsed frame, parsing and caching it on first use
+        Returns None for files whose raw size is over a quarter of max_bytes
+        """
+        key = self.content_key(file, filename)
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return self._frames[key][0]
+        if self._raw_size(file) > self.max_bytes // 4:
+            return None
+
+        self.misses += 1
+        df = read_profile_file(file, filename)
+        file.seek(0)
+        size = int(df.memory_usage(deep=True).sum())
+        if size <= self.max_bytes:
+            self._frames[key] = (df, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return df
+
+    def preview(self, file, filename, rows=10):
+        """Returns the first rows, reading only those when the file is too large to cache"""
+        df = self.get(file, filename)
+        if df is None:
+            df = read_profile_file(file, filename, nrows=rows)
+            file.seek(0)
+        return df.head(rows)
+
+    def clear(self):
+        self._frames.clear()
+        self.current_bytes = 0
+
+
+def parse_profile_timestamps(raw_timestamps):
+    """
+    Parses a column of uploaded timestamps, NaT where a value cannot be read
+    Values the vectorized parser rejects (e.g. mixed formats) get the row-wise parse
+    the old loop used.
+    """
+    timestamps = pd.to_datetime(raw_timestamps, errors='coerce')
+    retry = timestamps.isna() & raw_timestamps.notna()
+    if retry.any():
+        timestamps = timestamps.astype(object)
+        timestamps[retry] = raw_timestamps[retry].map(lambda value: pd.to_datetime(value, errors='coerce'))
+        timestamps = pd.to_datetime(timestamps, errors='coerce')
+    return timestamps
+
+
+def parse_profile_frame(df, datetime_col, value_col):
+    """
+    Parses timestamps and values of a whole profile in one vectorized pass
+    Args:
+        df: raw uploaded DataFrame
+        datetime_col, value_col: column names found with find_column_flexible
+    Returns:
+        tuple: (DataFrame with 'timestamp' and 'value' for valid rows,
+                DataFrame with 'row' (1-based file row), 'timestamp', 'value' and 'reason' for invalid rows)
+    """
+    raw_timestamps = df[datetime_col]
+    raw_values = df[value_col]
+
+    timestamps = parse_profile_timestamps(raw_timestamps)
+    values = pd.to_numeric(raw_values, errors='coerce')
+
+    bad_timestamp = timestamps.isna()
+    bad_value = values.isna()
+    invalid = bad_timestamp | bad_value
+
+    parsed = pd.DataFrame({'timestamp': timestamps[~invalid], 'value': values[~invalid].astype(float)})
+
+    reasons = pd.Series('', index=df.index)
+    reasons[bad_timestamp] = 'invalid timestamp'
+    reasons[bad_value & ~bad_timestamp] = 'invalid value'
+    reasons[bad_value & bad_timestamp] = 'invalid timestamp and value'
+    invalid_rows = pd.DataFrame({
+        'row': df.index[invalid] + 2,  # header is row 1 in the uploaded file
+        'timestamp': raw_timestamps[invalid].astype(str),
+        'value': raw_values[invalid].astype(str),
+        'reason': reasons[invalid]
+    }).reset_index(drop=True)
+
+    return parsed, invalid_rows
+
+
+def insert_profile_rows(cursor, table, value_column, project_id, profile_id, parsed, batch_size=INSERT_BATCH_SIZE):
+    """
+    Writes parsed profile rows with executemany in chunks of batch_size
+    mysql.connector rewrites each executemany INSERT into one multi-row VALUES statement,
+    so a year of hourly data takes a couple of round-trips instead of one per row; on
+    SQLite executemany steps one prepared statement through the rows. A 'gap_flag'
+    column in parsed (aligned rows, see stage_aligned_profile) is written too.
+    The caller owns the transaction.
+    Returns:
+        number of rows written
+    """
+    columns = ['timestamp', 'value'] + (['gap_flag'] if 'gap_flag' in parsed.columns else [])
+    query = f"""
+        INSERT INTO {table} (project_id, profile_id, timestamp, {value_column}{', gap_flag' if len(columns) > 2 else ''})
+        VALUES (%s, %s{', %s' * len(columns)})
+    """
+    fields = [parsed['timestamp'].dt.to_pydatetime()] + [parsed[column].tolist() for column in columns[1:]]
+    rows = [(project_id, profile_id) + row for row in zip(*fields)]
+
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(query, rows[start:start + batch_size])
+    return len(rows)
+
+
+def _rows_frame(rows):
+    # (timestamp, value, gap_flag) rows -> DataFrame indexed by timestamp, NaN flags for rows saved before alignment
+    if rows and isinstance(rows[0], dict):
+        rows = [(row['timestamp'], row['value'], row['gap_flag']) for row in rows]
+    frame = pd.DataFrame({
+        'value': pd.to_numeric(pd.Series([row[1] for row in rows], dtype=object), errors='coerce').to_numpy(dtype=float),
+        'gap_flag': pd.to_numeric(pd.Series([row[2] for row in rows], dtype=object), errors='coerce').to_numpy(dtype=float)
+    }, index=pd.DatetimeIndex([row[0] for row in rows]))
+    return frame[~frame.index.duplicated(keep='last')].sort_index()
+
+
+def _fetch_stored_rows(cursor, kind, project_id, profile_id, measured_only):
+    table, value_column, _, _ = PROFILE_TABLES[kind]
+    cursor.execute(f"""
+        SELECT timestamp, {value_column} AS value, gap_flag
+        FROM {table}
+        WHERE project_id = %s AND profile_id = %s AND timestamp IS NOT NULL
+        {'AND (gap_flag IS NULL OR gap_flag <= 1)' if measured_only else ''}
+    """, (project_id, profile_id))
+    return _rows_frame(cursor.fetchall())
+
+
+def fetch_stored_profile(cursor, kind, project_id, profile_id):
+    """
+    Reads the measured rows already stored for a profile, for diffing an append against them
+    Hours the alignment interpolated or filled are left out; they are derived again when
+    the merged profile is completed (see stage_hourly_gaps).
+    Returns:
+        Series of values indexed by timestamp (placeholder rows without a timestamp are skipped)
+    """
+    return _fetch_stored_rows(cursor, kind, project_id, profile_id, measured_only=True)['value']
+
+
+def fetch_profile_grid(cursor, kind, project_id, profile_id):
+    """
+    Reads the stored hourly grid of a profile, e.g. to write it to the columnar store
+    Returns:
+        DataFrame with 'timestamp', 'value' and 'gap_flag', sorted by timestamp
+    """
+    stored = _fetch_stored_rows(cursor, kind, project_id, profile_id, measured_only=False)
+    return pd.DataFrame({'timestamp': stored.index, 'value': stored['value'].to_numpy(),
+                         'gap_flag': stored['gap_flag'].to_numpy()})
+
+
+def changed_profile_rows(parsed, stored):
+    """
+    Keeps the parsed rows that are new or differ from the stored profile
+    Values are compared with a small tolerance so FLOAT/DECIMAL round-trips do not
+    count as changes.
+    Args:
+        parsed: DataFrame with 'timestamp' and 'value'
+        stored: Series from fetch_stored_profile
+    """
+    previous = stored.reindex(pd.DatetimeIndex(parsed['timestamp'])).to_numpy()
+    unchanged = np.isclose(parsed['value'].to_numpy(dtype=float), previous, rtol=1e-6, atol=1e-9)
+    return parsed[~unchanged]
+
+
+def _hourly_means(parsed, expected):
+    # One row per clock hour; an hour with fewer readings than the native step implies is partial
+    grouped = parsed.groupby(parsed['timestamp'].dt.floor(CANONICAL_STEP), sort=True)['value']
+    means = grouped.mean()
+    partial = grouped.count().to_numpy() < expected
+    return pd.DataFrame({'timestamp': means.index, 'value': means.to_numpy(),
+                         'gap_flag': np.where(partial, 1, 0).astype(np.uint8)})
+
+
+def stream_profile_file(cursor, kind, project_id, profile_id, file, filename, chunk_rows=STREAM_CHUNK_ROWS,
+                        batch_size=INSERT_BATCH_SIZE, progress_callback=None, frame=None, table=None, stored=None):
+    """
+    Ingests a CSV profile chunk by chunk, averaging it per clock hour on the fly
+    Only the header, one chunk and the rows of the last open hour are held in memory, so
+    multi-year 1-minute exports stay bounded by chunk_rows. Rows are expected in
+    chronological order. Each hour is written with a gap_flag: 1 (partial) when it has
+    fewer readings than the native step of the file implies, else 0. Hours without
+    readings are not written; stage_hourly_gaps fills them once every file is in.
+    Excel files cannot be streamed and are read whole, then averaged the same way.
+    Args:
+        cursor: open cursor inside the caller's transaction
+        kind: 'wind', 'solar', 'battery' or 'demand'
+        progress_callback: optional callable(fraction_done, rows_read)
+        frame: optional already-parsed DataFrame of the file (e.g. from ParsedFrameCache),
+               used instead of reading the file again
+        table: table to insert into instead of the kind's data table (e.g. its staging table)
+        stored: optional Series from fetch_stored_profile; only hours that are new or changed
+                against it are inserted
+    Returns:
+        dict with 'rows_read', 'rows_inserted', 'invalid_rows' (first MAX_REPORTED_INVALID_ROWS),
+        'invalid_count', 'columns_found' and 'native_resolution' (detected from the first chunk)
+    """
+    data_table, value_column, datetime_aliases, value_aliases = PROFILE_TABLES[kind]
+    table = table or data_table
+    result = {'rows_read': 0, 'rows_inserted': 0, 'invalid_rows': pd.DataFrame(),
+              'invalid_count': 0, 'columns_found': False, 'native_resolution': None}
+
+    if frame is not None or not filename.lower().endswith('.csv'):
+        df = frame if frame is not None else read_profile_file(file, filename)
+        chunks = [df]
+        total_bytes = None
+    else:
+        file.seek(0, 2)
+        total_bytes = file.tell()
+        file.seek(0)
+        df = pd.read_csv(file, nrows=0)
+        chunks = None
+
+    datetime_col = find_column_flexible(df, datetime_aliases)
+    value_col = find_column_flexible(df, value_aliases)
+    if not (datetime_col and value_col):
+        return result
+    result['columns_found'] = True
+
+    if chunks is None:
+        file.seek(0)
+        chunks = pd.read_csv(file, usecols=[datetime_col, value_col], chunksize=chunk_rows)
+
+    def write(hours):
+        if stored is not None:
+            hours = changed_profile_rows(hours, stored)
+        result['rows_inserted'] += insert_profile_rows(
+            cursor, table, value_column, project_id, profile_id, hours, batch_size
+        )
+
+    invalid_parts = []
+    expected = 1
+    carry = pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'), 'value': pd.Series(dtype=float)})
+    for chunk in chunks:
+        parsed, invalid_rows = parse_profile_frame(chunk, datetime_col, value_col)
+        result['rows_read'] += len(chunk)
+        result['invalid_count'] += len(invalid_rows)
+        reported = sum(len(part) for part in invalid_parts)
+        if reported < MAX_REPORTED_INVALID_ROWS and not invalid_rows.empty:
+            invalid_parts.append(invalid_rows.head(MAX_REPORTED_INVALID_ROWS - reported))
+
+        if result['native_resolution'] is None:
+            result['native_resolution'] = detect_resolution(parsed['timestamp'])
+            if result['native_resolution'] is not None and result['native_resolution'] < CANONICAL_STEP:
+                expected = int(CANONICAL_STEP / result['native_resolution'])
+
+        # The last hour may continue in the next chunk, so it is held back
+        combined = pd.concat([carry, parsed], ignore_index=True)
+        if combined.empty:
+            continue
+        hours = combined['timestamp'].dt.floor(CANONICAL_STEP)
+        open_hour = hours == hours.max()
+        carry = combined[open_hour]
+        write(_hourly_means(combined[~open_hour], expected))
+        if progress_callback is not None:
+            fraction = min(file.tell() / total_bytes, 1.0) if total_bytes else 1.0
+            progress_callback(fraction, result['rows_read'])
+
+    if not carry.empty:
+        write(_hourly_means(carry, expected))
+    if progress_callback is not None:
+        progress_callback(1.0, result['rows_read'])
+
+    if invalid_parts:
+        result['invalid_rows'] = pd.concat(invalid_parts, ignore_index=True)
+    return result
+
+
+def staging_table(kind):
+    return PROFILE_TABLES[kind][0] + '_staging'
+
+
+def _has_column(cursor, table, column):
+    if is_sqlite(cursor):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any((row['name'] if isinstance(row, dict) else row[1]) == column for row in cursor.fetchall())
+    cursor.execute("""
+        SELECT COUNT(*) AS columns_found FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    return (row['columns_found'] if isinstance(row, dict) else row[0]) > 0
+
+
+def ensure_staging_tables(cursor):
+    """
+    Creates a staging copy of each profile data table if it does not exist
+    Also adds the gap_flag column to data and staging tables created before profiles
+    were stored aligned. DDL commits implicitly in MySQL, so call this before starting
+    a transaction. (New SQLite databases already have both, see utils.sqlite_backend.)
+    """
+    for kind, (table, _, _, _) in PROFILE_TABLES.items():
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {staging_table(kind)} LIKE {table}")
+        for name in (table, staging_table(kind)):
+            if not _has_column(cursor, name, 'gap_flag'):
+                cursor.execute(f"ALTER TABLE {name} ADD COLUMN gap_flag TINYINT UNSIGNED NULL")
+
+
+def publish_staged_profile(cursor, kind, project_id, profile_id):
+    """
+    Moves the staged rows of one profile into its data table
+    An hour staged by several files of the kind is published once, with their mean.
+    Run inside the caller's transaction so all kinds become visible in one commit.
+    Returns:
+        number of rows published
+    """
+    table, value_column, _, _ = PROFILE_TABLES[kind]
+    cursor.execute(f"""
+        INSERT INTO {table} (project_id, profile_id, timestamp, {value_column}, gap_flag)
+        SELECT project_id, profile_id, timestamp, AVG({value_column}), MIN(gap_flag)
+        FROM {staging_table(kind)}
+        WHERE project_id = %s AND profile_id = %s
+        GROUP BY project_id, profile_id, timestamp
+    """, (project_id, profile_id))
+    published = cursor.rowcount
+    cursor.execute(f"DELETE FROM {staging_table(kind)} WHERE project_id = %s AND profile_id = %s",
+                   (project_id, profile_id))
+    return published
+
+
+def stage_hourly_gaps(cursor, kind, project_id, profile_id, native_resolution=None, append=False,
+                      batch_size=INSERT_BATCH_SIZE):
+    """
+    Stages the hours missing between the staged hourly rows of one profile
+    Workers stage one row per clock hour that has readings (stream_profile_file). Once
+    every file of the kind is in, those hours are read back, averaged where several files
+    cover one, and utils.profile_alignment.fill_hourly_gaps fills the hours between them.
+    Only the filled hours are staged in addition, so the published data table holds one
+    row per hour and readers need not align it.
+    With append, the measured hours already stored are part of the grid, and a filled hour
+    is staged only when it differs from the stored row, for upsert_staged_profile.
+    Run inside the caller's transaction.
+    Args:
+        native_resolution: time step of the uploads, from stream_profile_file
+    Returns:
+        summary dict of the completed grid (see utils.profile_alignment.align_to_hourly)
+    """
+    _, value_column, _, _ = PROFILE_TABLES[kind]
+    staging = staging_table(kind)
+    cursor.execute(f"""
+        SELECT timestamp, AVG({value_column}) AS value, MIN(gap_flag) AS gap_flag
+        FROM {staging}
+        WHERE project_id = %s AND profile_id = %s
+        GROUP BY timestamp
+    """, (project_id, profile_id))
+    staged = _rows_frame(cursor.fetchall())
+
+    measured = staged
+    stored = None
+    if append:
+        stored = _fetch_stored_rows(cursor, kind, project_id, profile_id, measured_only=False)
+        kept = stored[~(stored['gap_flag'] > 1)]
+        # Rows saved before alignment may be off the hour; they count as readings of their hour
+        kept = kept.groupby(kept.index.floor(CANONICAL_STEP)).agg({'value': 'mean', 'gap_flag': 'max'})
+        measured = staged.combine_first(kept)
+
+    grid, summary = fill_hourly_gaps(measured['value'], measured['gap_flag'].fillna(0), native_resolution)
+    fills = grid[~grid['timestamp'].isin(staged.index)]
+    if stored is not None:
+        previous = stored.reindex(pd.DatetimeIndex(fills['timestamp']))
+        unchanged = (np.isclose(fills['value'].to_numpy(dtype=float), previous['value'].to_numpy(),
+                                rtol=1e-6, atol=1e-9)
+                     & (fills['gap_flag'].to_numpy() == previous['gap_flag'].to_numpy()))
+        fills = fills[~unchanged]
+    insert_profile_rows(cursor, staging, value_column, project_id, profile_id, fills, batch_size)
+    return summary
+
+
+def upsert_staged_profile(cursor, kind, project_id, profile_id):
+    """
+    Merges the staged rows of one profile into its data table
+    Staged rows hold only new or changed hours (see stage_hourly_gaps' append),
+    so stored rows at those timestamps are replaced and all staged rows inserted. The
+    empty placeholder row of a profile saved without data is dropped once data arrives,
+    as are rows saved before alignment that are not on the hourly grid (no gap_flag).
+    Run inside the caller's transaction.
+    Returns:
+        tuple: (hours added, hours replaced), counted on the distinct staged timestamps
+        before publishing
+    """
+    table, value_column, _, _ = PROFILE_TABLES[kind]
+    staging = staging_table(kind)
+    cursor.execute(f"""
+        SELECT COUNT(*) AS staged_hours, COALESCE(SUM(stored), 0) AS stored_hours
+        FROM (
+            SELECT staged.timestamp, MAX(CASE WHEN data.timestamp IS NULL THEN 0 ELSE 1 END) AS stored
+            FROM {staging} AS staged
+            LEFT JOIN {table} AS data
+              ON data.project_id = staged.project_id AND data.profile_id = staged.profile_id
+             AND data.timestamp = staged.timestamp
+            WHERE staged.project_id = %s AND staged.profile_id = %s
+            GROUP BY staged.timestamp
+        ) AS hours
+    """, (project_id, profile_id))
+    row = cursor.fetchone()
+    staged_hours, stored_hours = (
+        (row['staged_hours'], row['stored_hours']) if isinstance(row, dict) else row
+    )
+    replaced = int(stored_hours)
+    added = int(staged_hours) - replaced
+
+    if is_sqlite(cursor):
+        # SQLite has no multi-table DELETE
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE project_id = %s AND profile_id = %s AND timestamp IN (
+                SELECT timestamp FROM {staging} WHERE project_id = %s AND profile_id = %s
+            )
+        """, (project_id, profile_id, project_id, profile_id))
+    else:
+        cursor.execute(f"""
+            DELETE data FROM {table} AS data
+            JOIN {staging} AS staged
+              ON staged.project_id = data.project_id AND staged.profile_id = data.profile_id
+             AND staged.timestamp = data.timestamp
+            WHERE data.project_id = %s AND data.profile_id = %s
+        """, (project_id, profile_id))
+    if publish_staged_profile(cursor, kind, project_id, profile_id):
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE project_id = %s AND profile_id = %s AND (timestamp IS NULL OR gap_flag IS NULL)
+        """, (project_id, profile_id))
+    return added, replaced
+
+
+def discard_staged_profiles(cursor, project_id, profile_id):
+    """Deletes any staged rows of a profile that was not published"""
+    for kind in PROFILE_TABLES:
+        cursor.execute(f"DELETE FROM {staging_table(kind)} WHERE project_id = %s AND profile_id = %s",
+                       (project_id, profile_id))
+
+
+def format_invalid_rows(kind, filename, invalid_rows, limit=10, total=None):
+    """
+    Summarises skipped rows of one file in a single message
+    total overrides the count when invalid_rows holds only the first reported rows
+    """
+    if invalid_rows.empty:
+        return None
+    total = len(invalid_rows) if total is None else total
+    listed = ", ".join(
+        f"row {row.row} ({row.reason})" for row in invalid_rows.head(limit).itertuples()
+    )
+    more = f" and {total - limit} more" if total > limit else ""
+    return f"{kind.title()} file '{filename}': skipped {total} invalid rows: {listed}{more}"
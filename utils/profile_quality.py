@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from utils.profile_ingestion import (
+    PROFILE_TABLES, STREAM_CHUNK_ROWS, find_column_flexible, parse_profile_timestamps, read_profile_file
+)
+
+# A non-zero value repeated for at least this long is reported as a flat-lined stretch
+FLATLINE_MIN_HOURS = 6
+
+# Report key -> label shown on the Site Load page
+QUALITY_CHECKS = {
+    'rows': 'Rows',
+    'invalid_timestamps': 'Invalid timestamps',
+    'nan_values': 'Missing or non-numeric values',
+    'negative_values': 'Negative values',
+    'duplicate_timestamps': 'Duplicate timestamps',
+    'missing_timestamps': 'Missing timestamps',
+    'above_capacity': 'Above nameplate capacity',
+    'flatline_stretches': 'Flat-lined stretches',
+    'flatline_rows': 'Rows in flat-lined stretches'
+}
+
+QUALITY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS profile_quality_report (
+        project_id VARCHAR(255) NOT NULL,
+        profile_id INT NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        file_name VARCHAR(255) NOT NULL,
+        rows_checked INT NOT NULL,
+        invalid_timestamps INT NOT NULL,
+        nan_values INT NOT NULL,
+        negative_values INT NOT NULL,
+        duplicate_timestamps INT NOT NULL,
+        missing_timestamps INT NOT NULL,
+        above_capacity INT NULL,
+        flatline_stretches INT NOT NULL,
+        flatline_rows INT NOT NULL,
+        KEY (project_id, profile_id)
+    )
+"""
+
+
+def _run_bounds(mask):
+    # Start and end (exclusive) indices of each run of True values
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[0::2], edges[1::2]
+
+
+def build_quality_report(timestamps, values, capacity=None, flatline_hours=FLATLINE_MIN_HOURS):
+    """
+    Checks one profile in a single vectorized sweep
+    The step used for missing timestamps and flat-line durations is the most common
+    spacing between consecutive timestamps.
+    Args:
+        timestamps: parsed timestamps (NaT for unparseable ones)
+        values: parsed values (NaN for missing or non-numeric ones)
+        capacity: nameplate capacity in the file's units, or None to skip that check
+    Returns:
+        dict with a count for every key of QUALITY_CHECKS (above_capacity is None
+        without a capacity) and the detected 'step'
+    """
+    stamps = pd.DatetimeIndex(timestamps)
+    values = np.asarray(values, dtype=float)
+    valid_time = ~np.asarray(stamps.isna())
+
+    report = dict.fromkeys(QUALITY_CHECKS, 0)
+    report['rows'] = len(values)
+    report['invalid_timestamps'] = int((~valid_time).sum())
+    report['nan_values'] = int(np.isnan(values).sum())
+    report['negative_values'] = int((values < 0).sum())
+    report['above_capacity'] = int((values > capacity).sum()) if capacity else None
+    report['step'] = None
+
+    times = stamps[valid_time].as_unit('ns').asi8
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    series = values[valid_time][order]
+    if len(times) < 2:
+        return report
+
+    spacing = np.diff(times)
+    report['duplicate_timestamps'] = int((spacing == 0).sum())
+    positive = spacing[spacing > 0]
+    if positive.size:
+        steps, counts = np.unique(positive, return_counts=True)
+        step = int(steps[counts.argmax()])
+        report['step'] = pd.Timedelta(step, unit='ns')
+        report['missing_timestamps'] = int((positive[positive > step] // step - 1).sum())
+
+        # Consecutive equal non-zero readings; zeros are normal (solar at night, idle battery)
+        repeated = (spacing > 0) & (series[1:] == series[:-1]) & (series[1:] != 0)
+        starts, ends = _run_bounds(repeated)
+        durations = times[ends] - times[starts]
+        long_runs = durations >= pd.Timedelta(hours=flatline_hours).value
+        report['flatline_stretches'] = int(long_runs.sum())
+        report['flatline_rows'] = int((ends - starts + 1)[long_runs].sum())
+    return report
+
+
+def profile_quality_report(file, filename, kind, capacity=None, frame=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Builds the quality report of an uploaded profile file
+    Only the timestamp and value columns are read; CSV files are read in chunks when no
+    parsed frame is given, so large files never hold more than those two arrays.
+    Timestamps go through parse_profile_timestamps, so rows saved by ingestion are not
+    reported as invalid here.
+    Args:
+        kind: 'wind', 'solar', 'battery' or 'demand'
+        capacity: nameplate capacity entered for the upload, or None
+        frame: optional already-parsed DataFrame of the file (e.g. from ParsedFrameCache)
+    Returns:
+        report dict from build_quality_report, or None if the columns are not found
+    """
+    _, _, datetime_aliases, value_aliases = PROFILE_TABLES[kind]
+    if frame is None and filename.lower().endswith('.csv'):
+        header = read_profile_file(file, filename, nrows=0)
+        datetime_col = find_column_flexible(header, datetime_aliases)
+        value_col = find_column_flexible(header, value_aliases)
+        if not (datetime_col and value_col):
+            return None
+        file.seek(0)
+        chunks = pd.read_csv(file, usecols=[datetime_col, value_col], chunksize=chunk_rows)
+    else:
+        frame = read_profile_file(file, filename) if frame is None else frame
+        datetime_col = find_column_flexible(frame, datetime_aliases)
+        value_col = find_column_flexible(frame, value_aliases)
+        if not (datetime_col and value_col):
+            return None
+        chunks = [frame]
+
+    timestamps = []
+    values = []
+    for chunk in chunks:
+        timestamps.append(parse_profile_timestamps(chunk[datetime_col]).to_numpy(dtype='datetime64[ns]'))
+        values.append(pd.to_numeric(chunk[value_col], errors='coerce').to_numpy(dtype=float))
+    file.seek(0)
+    return build_quality_report(np.concatenate(timestamps), np.concatenate(values), capacity)
+
+
+def quality_report_table(reports):
+    """
+    Lays out quality reports side by side for display
+    Args:
+        reports: dict mapping a file label to its report
+    Returns:
+        DataFrame with one row per check and one column per file
+    """
+    table = pd.DataFrame({
+        label: [report.get(key) for key in QUALITY_CHECKS] for label, report in reports.items()
+    }, index=list(QUALITY_CHECKS.values()), dtype=object)
+    table.index.name = 'Check'
+    return table.where(table.notna(), 'n/a')
+
+
+def ensure_quality_table(cursor):
+    """
+    Creates the profile_quality_report table if it does not exist
+    DDL commits implicitly in MySQL, so call this before starting a transaction.
+    """
+    cursor.execute(QUALITY_TABLE_DDL)
+
+
+def save_quality_report(cursor, project_id, profile_id, kind, file_name, report):
+    """Stores one file's report with the profile, inside the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO profile_quality_report
+            (project_id, profile_id, kind, file_name, rows_checked, invalid_timestamps, nan_values,
+             negative_values, duplicate_timestamps, missing_timestamps, above_capacity,
+             flatline_stretches, flatline_rows)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (project_id, profile_id, kind, file_name, report['rows'], report['invalid_timestamps'],
+          report['nan_values'], report['negative_values'], report['duplicate_timestamps'],
+          report['missing_timestamps'], report['above_capacity'], report['flatline_stretches'],
+          report['flatline_rows']))
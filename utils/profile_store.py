@@ -0,0 +1,223 @@
+import hashlib
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+PROFILE_STORE_DIR = os.getenv(
+    "PROFILE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'profile_store')
+)
+# Gaps are stored as NaN on the regular grid; beyond this fill ratio the rows are kept only
+MAX_GRID_FILL_RATIO = 4
+
+PROFILE_ARRAY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS profile_array_store (
+        project_id VARCHAR(255) NOT NULL,
+        profile_id INT NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        file_path VARCHAR(255) NOT NULL,
+        start_time DATETIME NOT NULL,
+        step_seconds INT NOT NULL,
+        length INT NOT NULL,
+        PRIMARY KEY (project_id, profile_id, kind)
+    )
+"""
+
+
+def ensure_profile_array_table(cursor):
+    """
+    Creates the profile_array_store table if it does not exist
+    DDL commits implicitly in MySQL, so call this before starting a transaction.
+    """
+    cursor.execute(PROFILE_ARRAY_TABLE_DDL)
+
+
+def to_regular_grid(timestamps, values):
+    """
+    Lays a profile out on one regular time grid
+    The step is the most common spacing between timestamps; missing steps become NaN.
+    Args:
+        timestamps: sorted datetime64 values
+        values: matching numeric values
+    Returns:
+        tuple: (start Timestamp, step seconds, float32 array) or None when the timestamps
+        are not on a single grid (duplicates, off-step times, or mostly gaps)
+    """
+    timestamps = pd.DatetimeIndex(timestamps)
+    if len(timestamps) < 2:
+        return None
+    offsets = (timestamps - timestamps[0]).total_seconds().to_numpy()
+    spacing = np.diff(offsets)
+    if (spacing <= 0).any():
+        return None
+    steps, counts = np.unique(spacing, return_counts=True)
+    step = steps[counts.argmax()]
+    if step != int(step):
+        return None
+    positions = offsets / step
+    if not np.allclose(positions, np.round(positions)):
+        return None
+    positions = np.round(positions).astype(np.int64)
+    length = int(positions[-1]) + 1
+    if length > len(timestamps) * MAX_GRID_FILL_RATIO:
+        return None
+
+    array = np.full(length, np.nan, dtype=np.float32)
+    array[positions] = np.asarray(values, dtype=np.float32)
+    return timestamps[0], int(step), array
+
+
+def _array_file_name(kind, project_id, profile_id, save_token):
+    # Project IDs are free text, so keep a readable slug plus a hash to stay unique
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', str(project_id)).strip('_')[:60]
+    digest = hashlib.sha1(str(project_id).encode()).hexdigest()[:8]
+    return f"{slug}_{digest}_{profile_id}_{kind}_{save_token}.npy"
+
+
+def _flags_path(file_path):
+    return file_path[:-len('.npy')] + '_flags.npy'
+
+
+def _save_array(file_path, array):
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'wb') as handle:
+        np.save(handle, array)
+    os.replace(temp_path, file_path)
+
+
+def write_profile_array(cursor, kind, project_id, profile_id, parsed, store_dir=None):
+    """
+    Writes a parsed profile to a .npy file and records it in profile_array_store
+    Every save writes a file name of its own and points the row at it, so the files of
+    the committed row stay untouched until the transaction ends. Run inside the caller's
+    transaction, then pass the returned dicts to finish_profile_arrays: a commit removes
+    the files the row pointed to before, a rollback removes the new ones.
+    A 'gap_flag' column (see utils.profile_alignment) is saved next to the values as a
+    uint8 array in <file>_flags.npy.
+    Args:
+        cursor: open cursor inside the caller's transaction
+        kind: 'wind', 'solar', 'battery' or 'demand'
+        parsed: DataFrame with 'timestamp' and 'value' columns, optionally 'gap_flag'
+    Returns:
+        dict with 'file_path', 'previous_path' (None for a new row), 'start_time',
+        'step_seconds' and 'length', or None when the profile is not on a regular grid
+        and stays in the row tables only
+    """
+    parsed = parsed.sort_values('timestamp', kind='stable')
+    grid = to_regular_grid(parsed['timestamp'].to_numpy(), parsed['value'].to_numpy())
+    if grid is None:
+        return None
+    start_time, step_seconds, array = grid
+    flags = None
+    if 'gap_flag' in parsed.columns:
+        flag_grid = to_regular_grid(parsed['timestamp'].to_numpy(), parsed['gap_flag'].to_numpy())
+        flags = flag_grid[2].astype(np.uint8) if len(flag_grid[2]) == len(parsed) else None
+
+    cursor.execute("""
+        SELECT file_path FROM profile_array_store
+        WHERE project_id = %s AND profile_id = %s AND kind = %s
+    """, (project_id, profile_id, kind))
+    row = cursor.fetchone()
+    previous_path = (row['file_path'] if isinstance(row, dict) else row[0]) if row else None
+
+    store_dir = store_dir or PROFILE_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    file_path = os.path.join(store_dir, _array_file_name(kind, project_id, profile_id, uuid.uuid4().hex[:12]))
+    _save_array(file_path, array)
+    if flags is not None:
+        _save_array(_flags_path(file_path), flags)
+
+    cursor.execute("""
+        INSERT INTO profile_array_store
+            (project_id, profile_id, kind, file_path, start_time, step_seconds, length)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE file_path = VALUES(file_path), start_time = VALUES(start_time),
+            step_seconds = VALUES(step_seconds), length = VALUES(length)
+    """, (project_id, profile_id, kind, file_path, start_time.to_pydatetime(), step_seconds, len(array)))
+    return {'file_path': file_path, 'previous_path': previous_path, 'start_time': start_time,
+            'step_seconds': step_seconds, 'length': len(array)}
+
+
+def drop_profile_array(cursor, kind, project_id, profile_id):
+    """
+    Removes the profile_array_store row of a profile kind whose rows were saved without an array
+    Readers load the array before the rows, so a stale one would hide the new rows. Run
+    inside the caller's transaction and pass the result to finish_profile_arrays, which
+    deletes the files once the transaction commits.
+    Returns:
+        dict shaped like write_profile_array's result, or None when no array was stored
+    """
+    cursor.execute("""
+        SELECT file_path FROM profile_array_store
+        WHERE project_id = %s AND profile_id = %s AND kind = %s
+    """, (project_id, profile_id, kind))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    cursor.execute("""
+        DELETE FROM profile_array_store
+        WHERE project_id = %s AND profile_id = %s AND kind = %s
+    """, (project_id, profile_id, kind))
+    return {'file_path': None, 'previous_path': row['file_path'] if isinstance(row, dict) else row[0]}
+
+
+def finish_profile_arrays(written, committed):
+    """
+    Removes the array files a finished transaction no longer references
+    Args:
+        written: results of write_profile_array in that transaction (None entries are skipped)
+        committed: True after conn.commit(), False after a rollback
+    """
+    for entry in written:
+        if entry is None:
+            continue
+        unused = entry['previous_path'] if committed else entry['file_path']
+        if not unused:
+            continue
+        for path in (unused, _flags_path(unused)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def get_profile_array_entries(cursor, project_id, profile_id):
+    """
+    Looks up the columnar files stored for a profile
+    Returns:
+        dict mapping kind to its profile_array_store row (as a dict)
+    """
+    cursor.execute("""
+        SELECT kind, file_path, start_time, step_seconds, length
+        FROM profile_array_store
+        WHERE project_id = %s AND profile_id = %s
+    """, (project_id, profile_id))
+    columns = [description[0] for description in cursor.description]
+    rows = [row if isinstance(row, dict) else dict(zip(columns, row)) for row in cursor.fetchall()]
+    return {row['kind']: row for row in rows}
+
+
+def load_profile_array(entry, value_column):
+    """
+    Loads a stored profile as a DataFrame shaped like the row tables
+    The .npy file is memory-mapped, so only the pages read are loaded from disk. Gap
+    steps (NaN) are dropped, matching hours that have no row in the row tables. Arrays
+    saved with gap flags have no NaN steps and come back with a 'gap_flag' column.
+    Args:
+        entry: profile_array_store row from get_profile_array_entries
+        value_column: 'generation' or 'demand'
+    Returns:
+        DataFrame with 'timestamp', value_column and, if stored, 'gap_flag', or None if
+        the file is missing
+    """
+    if not os.path.exists(entry['file_path']):
+        return None
+    array = np.load(entry['file_path'], mmap_mode='r')
+    timestamps = pd.date_range(
+        pd.Timestamp(entry['start_time']), periods=len(array), freq=pd.Timedelta(seconds=int(entry['step_seconds']))
+    )
+    df = pd.DataFrame({'timestamp': timestamps, value_column: np.asarray(array, dtype=float)})
+    if os.path.exists(_flags_path(entry['file_path'])):
+        df['gap_flag'] = np.load(_flags_path(entry['file_path']), mmap_mode='r')
+    return df[df[value_column].notna()].reset_index(drop=True)
@@ -0,0 +1,386 @@
+import datetime
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'energy_projects.db')
+)
+# Concurrent writers (e.g. the Site Load ingest workers) wait this long for the write lock
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '60000'))
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",        # readers never block the writer, nor the writer readers
+    "PRAGMA synchronous = NORMAL",      # with WAL the file stays consistent; fsync only at checkpoints
+    f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -65536",       # 64 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",     # read profile tables through a 256 MB memory map
+)
+
+# Strings compare case-insensitively in MySQL's default collation; NOCASE keeps lookups
+# such as status = 'c' / 'C' behaving the same on SQLite
+TEXT = "VARCHAR(255) COLLATE NOCASE"
+
+PROFILE_DATA_TABLES = {
+    'wind_profile_data': 'generation',
+    'solar_profile_data': 'generation',
+    'battery_profile_data': 'generation',
+    'demand_profile_data': 'demand'
+}
+
+FIN_ANALYSIS_COLUMNS = {
+    'debt': "debt_opening_balance REAL, debt_repayment REAL, debt_closing_balance REAL, "
+            "interest REAL, total_debt_service REAL",
+    'working_capital': "operation_maintenance_wcap REAL, interest_on_wc_om REAL, receivables_wcap REAL, "
+                       "interest_on_receivables_wcap REAL, total_working_capital REAL, "
+                       "interest_on_working_capital REAL",
+    'asset': "asset_value REAL"
+}
+
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS project_config (
+        project_id {TEXT} PRIMARY KEY, project_name {TEXT}, project_type {TEXT}, project_description TEXT,
+        construction_year {TEXT}, operation_year {TEXT}, wind INT, solar INT, battery INT, hybrid INT,
+        site_name {TEXT}, site_address TEXT, country {TEXT}, state {TEXT}, district {TEXT},
+        latitude REAL, longitude REAL, status {TEXT}, created DATETIME, modified DATETIME
+    )""",
+    f"CREATE TABLE IF NOT EXISTS project_types (type {TEXT} PRIMARY KEY)",
+    f"CREATE TABLE IF NOT EXISTS states (name {TEXT} PRIMARY KEY, code {TEXT})",
+    *[f"""CREATE TABLE IF NOT EXISTS {kind}_profile (
+        id INT NOT NULL, project_id {TEXT} NOT NULL, manufacturer {TEXT}, model {TEXT},
+        capacity_mwh REAL, file_name {TEXT}
+    )""" for kind in ('wind', 'solar', 'battery')],
+    f"CREATE TABLE IF NOT EXISTS demand_profile (id INT NOT NULL, project_id {TEXT} NOT NULL, file_name {TEXT})",
+    *[f"CREATE INDEX IF NOT EXISTS {kind}_profile_project ON {kind}_profile (project_id, id)"
+      for kind in ('wind', 'solar', 'battery', 'demand')],
+    *[f"""CREATE TABLE IF NOT EXISTS {table}{suffix} (
+        project_id {TEXT} NOT NULL, profile_id INT NOT NULL, timestamp DATETIME, {value_column} REAL,
+        gap_flag INT
+    )""" for table, value_column in PROFILE_DATA_TABLES.items() for suffix in ('', '_staging')],
+    *[f"CREATE INDEX IF NOT EXISTS {table}{suffix}_profile ON {table}{suffix} (project_id, profile_id, timestamp)"
+      for table in PROFILE_DATA_TABLES for suffix in ('', '_staging')],
+    f"""CREATE TABLE IF NOT EXISTS run_config (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, run_date DATETIME,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS Besos_gen_param_in (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, profile_id INT, technology {TEXT} NOT NULL,
+        system_capex REAL, capex_subsidy REAL, plant_size_kw REAL, plant_life_years REAL, cuf REAL,
+        aux_consumption REAL, discount_rate REAL, equity REAL, return_on_equity REAL, loan_tenure REAL,
+        moratorium REAL, loan_interest REAL, opex_year1 REAL, opex_growth REAL, insurance REAL,
+        wc_om_months REAL, wc_receivables_months REAL, wc_interest REAL, n1_years REAL,
+        depreciation_n1 REAL, depreciation_applicable_capex_pct REAL, solar_degradation REAL,
+        grid_availability REAL, inverter_turbine_capacity REAL, run_date DATETIME,
+        PRIMARY KEY (project_id, run_number, technology)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_re_tech_in (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, profile_id INT,
+        wind_cuf REAL, wind_grid REAL, wind_deg REAL, solar_cuf REAL, solar_grid REAL, solar_deg REAL,
+        battery_eff REAL, battery_dod REAL,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_re_economics_in (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, profile_id INT,
+        wind_capex REAL, wind_om REAL, solar_capex REAL, solar_om REAL, battery_capex REAL,
+        battery_om REAL, insurance REAL,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_re_financials_in (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, profile_id INT,
+        equity_pct REAL, depreciation_year REAL, ppa_price REAL, loan_tenure REAL, project_life REAL,
+        penalty REAL, loan_interest REAL, inflation_rate REAL, excess_gen_price REAL,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS Plant_size (
+        project_id {TEXT} NOT NULL, profile_id INT, run_number INT NOT NULL, technology {TEXT} NOT NULL,
+        given_plant_size REAL, optimized_plant_size REAL,
+        PRIMARY KEY (project_id, profile_id, run_number, technology)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_lcos_in (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, battery_pack_capital_cost REAL,
+        o_and_m_pct REAL, storage_duration REAL, roundtrip_efficiency REAL, depth_of_discharge REAL,
+        cycles_per_year REAL, cycle_life REAL,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_lcos_out (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, lcos_value REAL,
+        PRIMARY KEY (project_id, run_number)
+    )""",
+    *[f"""CREATE TABLE IF NOT EXISTS besos_fin_analysis_{technology}_{schedule} (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, year INT NOT NULL, {columns},
+        calculated_at DATETIME,
+        PRIMARY KEY (project_id, run_number, year)
+    )""" for technology in ('solar', 'wind') for schedule, columns in FIN_ANALYSIS_COLUMNS.items()],
+    f"""CREATE TABLE IF NOT EXISTS besos_lcoe_results (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, technology {TEXT} NOT NULL,
+        lcoe_value REAL, calculated_at DATETIME,
+        PRIMARY KEY (project_id, run_number, technology)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_gen_out (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, technology {TEXT} NOT NULL,
+        gross_capital_cost REAL, net_capital_cost REAL, equity REAL, debt REAL,
+        annual_depreciation_first_n1_gross_capex REAL, annual_depreciation_after_n1_gross_capex REAL,
+        annual_depreciation_first_n1_net_capex REAL, annual_depreciation_after_n1_net_capex REAL,
+        calculated_at DATETIME,
+        PRIMARY KEY (project_id, run_number, technology)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS besos_lcoe_breakdown (
+        project_id {TEXT} NOT NULL, run_number INT NOT NULL, technology {TEXT} NOT NULL, year INT NOT NULL,
+        gross_generation_kwh_input REAL, net_generation_kwh_available REAL,
+        operation_maintenance_expenses REAL, insurance REAL, depreciation_gross_capital REAL,
+        depreciation_net_capital REAL, interest_term_loan REAL, interest_working_capital REAL,
+        return_on_equity REAL, total_cost_generation REAL, cost_generation_per_kwh REAL,
+        discount_factor REAL, present_value REAL, annual_cost_inr REAL, discounted_cost_inr REAL,
+        discounted_gen_kwh REAL, calculated_at DATETIME,
+        PRIMARY KEY (project_id, run_number, technology, year)
+    )""",
+    "CREATE TABLE IF NOT EXISTS id_sequences (name VARCHAR(255) NOT NULL PRIMARY KEY, last_value BIGINT NOT NULL)",
+    f"""CREATE TABLE IF NOT EXISTS profile_array_store (
+        project_id {TEXT} NOT NULL, profile_id INT NOT NULL, kind VARCHAR(10) NOT NULL,
+        file_path VARCHAR(255) NOT NULL, start_time DATETIME NOT NULL, step_seconds INT NOT NULL,
+        length INT NOT NULL,
+        PRIMARY KEY (project_id, profile_id, kind)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS profile_quality_report (
+        project_id {TEXT} NOT NULL, profile_id INT NOT NULL, kind VARCHAR(10) NOT NULL,
+        file_name VARCHAR(255) NOT NULL, rows_checked INT NOT NULL, invalid_timestamps INT NOT NULL,
+        nan_values INT NOT NULL, negative_values INT NOT NULL, duplicate_timestamps INT NOT NULL,
+        missing_timestamps INT NOT NULL, above_capacity INT NULL, flatline_stretches INT NOT NULL,
+        flatline_rows INT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS profile_quality_report_profile ON profile_quality_report (project_id, profile_id)",
+]
+
+# Reference data the configuration pages need before any project exists
+SEED_PROJECT_TYPES = ['Wind', 'Solar', 'Battery', 'Hybrid']
+SEED_STATES = [
+    ('Andhra Pradesh', 'AP'), ('Arunachal Pradesh', 'AR'), ('Assam', 'AS'), ('Bihar', 'BR'),
+    ('Chhattisgarh', 'CG'), ('Goa', 'GA'), ('Gujarat', 'GJ'), ('Haryana', 'HR'),
+    ('Himachal Pradesh', 'HP'), ('Jharkhand', 'JH'), ('Karnataka', 'KA'), ('Kerala', 'KL'),
+    ('Madhya Pradesh', 'MP'), ('Maharashtra', 'MH'), ('Manipur', 'MN'), ('Meghalaya', 'ML'),
+    ('Mizoram', 'MZ'), ('Nagaland', 'NL'), ('Odisha', 'OD'), ('Punjab', 'PB'), ('Rajasthan', 'RJ'),
+    ('Sikkim', 'SK'), ('Tamil Nadu', 'TN'), ('Telangana', 'TS'), ('Tripura', 'TR'),
+    ('Uttar Pradesh', 'UP'), ('Uttarakhand', 'UK'), ('West Bengal', 'WB')
+]
+
+
+def _adapt_datetime(value):
+    return value.isoformat(' ')
+
+
+def _adapt_timestamp(value):
+    return value.to_pydatetime().isoformat(' ')
+
+
+def _convert_datetime(value):
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+# Parameters arrive as pandas/numpy scalars as often as Python ones
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(pd.Timestamp, _adapt_timestamp)
+for _numpy_type in (np.float64, np.float32):
+    sqlite3.register_adapter(_numpy_type, float)
+for _numpy_type in (np.int64, np.int32, np.bool_):
+    sqlite3.register_adapter(_numpy_type, int)
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+sqlite3.register_converter('DATE', lambda value: datetime.date.fromisoformat(value.decode()))
+
+_UPSERT = re.compile(r'ON\s+DUPLICATE\s+KEY\s+UPDATE', re.IGNORECASE)
+_VALUES_REFERENCE = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+_CREATE_LIKE = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+LIKE\s+(\w+)', re.IGNORECASE)
+_INLINE_KEY = re.compile(r',\s*KEY\s*\([^)]*\)', re.IGNORECASE)
+
+
+def is_sqlite(handle):
+    """True for connections and cursors of this backend, for the few statements written per dialect"""
+    return getattr(handle, 'dialect', None) == 'sqlite'
+
+
+@lru_cache(maxsize=512)
+def translate_sql(query):
+    """
+    Rewrites the MySQL dialect used across the pages into SQLite
+    Covers %s placeholders, ON DUPLICATE KEY UPDATE (with VALUES(col) references),
+    GREATEST/LEAST, CREATE TABLE ... LIKE and inline KEY definitions. Cached, so the
+    repeated statements of executemany batches are translated once.
+    """
+    query = query.replace('%s', '?')
+    upsert = _UPSERT.search(query)
+    if upsert:
+        assignments = _VALUES_REFERENCE.sub(r'excluded.\1', query[upsert.end():])
+        query = query[:upsert.start()] + 'ON CONFLICT DO UPDATE SET' + assignments
+    query = re.sub(r'\bGREATEST\(', 'MAX(', query, flags=re.IGNORECASE)
+    query = re.sub(r'\bLEAST\(', 'MIN(', query, flags=re.IGNORECASE)
+    query = _CREATE_LIKE.sub(r'CREATE TABLE IF NOT EXISTS \1 AS SELECT * FROM \2 WHERE 0', query)
+    return _INLINE_KEY.sub('', query)
+
+
+class SQLiteCursor:
+    """
+    Cursor with the mysql.connector interface the pages use
+    Statements are translated with translate_sql; with dictionary=True rows come back as
+    dicts, like conn.cursor(dictionary=True) in mysql.connector.
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query, params=None):
+        self._cursor.execute(translate_sql(query), params or ())
+        return self
+
+    def executemany(self, query, seq_of_params):
+        # One prepared statement stepped through every row, inside the caller's transaction
+        self._cursor.executemany(translate_sql(query), seq_of_params)
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([description[0] for description in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    SQLite connection with the mysql.connector interface the pages use
+    Writes open an IMMEDIATE transaction (taking the write lock up front, so concurrent
+    writers queue on busy_timeout instead of failing on a lock upgrade) that lasts until
+    commit() or rollback(). close() hands the connection back to its pool.
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, connection, pool=None):
+        self._connection = connection
+        self._pool = pool
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def ping(self, reconnect=True, attempts=1):
+        # A local file cannot drop the connection
+        pass
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.put_connection(self)
+        else:
+            self._connection.close()
+
+
+def connect(path=None):
+    """
+    Opens a tuned SQLite connection (see PRAGMAS) without pooling
+    Returns:
+        SQLiteConnection
+    """
+    connection = sqlite3.connect(
+        path or SQLITE_PATH, detect_types=sqlite3.PARSE_DECLTYPES,
+        isolation_level='IMMEDIATE', check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000
+    )
+    for pragma in PRAGMAS:
+        connection.execute(pragma)
+    return SQLiteConnection(connection)
+
+
+def create_schema(connection):
+    """Creates every table the app uses, if missing, and seeds the reference tables"""
+    cursor = connection.cursor()
+    try:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.executemany("INSERT OR IGNORE INTO project_types (type) VALUES (%s)",
+                           [(project_type,) for project_type in SEED_PROJECT_TYPES])
+        cursor.executemany("INSERT OR IGNORE INTO states (name, code) VALUES (%s, %s)", SEED_STATES)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+class SQLitePool:
+    """
+    Pool of SQLite connections mirroring MySQLConnectionPool.get_connection()
+    The schema is created when the pool is built. Connections closed by the caller are
+    rolled back and kept for reuse (up to size), so a warm app reopens no files and
+    re-runs no pragmas; the pool never runs dry, it opens another connection instead.
+    """
+
+    def __init__(self, path=None, size=10):
+        self.path = path or SQLITE_PATH
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        connection = connect(self.path)
+        create_schema(connection)
+        self._idle.append(self._pooled(connection))
+
+    def _pooled(self, connection):
+        return SQLiteConnection(connection._connection, pool=self)
+
+    def get_connection(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._pooled(connect(self.path))
+
+    def put_connection(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection._connection.close()